@@ -0,0 +1 @@
+"""Benchmarks for the ci.py pipeline."""
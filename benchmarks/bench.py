@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+"""Benchmark the processors and schedulers against synthetic Go trees.
+
+A gb or glide tree of the requested size is generated in a temporary
+directory, along with the output `go test`, `go list`, `go vet` and `golint`
+would write for it. Fake `go` and `golint` executables replaying that output
+are put first on the PATH, so the processors run exactly as they do in CI
+without needing Go, only the tools' own run time is missing. `--latency`
+adds a fixed delay to each tool invocation to stand in for it, which is what
+the sequential and parallel scheduler cases compare.
+
+Each case runs in its own interpreter so its peak RSS can be measured.
+
+    python -m benchmarks.bench --packages 40 --files 20 --lines 200
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+CASES = ["code_coverage", "code_coverage_json", "go_lint", "go_vet",
+         "static_checks", "scheduler_sequential", "scheduler_parallel"]
+
+FAKE_GO = """#!/bin/sh
+sleep "$F8CI_BENCH_LATENCY"
+command="$1"
+key="all"
+for arg in "$@"; do
+    case "$arg" in
+        -json) [ "$command" = "test" ] && command="test-json" ;;
+        *...) key=$(printf '%s' "$arg" | tr -c 'A-Za-z0-9' '_') ;;
+    esac
+done
+case "$command" in
+    version) echo "go version bench" ;;
+    vet) cat "$F8CI_BENCH_OUTPUT/vet/$key.out" >&2 ;;
+    *) cat "$F8CI_BENCH_OUTPUT/$command/$key.out" ;;
+esac
+"""
+
+FAKE_GOLINT = """#!/bin/sh
+sleep "$F8CI_BENCH_LATENCY"
+key=$(printf '%s' "$1" | tr -c 'A-Za-z0-9' '_')
+cat "$F8CI_BENCH_OUTPUT/lint/$key.out"
+"""
+
+GO_FILE = """package {package}
+
+import "net/http"
+
+// Handler{index} handles requests.
+func Handler{index}(w http.ResponseWriter, r *http.Request) {{
+{body}}}
+"""
+
+
+def output_key(argument):
+    """Mirror the fake executables' mapping from an argument to a file.
+
+    :param argument: string
+    :return: string
+    """
+    return re.sub("[^A-Za-z0-9]", "_", argument)
+
+
+class Tree(object):
+    """A synthetic project and the recorded output of the Go tools for it."""
+
+    IMPORT_PREFIX = "fresh8.co/bench"
+
+    def __init__(self, root, project_type, packages, subpackages, files,
+                 lines):
+        self.root = root
+        self.project_type = project_type
+        self.packages = ["pkg{0}".format(i) for i in range(packages)]
+        self.subpackages = subpackages
+        self.files = files
+        self.lines = lines
+        self.output = os.path.join(root, ".bench-output")
+        self.bin = os.path.join(root, ".bench-bin")
+
+    @property
+    def source_lines(self):
+        """The number of lines in all of the generated .go files."""
+        file_lines = GO_FILE.count("\n") - 1 + self.lines
+        return len(self.packages) * (self.subpackages + 1) * self.files \
+            * file_lines
+
+    @property
+    def configured_packages(self):
+        """The packages as they'd be listed under all.packages."""
+        if self.project_type == "gb":
+            return list(self.packages)
+        return ["./" + package for package in self.packages]
+
+    def generate(self):
+        for name, script in [("go", FAKE_GO), ("golint", FAKE_GOLINT)]:
+            self._write(os.path.join(self.bin, name), script)
+            os.chmod(os.path.join(self.bin, name), 0o755)
+        if self.project_type == "glide":
+            self._write(os.path.join(self.root, "glide.yaml"),
+                        "package: {0}\n".format(self.IMPORT_PREFIX))
+
+        everything = dict((kind, []) for kind in
+                          ["test", "test-json", "list", "vet", "lint"])
+        for package, configured in zip(self.packages,
+                                       self.configured_packages):
+            outputs = self._generate_package(package)
+            for kind, lines in outputs.items():
+                everything[kind].extend(lines)
+                self._write_output(kind, self.key(kind, configured), lines)
+
+        # Whole tree runs, e.g. `go list -json ./...` for the json mode.
+        for kind, lines in everything.items():
+            for key in ["all", output_key("./..."), output_key("./src/...")]:
+                self._write_output(kind, key, lines)
+
+    def _generate_package(self, package):
+        outputs = dict((kind, []) for kind in
+                       ["test", "test-json", "list", "vet", "lint"])
+        for sub in range(self.subpackages + 1):
+            name = package if sub == 0 else "{0}/sub{1}".format(package, sub)
+            import_path = self._import_path(name)
+            directory = self._directory(name)
+            for index in range(self.files):
+                filename = "file{0}.go".format(index)
+                self._write(os.path.join(directory, filename),
+                            self._go_file(name, index))
+                lint_path = os.path.join(
+                    "src", name if self.project_type == "gb"
+                    else "./" + name, filename)
+                outputs["lint"].append(
+                    "{0}:6:1: exported function Handler{1} should have "
+                    "comment or be unexported".format(lint_path, index))
+            outputs["vet"].append(
+                "{0}/file0.go:8: unreachable code".format(
+                    name if self.project_type == "gb" else "./" + name))
+
+            coverage = 50.0 + (sub * 7) % 50
+            outputs["test"].append(
+                "ok  \t{0}\t0.0{1}s\tcoverage: {2}% of statements".format(
+                    import_path, sub % 10, coverage))
+            outputs["test-json"].extend(
+                json.dumps(event, separators=(",", ":")) for event in [
+                    {"Action": "start", "Package": import_path},
+                    {"Action": "output", "Package": import_path,
+                     "Output": "coverage: {0}% of statements\n".format(
+                         coverage)},
+                    {"Action": "pass", "Package": import_path,
+                     "Elapsed": 0.01}])
+            outputs["list"].extend(json.dumps(
+                {"ImportPath": import_path, "Dir": directory,
+                 "Imports": ["net/http"]}, indent=1).split("\n"))
+        return outputs
+
+    def _go_file(self, package, index):
+        body = []
+        for line in range(self.lines):
+            if index == 0 and line == 0:
+                body.append('\thttp.Get("http://example.com")\n')
+            else:
+                body.append("\tw.Header().Set(\"X-Line\", "
+                            "\"{0}\")\n".format(line))
+        return GO_FILE.format(package=package.rsplit("/", 1)[-1],
+                              index=index, body="".join(body))
+
+    def _import_path(self, name):
+        if self.project_type == "gb":
+            return name
+        return "{0}/{1}".format(self.IMPORT_PREFIX, name)
+
+    def _directory(self, name):
+        if self.project_type == "gb":
+            return os.path.join(self.root, "src", name)
+        return os.path.join(self.root, name)
+
+    def key(self, kind, configured):
+        """The output file a tool run over a configured package reads."""
+        if kind == "lint":
+            return output_key("src/{0}/...".format(configured))
+        return output_key("{0}/...".format(configured))
+
+    def _write_output(self, kind, key, lines):
+        self._write(os.path.join(self.output, kind, key + ".out"),
+                    "\n".join(lines) + "\n")
+
+    @staticmethod
+    def _write(path, content):
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def build_config(tree, json_mode=False):
+    from utils.config import Config
+    return Config({
+        "all": {"packages": tree.configured_packages,
+                "project_type": tree.project_type,
+                "ignored_commands": []},
+        "code_coverage": {"threshold": 0.0, "ignored_packages": [],
+                          "json": json_mode},
+        "golint": {"ignored_packages": []},
+        "go_vet": {"ignored_packages": []},
+    })
+
+
+def count_lines(tree, kind, packages=None):
+    """Count the lines of recorded output a case reads.
+
+    :param packages: [string], configured packages, the whole tree if None
+    :return: int
+    """
+    keys = ["all"] if packages is None else \
+        [tree.key(kind, package) for package in packages]
+    total = 0
+    for key in keys:
+        path = os.path.join(tree.output, kind, key + ".out")
+        with open(path) as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+def run_case(case, tree, jobs):
+    """Run a single case, returning the number of lines it processed.
+
+    :param case: string
+    :param tree: Tree
+    :param jobs: int, workers for the parallel scheduler
+    :return: int
+    """
+    from go_processes.code_coverage import CodeCoverage
+    from go_processes.go_lint import GoLint
+    from go_processes.go_vet import GoVet
+    from go_processes.static_checks import StaticChecks
+    from utils.scheduler import Scheduler, Step
+
+    packages = tree.configured_packages
+
+    if case in ("code_coverage", "code_coverage_json"):
+        json_mode = case == "code_coverage_json"
+        config = build_config(tree, json_mode)
+        if json_mode:
+            CodeCoverage(config).get_coverage("all", False)
+            return count_lines(tree, "test-json") + count_lines(tree, "list")
+        for package in packages:
+            CodeCoverage(config).get_coverage(package, False)
+        return count_lines(tree, "test", packages)
+
+    if case == "go_lint":
+        config = build_config(tree)
+        for package in packages:
+            GoLint(config).go_lint(package, False)
+        return count_lines(tree, "lint", packages)
+
+    if case == "go_vet":
+        config = build_config(tree)
+        for package in packages:
+            GoVet(config).go_vet(package, False)
+        return count_lines(tree, "vet", packages)
+
+    if case == "static_checks":
+        source_dir = "src" if tree.project_type == "gb" else "."
+        StaticChecks(source_dir).validate(False)
+        return tree.source_lines
+
+    config = build_config(tree)
+    steps = []
+    for package in packages:
+        steps.append(Step(package, "code_coverage",
+                          lambda p: CodeCoverage(config).get_coverage(
+                              p, False)))
+        steps.append(Step(package, "go_lint",
+                          lambda p: GoLint(config).go_lint(p, False)))
+        steps.append(Step(package, "go_vet",
+                          lambda p: GoVet(config).go_vet(p, False)))
+    Scheduler(1 if case == "scheduler_sequential" else jobs).run(steps)
+    return count_lines(tree, "test", packages) \
+        + count_lines(tree, "lint", packages) \
+        + count_lines(tree, "vet", packages)
+
+
+def child(args):
+    """Run one case in this interpreter and print its measurements."""
+    # Processors log at INFO, keep the formatting cost but not the noise.
+    logging.basicConfig(level="DEBUG", stream=open(os.devnull, "w"))
+
+    with open(os.path.join(args.root, "tree.json")) as f:
+        tree = Tree(**json.load(f))
+    os.chdir(tree.root)
+    os.environ["PATH"] = tree.bin + os.pathsep + os.environ["PATH"]
+    os.environ["F8CI_BENCH_OUTPUT"] = tree.output
+    os.environ["F8CI_BENCH_LATENCY"] = str(args.latency)
+
+    start = time.time()
+    lines = run_case(args.case, tree, args.jobs)
+    wall = time.time() - start
+
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    print(json.dumps({"case": args.case,
+                      "wall": wall,
+                      "lines": lines,
+                      "max_rss_kb": self_usage.ru_maxrss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--project-type", choices=["gb", "glide"],
+                        default="glide")
+    parser.add_argument("--packages", type=int, default=20,
+                        help="configured packages")
+    parser.add_argument("--subpackages", type=int, default=4,
+                        help="packages under each configured package")
+    parser.add_argument("--files", type=int, default=10,
+                        help=".go files per package")
+    parser.add_argument("--lines", type=int, default=100,
+                        help="lines per .go file")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds each fake tool invocation sleeps")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="workers for the parallel scheduler case")
+    parser.add_argument("--case", action="append", choices=CASES,
+                        help="cases to run, all by default")
+    parser.add_argument("--json", action="store_true",
+                        help="print the results as JSON")
+    parser.add_argument("--child", action="store_true",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.case = args.case[0]
+        return child(args)
+
+    from utils.scheduler import default_jobs
+    jobs = args.jobs or default_jobs()
+    root = tempfile.mkdtemp(prefix="f8ci-bench-")
+    try:
+        tree = Tree(root, args.project_type, args.packages, args.subpackages,
+                    args.files, args.lines)
+        tree.generate()
+        with open(os.path.join(root, "tree.json"), "w") as f:
+            json.dump({"root": root, "project_type": args.project_type,
+                       "packages": args.packages,
+                       "subpackages": args.subpackages,
+                       "files": args.files, "lines": args.lines}, f)
+
+        results = []
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for case in args.case or CASES:
+            out = subprocess.check_output(
+                [sys.executable, "-m", "benchmarks.bench", "--child",
+                 "--case", case, "--root", root, "--jobs", str(jobs),
+                 "--latency", str(args.latency)],
+                cwd=repo, universal_newlines=True)
+            results.append(json.loads(out.strip().split("\n")[-1]))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("{0:<22}{1:>10}{2:>12}{3:>14}{4:>14}".format(
+        "case", "wall (s)", "lines", "lines/s", "peak RSS (MB)"))
+    for result in results:
+        print("{0:<22}{1:>10.3f}{2:>12}{3:>14.0f}{4:>14.1f}".format(
+            result["case"], result["wall"], result["lines"],
+            result["lines"] / result["wall"] if result["wall"] else 0,
+            result["max_rss_kb"] / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
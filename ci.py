@@ -6,7 +6,43 @@ tools. Currently hardcoded to include all of them. Each tool will run as a
 subprocess with the output piped into python. Regex is then used to determine
 the necessary information.
 
-Tracks whether an error has occured using a global variable `has_error`.
+Every (package, tool) pair is a step, steps are run concurrently on a pool of
+`all.jobs` workers (defaults to the CPU count). Results are reported in
+package order and aggregated into a `RunResult`.
+
+With `--since REF` only packages affected by changes since REF are checked,
+the rest take their results from the baseline written by a previous run.
+
+`--report` and `--trace` record how long each step took and what its
+processes used, as JSON and as a Chrome trace respectively.
+
+`--diagnostics FORMAT:PATH` writes every problem the tools reported as
+text, JSON, JUnit XML or checkstyle XML.
+
+`--watch` keeps running after the first run, rerunning the checks affected
+by each batch of saved files.
+
+`--shard I/N` splits the steps between N CI nodes, balanced by the timings
+of an earlier run. `ci.py merge` combines each shard's report afterwards.
+
+`all.timeout` and `code_coverage.timeout` stop tools which run for too
+long, `--slowest N` lists where the time went.
+
+`code_coverage.binaries` keeps each package's tests compiled, so they are
+only built again once the package or its imports change.
+
+`code_coverage.flaky` reruns only the tests which failed, and quarantines
+those which keep failing then passing.
+
+`all.max_processes`, `all.max_test_processes` and `all.min_available_mb`
+bound the go processes running at once, whichever steps started them.
+
+`--fail-fast` cancels everything else once a check fails, `--priority`
+runs the checks likeliest to fail soonest first.
+
+The processors are imported when a step first needs them, as are the
+modules behind the optional flags, so a run only pays for what it uses.
+`--profile-startup` shows where the time before the first step goes.
 
 GOPATH is currently hardcoded, making it configurable is on the roadmap.
 
@@ -16,14 +52,28 @@ to move it back to python2 style.
 
 from __future__ import print_function
 
+import argparse
+import os
 import sys
 import logging
+import time
 
 from utils.config import get_config
-from go_processes.code_coverage import CodeCoverage
-from go_processes.go_lint import GoLint
-from go_processes.go_timeouts import GoTimeouts
-from go_processes.go_vet import GoVet
+from utils.go_source import GoSource
+from utils.priority import DEFAULT_HISTORY
+from utils.registry import Registry
+from utils.report import DEFAULT_BASELINE, merge_reports, read_report, \
+    read_results, read_timings, save_report, write_report, write_results, \
+    write_trace
+from utils.scheduler import Scheduler, Step, StepResult, default_jobs
+from utils.shard import parse_shard, shard_steps
+from utils.startup import StartupProfile, process_start_time
+from go_processes.process import set_deadline, set_limiter
+from go_processes.slow_tests import SlowTests
+from go_processes.vet_handoff import VetHandoff
+
+# Anything only needed by some runs, e.g. utils.watch for --watch, is
+# imported where it's used.
 
 
 ___author___ = "Jim Hill (github.com/jimah)"
@@ -37,9 +87,195 @@ ___maintainer___ = "Jim Hill"
 ___email___ = "jimi2204@googlemail.com"
 ___status___ = "Development"
 
-CONFIG = get_config()
 
-logging.basicConfig(level="DEBUG")
+def parse_args():
+    """Parse the command line arguments.
+
+    :return: argparse.Namespace
+    """
+    if sys.argv[1:2] == ["merge"]:
+        return parse_merge_args()
+
+    parser = argparse.ArgumentParser(description="Pass or fail Go builds.")
+    parser.add_argument(
+        "--since", metavar="REF",
+        help="only check packages affected by changes since the git ref, "
+             "results for the rest are read from the baseline")
+    parser.add_argument(
+        "--baseline", metavar="PATH",
+        help="where results are recorded for later incremental runs, "
+             "defaults to {0} with --since".format(DEFAULT_BASELINE))
+    parser.add_argument(
+        "--report", metavar="PATH",
+        help="write each step's result, timing and resource usage as JSON")
+    parser.add_argument(
+        "--trace", metavar="PATH",
+        help="write the steps as a Chrome trace, see chrome://tracing")
+    parser.add_argument(
+        "--diagnostics", metavar="FORMAT:PATH", type=diagnostics_arg,
+        action="append", default=[],
+        help="write every problem found as text, json, junit or "
+             "checkstyle, can be given more than once")
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running, rechecking the packages affected whenever a "
+             "file is saved")
+    parser.add_argument(
+        "--poll", action="store_true",
+        help="with --watch, poll for changes rather than using inotify")
+    parser.add_argument(
+        "--shard", metavar="I/N", type=shard_arg,
+        help="only run the I-th of N shards of the steps, counting from 1")
+    parser.add_argument(
+        "--timings", metavar="PATH",
+        help="a --report from an earlier run, used to balance the shards")
+    parser.add_argument(
+        "--fail-fast", action="store_true",
+        help="stop every check once one fails, and each tool at its first "
+             "failure")
+    parser.add_argument(
+        "--priority", action="store_true",
+        help="run the quickest checks and those which failed most often "
+             "first, see --history")
+    parser.add_argument(
+        "--history", metavar="PATH",
+        help="where how often each check failed and how long it took are "
+             "recorded, defaults to {0} with --priority".format(
+                 DEFAULT_HISTORY))
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="log how long each phase of startup took, once the run is over")
+    parser.add_argument(
+        "--slowest", metavar="N", type=int,
+        help="log the N slowest packages, and tests with code_coverage.json, "
+             "once the run is over")
+
+    args = parser.parse_args()
+    args.command = None
+    if args.watch and (args.since or args.shard):
+        parser.error("--since and --shard can't be used with --watch")
+    if args.since and not args.baseline:
+        args.baseline = DEFAULT_BASELINE
+    if args.priority and not args.history:
+        args.history = DEFAULT_HISTORY
+    return args
+
+
+def parse_merge_args():
+    """Parse the arguments of `ci.py merge`.
+
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog="ci.py merge",
+        description="Combine the --report of every shard into one verdict.")
+    parser.add_argument("reports", metavar="REPORT", nargs="+",
+                        help="the --report written by each shard")
+    parser.add_argument(
+        "--report", metavar="PATH",
+        help="write the combined report, e.g. as the next run's --timings")
+    parser.add_argument(
+        "--profiles", metavar="PROFILE", nargs="+", default=[],
+        help="the coverage profile written by each shard, merged into "
+             "code_coverage.profile")
+    args = parser.parse_args(sys.argv[2:])
+    args.command = "merge"
+    args.since = args.baseline = args.trace = args.shard = None
+    args.slowest = None
+    args.diagnostics = []
+    args.fail_fast = args.priority = False
+    args.history = None
+    args.profile_startup = False
+    args.watch = False
+    return args
+
+
+def shard_arg(value):
+    """Parse --shard for argparse.
+
+    :param value: string
+    :return: (int, int)
+    """
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(
+            "expected I/N with 1 <= I <= N, {0}".format(e))
+
+
+def diagnostics_arg(value):
+    """Parse --diagnostics for argparse.
+
+    :param value: string
+    :return: (string, string), the sink and path
+    """
+    from utils.sinks import SINKS
+
+    sink, _, path = value.partition(":")
+    if sink not in SINKS or not path:
+        raise argparse.ArgumentTypeError(
+            "expected FORMAT:PATH with FORMAT one of {0}".format(
+                ", ".join(SINKS)))
+    return sink, path
+
+
+def write_sinks(results):
+    """Write the diagnostics of a run wherever --diagnostics asked.
+
+    :param results: [StepResult]
+    """
+    from utils.sinks import write_diagnostics
+
+    for sink, path in ARGS.diagnostics:
+        write_diagnostics(sink, path, results)
+
+
+# set up by `main`, before any steps run
+ARGS = None
+CONFIG = None
+CACHE = None
+FAIL_FAST = False
+JOBS = 1
+
+# go vet output taken from the coverage step's go test run, see
+# `expect_vet_from_tests`
+VET_HANDOFF = None
+
+# golint and go vet runs over several packages, by step tool, see
+# `plan_batches`
+BATCHES = {}
+
+# the latest coverage profile of each package, merged once a run is over
+PROFILES = {}
+
+# how long each package and test took, for --slowest
+SLOW_TESTS = SlowTests()
+
+# how long startup took, for --profile-startup
+STARTUP = None
+
+# how often each step failed and how long it took, see --history
+HISTORY = None
+
+# each package's coverage, checked against and added to the store
+TREND = None
+TREND_STORE = None
+
+# compiled test binaries, reused while their packages are unchanged
+BINARIES = None
+
+# failed tests are retried, and what happened to them kept in the file at
+# FLAKY_PATH, see `open_flaky`
+FLAKY = None
+FLAKY_PATH = None
+
+# the processors, imported when a step first needs them
+PROCESSORS = Registry()
+PROCESSORS.register("code_coverage", "go_processes.code_coverage:CodeCoverage")
+PROCESSORS.register("go_lint", "go_processes.go_lint:GoLint")
+PROCESSORS.register("go_vet", "go_processes.go_vet:GoVet")
+PROCESSORS.register("static_checks", "go_processes.static_checks:StaticChecks")
+
 logger = logging.getLogger(__name__)
 
 
@@ -59,10 +295,21 @@ def code_coverage(package):
     perform the coverage checks required.
 
     :param package: string
-    :return:
+    :return: bool
     """
-    global has_error
-    has_error = CodeCoverage(CONFIG).get_coverage(package, has_error)
+    coverage = PROCESSORS.load("code_coverage")(
+        CONFIG, CACHE, fail_fast=FAIL_FAST, jobs=JOBS,
+        vet_handoff=VET_HANDOFF, slow_tests=SLOW_TESTS, trend=TREND,
+        binaries=BINARIES, flaky=FLAKY)
+    try:
+        has_error = coverage.get_coverage(package, False)
+    finally:
+        if VET_HANDOFF is not None:
+            # go vet runs itself unless the tests' output was handed over.
+            VET_HANDOFF.abandon(package)
+    if coverage.profile is not None:
+        PROFILES[package] = coverage.profile
+    return has_error
 
 
 def go_lint(package):
@@ -72,17 +319,27 @@ def go_lint(package):
     Ignores packages listed under config.golint.ignored_packages
 
     """
-    global has_error
-    has_error = GoLint(CONFIG).go_lint(package, has_error)
+    return PROCESSORS.load("go_lint")(
+        CONFIG, CACHE, fail_fast=FAIL_FAST, batch=BATCHES.get("go_lint")) \
+        .go_lint(package, False)
+
 
+def static_checks(package):
+    """Run the static checks over every .go file in the project.
 
-def go_timeouts():
-    """Run through all .go files to ensure default http lib functions aren't used.
+    The rules which are off by default run when listed in
+    static_checks.enabled_rules. Each rule can be turned off by adding its
+    name, e.g. "go_timeouts", to the ignored_commands array.
 
-    :return:
+    :param package: string, unused, the whole tree is checked once per run
+    :return: bool
     """
-    global has_error
-    has_error = GoTimeouts().validate_functions(has_error)
+    enabled = CONFIG.static_checks.enabled_rules or () \
+        if CONFIG.static_checks is not None else ()
+    source_dir = CONFIG.all.package_dirs[GLOBAL_PACKAGE]
+    return PROCESSORS.load("static_checks")(
+        source_dir, jobs=JOBS, enabled=enabled,
+        ignored=CONFIG.all.ignored_commands).validate(False)
 
 
 def go_vet(package):
@@ -91,49 +348,504 @@ def go_vet(package):
     Ignores packages listed under config.go_vet.ignored_packages
 
     :param package: string
+    :return: bool
     """
-    global has_error
-    has_error = GoVet(CONFIG).go_vet(package, has_error)
+    return PROCESSORS.load("go_vet")(
+        CONFIG, CACHE, fail_fast=FAIL_FAST, vet_handoff=VET_HANDOFF,
+        batch=BATCHES.get("go_vet")).go_vet(package, False)
 
 
-# Pulled from config.py in the same dir
-if CONFIG.all.project_type not in ["gb", "glide"]:
-    logger.critical("Non gb/glide projects unsupported: {0}"
-                    .format(CONFIG.all.project_type))
-    sys.exit(0)
+# implement your ci tests here, they are run in this order for each package
+COMMANDS = [
+    ("code_coverage", code_coverage),
+    ("go_lint", go_lint),
+    ("go_vet", go_vet),
+]
 
-if len(CONFIG.all.packages) == 0:
-    logger.critical("No packages listed to test")
-    sys.exit(1)
+# commands which check the whole source tree, run once after the packages
+GLOBAL_COMMANDS = [
+    ("static_checks", static_checks),
+]
 
-# used to track whether errors have occured accross the tests
-has_error = False
+GLOBAL_PACKAGE = "all"
 
-for package in CONFIG.all.packages:
-    logger.info("BEGINNING TESTS FOR: {0}\n".format(package))
 
-    # implement your ci tests here
-    if "code_coverage" not in CONFIG.all.ignored_commands:
-        code_coverage(package)
-        logger.info("\n")
+def build_steps(packages):
+    """Build a step for every package and enabled command.
 
-    if "go_lint" not in CONFIG.all.ignored_commands:
-        go_lint(package)
-        logger.info("\n")
+    :param packages: [string]
+    :return: [Step]
+    """
+    steps = [Step(package, name, func)
+             for package in packages
+             for name, func in COMMANDS
+             if name not in CONFIG.all.ignored_commands]
+    steps += [Step(GLOBAL_PACKAGE, name, func)
+              for name, func in GLOBAL_COMMANDS
+              if name not in CONFIG.all.ignored_commands]
+    return steps
+
+
+# packages whose header has already been logged
+REPORTED_PACKAGES = set()
 
-    if "go_vet" not in CONFIG.all.ignored_commands:
-        go_vet(package)
-        logger.info("\n")
 
-    if "go_timeouts" not in CONFIG.all.ignored_commands:
-        go_timeouts()
+def log_step(step):
+    """Log a header the first time a package's results are reported.
+
+    Called before each step's own output is reported.
+
+    :param step: Step
+    """
+    if step.package in REPORTED_PACKAGES:
         logger.info("\n")
+        return
+    REPORTED_PACKAGES.add(step.package)
+    logger.info("BEGINNING TESTS FOR: {0}\n".format(step.package))
+
+
+def write_profile(path):
+    """Merge the coverage profiles of every package into a single file.
+
+    :param path: string
+    """
+    from go_processes.coverage_profile import CoverageProfile
+
+    profile = CoverageProfile()
+    for package_profile in PROFILES.values():
+        profile.merge(package_profile)
+    with open(path, "w") as f:
+        profile.write(f)
+    logger.info("Total coverage: {0}% of statements, profile written to {1}"
+                .format(round(profile.coverage(), 2), path))
+
+
+def split_unchanged(steps, baseline):
+    """Split out the steps whose package is unaffected since ARGS.since.
+
+    A step is only skipped if the baseline holds a result for it, checks
+    over the whole tree are always run.
+
+    :param steps: [Step]
+    :param baseline: dict of (package, tool) to has_error
+    :return: ([Step], [Step]), the steps to run and the steps to skip
+    """
+    if not ARGS.since:
+        return steps, []
+
+    from utils.changes import affected_packages
+
+    affected = affected_packages(ARGS.since, CONFIG.all.packages,
+                                 GoSource(CONFIG.all.project_type))
+    per_package = dict(COMMANDS)
+
+    run, skip = [], []
+    for step in steps:
+        if step.tool in per_package and step.package not in affected \
+                and (step.package, step.tool) in baseline:
+            skip.append(step)
+        else:
+            run.append(step)
+    return run, skip
+
+
+def expect_vet_from_tests(steps):
+    """Have go test vet the packages whose coverage and go vet steps both run,
+    with the coverage step first.
 
+    Steps are started in order, so a package's go vet step only ever waits
+    on a coverage step that is already running. COMMANDS puts code_coverage
+    first, --priority puts it last, go vet then runs itself.
 
-if has_error:
-    logger.info("Please rectify the above errors.")
-    logger.info("Failure to comply will activate "
-                "the trap door below your desk.")
-    sys.exit(1)
-else:
-    logger.info("No errors found, we're proud of you.")
+    :param steps: [Step]
+    """
+    coverage = set()
+    for step in steps:
+        if step.tool == "code_coverage":
+            coverage.add(step.package)
+        elif step.tool == "go_vet" and step.package in coverage:
+            VET_HANDOFF.expect(step.package)
+
+
+def prefetch_cache(steps):
+    """Fetch the cached results of every step in batches, rather than one
+    request per step, which matters with a remote cache.
+
+    :param steps: [Step]
+    """
+    keys = []
+    for tool in dict(COMMANDS):
+        packages = [step.package for step in steps if step.tool == tool]
+        if packages:
+            processor = PROCESSORS.load(tool)(CONFIG, CACHE)
+            keys += [processor.cache_key(package) for package in packages]
+    found = CACHE.prefetch(key for key in keys if key)
+    logger.debug("Prefetched {0} of {1} cached results".format(
+        found, len(keys)))
+
+
+def plan_batches(steps):
+    """Have golint and go vet, where `batch` is set, run once over every
+    package with a step for them rather than once per package.
+
+    :param steps: [Step]
+    """
+    BATCHES.clear()
+    for tool, section in [("go_lint", CONFIG.golint),
+                          ("go_vet", CONFIG.go_vet)]:
+        packages = [step.package for step in steps if step.tool == tool]
+        if not section.batch or len(packages) < 2:
+            continue
+        if tool == "go_vet":
+            processor = PROCESSORS.load(tool)(CONFIG, CACHE,
+                                              vet_handoff=VET_HANDOFF)
+        else:
+            processor = PROCESSORS.load(tool)(CONFIG, CACHE)
+        BATCHES[tool] = processor.new_batch(packages)
+
+
+def merge():
+    """Combine the reports and coverage profiles written by each shard.
+
+    Fails if any step failed, or if any step is missing because a shard
+    didn't report it.
+
+    :return: bool, True if there are errors
+    """
+    from go_processes.coverage_profile import CoverageProfile
+
+    reports = []
+    for path in ARGS.reports:
+        report = read_report(path)
+        if report is None:
+            logger.critical("Unable to read shard report {0}".format(path))
+            return True
+        reports.append(report)
+    merged = merge_reports(reports)
+
+    reported = set((s["package"], s["tool"]) for s in merged["steps"])
+    missing = [step for step in build_steps(CONFIG.all.packages)
+               if (step.package, step.tool) not in reported]
+    for step in missing:
+        logger.info("{0} {1}: no shard reported it".format(
+            step.package, step.tool))
+    for step in merged["steps"]:
+        if step["has_error"]:
+            logger.info("{0} {1}: FAIL".format(step["package"], step["tool"]))
+    logger.info("{0} shards, {1} steps, {2} failed".format(
+        len(reports), len(merged["steps"]),
+        sum(1 for step in merged["steps"] if step["has_error"])))
+
+    if ARGS.profiles:
+        if not CONFIG.code_coverage.profile:
+            logger.critical("--profiles needs code_coverage.profile set")
+            return True
+        for path in ARGS.profiles:
+            profile = CoverageProfile()
+            with open(path, "r") as f:
+                profile.read(f)
+            PROFILES[path] = profile
+        write_profile(CONFIG.code_coverage.profile)
+
+    if ARGS.report:
+        save_report(ARGS.report, merged)
+    return merged["has_error"] or bool(missing)
+
+
+def run_steps(steps):
+    """Run steps on the scheduler, reporting them as they go.
+
+    :param steps: [Step]
+    :return: (RunResult, float, float), with the start and end times
+    """
+    REPORTED_PACKAGES.clear()
+    if ARGS.priority:
+        from utils.priority import prioritise
+        steps = prioritise(steps, HISTORY)
+    if CACHE is not None and CACHE.backend.REMOTE:
+        prefetch_cache(steps)
+    if VET_HANDOFF is not None:
+        expect_vet_from_tests(steps)
+    plan_batches(steps)
+
+    start = time.time()
+    if CONFIG.all.timeout:
+        # Tools still running are stopped, those started later are stopped
+        # straight away.
+        set_deadline(start + CONFIG.all.timeout)
+    try:
+        scheduler = Scheduler(JOBS, ARGS.fail_fast)
+        result = scheduler.run(steps, on_step=log_step)
+    finally:
+        set_deadline(None)
+    end = time.time()
+
+    if CONFIG.all.timeout and end - start >= CONFIG.all.timeout:
+        logger.info("Out of time, the run is limited to {0}s".format(
+            CONFIG.all.timeout))
+    if result.cancelled:
+        logger.info("Stopped after the first failure, {0} checks cancelled"
+                    .format(len(result.cancelled)))
+    if HISTORY is not None:
+        HISTORY.add(result.results)
+        HISTORY.write(ARGS.history)
+    if FLAKY is not None:
+        FLAKY.write(FLAKY_PATH)
+    if PROFILES:
+        write_profile(CONFIG.code_coverage.profile)
+    if ARGS.slowest:
+        SLOW_TESTS.log(ARGS.slowest)
+    return result, start, end
+
+
+def is_watched_file(path):
+    """Whether saving a file can change any check's results.
+
+    :param path: string
+    :return: bool
+    """
+    from utils.changes import GLOBAL_FILES
+
+    return path.endswith(".go") or os.path.basename(path) in GLOBAL_FILES
+
+
+def watch():
+    """Run everything, then rerun the checks affected by each change.
+
+    The config, import graph and latest results are kept between runs.
+    Editing ci_config.yaml restarts the process to pick it up. Never
+    returns, stop it with Ctrl-C.
+    """
+    from utils.changes import GLOBAL_FILES, ImportGraph, packages_affected_by
+    from utils.watch import Watcher
+
+    source = GoSource(CONFIG.all.project_type)
+    watcher = Watcher(is_watched_file, polling=ARGS.poll)
+    graph = ImportGraph.from_go_list(CONFIG.all.project_type)
+    STARTUP.mark("watching and the import graph")
+    latest = {}
+
+    packages = list(CONFIG.all.packages)
+    try:
+        while True:
+            result, start, end = run_steps(build_steps(packages))
+            if not latest:
+                log_startup()
+            if CACHE is not None:
+                CACHE.prune()
+            if BINARIES is not None:
+                BINARIES.prune()
+            latest.update(((r.package, r.tool), r) for r in result.results
+                          if not r.cancelled)
+            log_watch_summary(latest, end - start)
+            if ARGS.diagnostics:
+                # Every check's latest diagnostics, not just this run's.
+                write_sinks(list(latest.values()))
+
+            for files in watcher.changes():
+                if any(os.path.basename(f) == "ci_config.yaml"
+                       for f in files):
+                    logger.info("ci_config.yaml changed, restarting")
+                    watcher.close()
+                    os.execv(sys.executable, [sys.executable] + sys.argv)
+                if graph.is_stale(files) or any(
+                        os.path.basename(f) in GLOBAL_FILES for f in files):
+                    graph = ImportGraph.from_go_list(CONFIG.all.project_type)
+                packages = packages_affected_by(
+                    files, CONFIG.all.packages, source, graph)
+                logger.info("{0} changed, checking {1}".format(
+                    ", ".join(files), ", ".join(packages) or "nothing"))
+                break
+    except KeyboardInterrupt:
+        watcher.close()
+        sys.exit(1 if any(r.has_error for r in latest.values()) else 0)
+
+
+def log_watch_summary(latest, elapsed):
+    """Log which checks are failing as of the latest run of each.
+
+    :param latest: dict of (package, tool) to StepResult
+    :param elapsed: float, seconds the run took
+    """
+    failing = sorted(key for key, r in latest.items() if r.has_error)
+    if failing:
+        logger.info("{0} failing: {1}".format(
+            len(failing), ", ".join("{0} {1}".format(*key)
+                                    for key in failing)))
+    else:
+        logger.info("All checks pass.")
+    logger.info("Checked in {0:.1f}s, watching for changes".format(elapsed))
+
+
+def open_trend():
+    """Open the trend store and look up the baseline, see
+    code_coverage.trends.
+
+    :return: (TrendStore, CoverageTrend)
+    """
+    from utils.trends import DEFAULT_PATH, CoverageTrend, TrendStore, \
+        history
+
+    trends = CONFIG.code_coverage.trends
+    store = TrendStore(trends.path or DEFAULT_PATH)
+    commit, baseline = None, {}
+    if trends.baseline:
+        commit, baseline = store.baseline(history(trends.baseline))
+        if commit is None:
+            logger.info("No coverage recorded for {0} yet, nothing to "
+                        "compare against".format(trends.baseline))
+        else:
+            logger.info("Comparing coverage against {0} ({1})".format(
+                trends.baseline, commit[:12]))
+    return store, CoverageTrend(baseline, trends.max_drop, commit)
+
+
+def open_flaky():
+    """Read the flaky test history, see code_coverage.flaky.
+
+    :return: (string, FlakyTests), with the history's path
+    """
+    from go_processes.flaky_tests import DEFAULT_HISTORY, DEFAULT_RETRIES, \
+        FlakyTests
+
+    flaky = CONFIG.code_coverage.flaky
+    path = flaky.history or DEFAULT_HISTORY
+    retries = flaky.retries if flaky.retries is not None else DEFAULT_RETRIES
+    return path, FlakyTests.read(path, retries, flaky.quarantine_after)
+
+
+def record_trend():
+    """Add this run's coverage to the trend store, unless what was tested
+    differs from the commit checked out."""
+    from utils.trends import head_commit, is_modified
+
+    if is_modified():
+        logger.info("Not recording coverage, there are uncommitted changes")
+    elif TREND.packages:
+        TREND_STORE.record(head_commit(), TREND.packages)
+    TREND_STORE.close()
+
+
+def log_startup():
+    """Log how long startup took, with --profile-startup."""
+    if ARGS.profile_startup:
+        STARTUP.log(PROCESSORS.load_times)
+
+
+def main():
+    """Run the checks, exiting with 1 if any of them fail."""
+    global ARGS, CONFIG, CACHE, FAIL_FAST, JOBS, VET_HANDOFF, STARTUP, \
+        TREND, TREND_STORE, HISTORY, BINARIES, FLAKY, FLAKY_PATH
+
+    STARTUP = StartupProfile(process_start_time())
+    logging.basicConfig(level="INFO")
+    ARGS = parse_args()
+    STARTUP.mark("arguments")
+
+    CONFIG = get_config()
+    STARTUP.mark("config")
+
+    if CONFIG.cache is not None:
+        from utils.cache import get_cache
+        CACHE = get_cache(CONFIG)
+    FAIL_FAST = bool(CONFIG.all.fail_fast or ARGS.fail_fast)
+    if ARGS.history:
+        from utils.priority import StepHistory
+        HISTORY = StepHistory.read(ARGS.history)
+    JOBS = CONFIG.all.jobs or default_jobs()
+    if CONFIG.all.max_processes or CONFIG.all.max_test_processes \
+            or CONFIG.all.min_available_mb:
+        from go_processes.limiter import ProcessLimiter
+        set_limiter(ProcessLimiter(CONFIG.all.max_processes,
+                                   CONFIG.all.max_test_processes,
+                                   CONFIG.all.min_available_mb))
+    if CONFIG.go_vet.from_tests:
+        VET_HANDOFF = VetHandoff()
+    if CONFIG.code_coverage.binaries is not None \
+            and CONFIG.code_coverage.profile:
+        from go_processes.binaries import get_binaries
+        BINARIES = get_binaries(CONFIG, GoSource(CONFIG.all.project_type))
+    if CONFIG.code_coverage.flaky is not None:
+        FLAKY_PATH, FLAKY = open_flaky()
+    if CONFIG.code_coverage.trends is not None \
+            and ARGS.command != "merge":
+        TREND_STORE, TREND = open_trend()
+
+    # every go invocation shares one build cache, so packages compiled for
+    # the tests aren't compiled again for go vet, and CI can keep it
+    # between builds
+    if CONFIG.all.go_cache:
+        os.environ["GOCACHE"] = os.path.abspath(CONFIG.all.go_cache)
+
+    # Pulled from config.py in the same dir
+    if CONFIG.all.project_type not in ["gb", "glide"]:
+        logger.critical("Non gb/glide projects unsupported: {0}"
+                        .format(CONFIG.all.project_type))
+        sys.exit(0)
+
+    if len(CONFIG.all.packages) == 0:
+        logger.critical("No packages listed to test")
+        sys.exit(1)
+
+    if ARGS.command == "merge":
+        sys.exit(1 if merge() else 0)
+
+    STARTUP.mark("setup")
+
+    if ARGS.watch:
+        watch()
+
+    steps = build_steps(CONFIG.all.packages)
+    if ARGS.shard:
+        timings = read_timings(ARGS.timings) if ARGS.timings else {}
+        steps = shard_steps(steps, ARGS.shard[0], ARGS.shard[1], timings)
+        logger.info("Shard {0} of {1}: {2} steps".format(
+            ARGS.shard[0], ARGS.shard[1], len(steps)))
+
+    baseline = read_results(ARGS.baseline) if ARGS.baseline else {}
+    steps, unchanged = split_unchanged(steps, baseline)
+    STARTUP.mark("planning the steps")
+
+    result, start, end = run_steps(steps)
+    log_startup()
+
+    for step in unchanged:
+        has_error = baseline[(step.package, step.tool)]
+        logger.info("{0} {1}: {2}, unchanged since {3}".format(
+            step.package, step.tool, "FAIL" if has_error else "PASS",
+            ARGS.since))
+        result.add(StepResult(step, has_error))
+
+    if ARGS.baseline:
+        baseline.update(((r.package, r.tool), r.has_error)
+                        for r in result.results if not r.cancelled)
+        write_results(ARGS.baseline, baseline)
+
+    if ARGS.report:
+        write_report(ARGS.report, result, start, end, JOBS)
+
+    if ARGS.trace:
+        write_trace(ARGS.trace, result, start)
+
+    if ARGS.diagnostics:
+        write_sinks(result.results)
+
+    if TREND is not None:
+        record_trend()
+
+    if CACHE is not None:
+        CACHE.prune()
+    if BINARIES is not None:
+        BINARIES.prune()
+
+    if result.has_error:
+        logger.info("Please rectify the above errors.")
+        logger.info("Failure to comply will activate "
+                    "the trap door below your desk.")
+        sys.exit(1)
+    else:
+        logger.info("No errors found, we're proud of you.")
+
+
+if __name__ == "__main__":
+    main()
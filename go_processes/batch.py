@@ -0,0 +1,114 @@
+"""Batch package.
+
+golint and go vet load, and go vet type checks, every package they are
+given along with everything it imports. Run once per configured package,
+the libraries those packages share are loaded again for each of them. A
+batch runs the tool once over every configured package instead, and hands
+each package's step the lines reported for its files.
+
+Lines are assigned to packages through a `PackageIndex` of the paths the
+tool reports files under, the most specific package winning where
+configured packages are nested. The first step to ask for its lines runs
+the tool, the others wait for it to finish. Packages whose results are
+already cached are left out of the batch before it runs.
+"""
+import os
+import re
+import threading
+
+REGEX_FILE = re.compile(r"([^\s:]+\.go):\d+")
+
+
+def normalise(path):
+    """Return a path the way it is looked up in a `PackageIndex`.
+
+    :param path: string, e.g. "./svc/api" or "src/svc/api/"
+    :return: string, e.g. "svc/api", "" for the project root
+    """
+    path = os.path.normpath(path).strip("/")
+    return "" if path == "." else path
+
+
+class PackageIndex(object):
+
+    def __init__(self, paths):
+        """
+        :param paths: dict of the path a tool reports a package's files
+            under to the configured package
+        """
+        self._packages = dict((normalise(path), package)
+                              for path, package in paths.items())
+
+    def package_for(self, path):
+        """Return the configured package a reported file belongs to.
+
+        :param path: string, a file as the tool reported it
+        :return: string, None if it's outside every package
+        """
+        directory = normalise(os.path.dirname(path))
+        while True:
+            if directory in self._packages:
+                return self._packages[directory]
+            if not directory:
+                return None
+            directory = os.path.dirname(directory)
+
+    def package_of_line(self, line):
+        """Return the configured package a line of output is about.
+
+        :param line: string, e.g. "svc/api/api.go:5:6: exported ..."
+        :return: string, None if the line names no file in a package
+        """
+        match = REGEX_FILE.search(line)
+        if match is None:
+            return None
+        return self.package_for(match.group(1))
+
+
+class Batch(object):
+
+    def __init__(self, packages, run, reported_path):
+        """
+        :param packages: [string], the configured packages to run over
+        :param run: function taking [string] packages, returning a
+            StreamingProcess over the tool's report
+        :param reported_path: function taking a package, returning the
+            path the tool reports its files under
+        """
+        self.packages = list(packages)
+        self.index = PackageIndex(dict(
+            (reported_path(package), package) for package in self.packages))
+        self.timed_out = False
+        self._run = run
+        self._lines = None
+        self._lock = threading.Lock()
+
+    def expects(self, package):
+        """Return whether a package is part of the batch.
+
+        :param package: string
+        :return: bool
+        """
+        return package in self.packages
+
+    def take(self, package):
+        """Return a package's lines, running the tool if nobody has yet.
+
+        :param package: string, one of the batch's packages
+        :return: [string]
+        """
+        # Only the first caller runs the tool, the rest wait on the lock.
+        with self._lock:
+            if self._lines is None:
+                self._lines = self._demultiplex()
+        return self._lines.get(package, [])
+
+    def _demultiplex(self):
+        lines = dict((package, []) for package in self.packages)
+        process = self._run(self.packages)
+        for line in process:
+            package = self.index.package_of_line(line)
+            if package is not None:
+                lines[package].append(line)
+        self.timed_out = process.timed_out
+        return lines
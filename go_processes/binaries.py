@@ -0,0 +1,217 @@
+"""Binaries package.
+
+Keeps each package's tests compiled with `go test -c -cover` in a content
+addressed directory. A binary is named by a hash of the package's .go
+files, those of everything it imports, the Go version and the build flags,
+so it is reused for as long as none of them change: rerunning a package's
+tests, in the same run or a later one, runs the binary without building or
+linking anything.
+
+With `-vet=all` go vet runs as part of compiling, and a package it finds
+problems in doesn't compile, so a stored binary's package has vetted
+cleanly.
+
+Packages without tests are stored as an empty marker, so they aren't
+compiled again to find that out. The least recently used binaries are
+removed once the directory grows past its size limit.
+"""
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+
+from utils.cache import prune_directory
+
+DEFAULT_DIRECTORY = ".f8ci-binaries"
+DEFAULT_MAX_SIZE_MB = 1000
+
+
+class BinaryStore(object):
+
+    COMPILE_SCRIPT = "{0}go test -c -cover -o {1} {2}{3}"
+    RUN_SCRIPT = "cd {0} && {1}{2}"
+    PROFILE_FLAG = " -test.coverprofile={0}"
+    RUN_FLAG = " -test.run '{0}'"
+    BINARY_EXTENSION = ".test"
+    NO_TESTS_EXTENSION = ".none"
+    # Bump when the way binaries are built changes.
+    VERSION = 1
+
+    def __init__(self, source, directory=DEFAULT_DIRECTORY,
+                 max_size_mb=DEFAULT_MAX_SIZE_MB):
+        """
+        :param source: GoSource
+        :param directory: string
+        :param max_size_mb: number
+        """
+        self.source = source
+        self.directory = directory
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self._go_version = None
+        self._lock = threading.Lock()
+
+    def key(self, import_path, directory, flags=""):
+        """Build the key a package's test binary is stored under.
+
+        :param import_path: string
+        :param directory: string, the package's directory
+        :param flags: string, passed to go test -c
+        :return: string
+        """
+        # Relative to the project, as GoSource resolves imports, so the key
+        # doesn't depend on where it is checked out.
+        directory = os.path.normpath(os.path.join(
+            self.source.root, os.path.relpath(directory, self.source.root)))
+        dirs = self.source.imported_dirs([directory])
+        key = json.dumps([self.VERSION,
+                          import_path,
+                          self.source.project_type,
+                          self.source.fingerprint_dirs(dirs),
+                          self.go_version(),
+                          flags])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def find(self, key):
+        """Look up a stored binary, marking it as recently used.
+
+        :param key: string
+        :return: (string or None, bool), the binary and whether the package
+            has no tests, (None, False) if it hasn't been compiled
+        """
+        binary = self._path(key, self.BINARY_EXTENSION)
+        for path, no_tests in [(binary, False),
+                               (self._path(key, self.NO_TESTS_EXTENSION),
+                                True)]:
+            try:
+                os.utime(path, None)
+            except OSError:
+                continue
+            return (None if no_tests else binary), no_tests
+        return None, False
+
+    def compile_script(self, import_path, output, env_prefix="", flags=""):
+        """
+        :param import_path: string
+        :param output: string, from `new_output`
+        :param env_prefix: string, e.g. GOPATH=x
+        :param flags: string, e.g. " -vet=all"
+        :return: string
+        """
+        return self.COMPILE_SCRIPT.format(env_prefix, output, import_path,
+                                          flags)
+
+    def run_script(self, binary, directory, profile_path=None, run=None):
+        """Run a binary's tests from its package's directory, as go test does.
+
+        :param binary: string
+        :param directory: string
+        :param profile_path: string, the coverage profile is written here
+        :param run: string, a -run pattern, None for every test
+        :return: string
+        """
+        flags = ""
+        if profile_path is not None:
+            flags += self.PROFILE_FLAG.format(profile_path)
+        if run is not None:
+            flags += self.RUN_FLAG.format(run)
+        return self.RUN_SCRIPT.format(directory, os.path.abspath(binary),
+                                      flags)
+
+    def new_output(self):
+        """Return a path in the directory for go test -c to write to.
+
+        :return: string
+        """
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # Made by another worker in the meantime.
+                pass
+        fd, output = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        return output
+
+    def store(self, key, output, no_tests):
+        """Store a compiled binary under its key.
+
+        Renamed into place, so concurrent runs never see a partial binary.
+
+        :param key: string
+        :param output: string, from `new_output`
+        :param no_tests: bool, whether go test -c found no test files
+        :return: string or None, the binary, None if there are no tests
+        """
+        if no_tests:
+            os.remove(output)
+            path = self._path(key, self.NO_TESTS_EXTENSION)
+            output = self.new_output()
+        else:
+            path = self._path(key, self.BINARY_EXTENSION)
+            # Created 0600 by mkstemp, in case it was written into in place.
+            os.chmod(output, 0o755)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                pass
+        os.rename(output, path)
+        return None if no_tests else path
+
+    def discard(self, output):
+        """Remove the output of a compile which failed.
+
+        :param output: string, from `new_output`
+        """
+        try:
+            os.remove(output)
+        except OSError:
+            pass
+
+    def prune(self):
+        """Remove the least recently used binaries until under the size limit.
+
+        :return: int, number of files removed
+        """
+        return prune_directory(self.directory, self.max_size)
+
+    def go_version(self):
+        """
+        :return: string, as reported by `go version`
+        """
+        with self._lock:
+            if self._go_version is None:
+                try:
+                    p = subprocess.Popen(["go", "version"],
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE,
+                                         universal_newlines=True)
+                    self._go_version = p.communicate()[0].strip()
+                except OSError:
+                    # Compiling fails too, nothing is stored.
+                    self._go_version = ""
+        return self._go_version
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, key[:2], key + extension)
+
+
+def get_binaries(config, source):
+    """Build the test binary store described by the config, if any.
+
+    Enabled by the optional `code_coverage: binaries` section.
+
+    :param config: Config
+    :param source: GoSource
+    :return: BinaryStore or None
+    """
+    binaries = config.code_coverage.binaries
+    if binaries is None:
+        return None
+    return BinaryStore(
+        source,
+        directory=binaries.directory or DEFAULT_DIRECTORY,
+        max_size_mb=binaries.max_size_mb or DEFAULT_MAX_SIZE_MB)
@@ -1,10 +1,16 @@
-import subprocess
 import logging
 import re
 import os
 
+from go_processes.coverage_profile import ProfileRun
+from go_processes.diagnostics import REGEX_POSITION, Diagnostic, \
+    parse_diagnostic, render_text, report
+from go_processes.flaky_tests import OUTCOME_PASSED, REGEX_FAILED_TEST, \
+    failed_tests, run_pattern
+from go_processes.process import StreamingProcess, json_objects
+from go_processes.vet_handoff import split_vet_output
+
 
-logging.basicConfig(level="INFO")
 LOGGER = logging.getLogger(__name__)
 
 
@@ -17,6 +23,9 @@ class CodeCoverage:
     REGEX_PATTERN_PACKAGE_GB = "\s(([a-zA-Z\/-]+(\/[a-zA-Z\/-]+)?))"
     REGEX_PATTERN_COVERAGE = "[0-9]{1,3}.[0-9]%"
     REGEX_PATTERN_FAIL = "^FAIL"
+    # A package's own line, rather than the output of its tests.
+    REGEX_PATTERN_RESULT = re.compile(r"^(ok|FAIL|\?)\s")
+    REGEX_PATTERN_ELAPSED = re.compile(r"\t([0-9]+\.[0-9]+)s(?:\t|$)")
 
     SCRIPTS = {
         "glide": "go test `go list ./... | grep -v vendor` -cover",
@@ -24,8 +33,68 @@ class CodeCoverage:
             os.environ.get("GOPATH", None))
     }
 
-    def __init__(self, config):
+    LIST_SCRIPT = "go list -e -json {0}/..."
+    LIST_SCRIPTS = {
+        "glide": "go list -e -json ./...",
+        "gb": "GOPATH={0} go list -e -json ./src/...".format(
+            os.environ.get("GOPATH", None))
+    }
+    JSON_TEST_SCRIPT = "go test -json -cover {0}"
+    RETRY_SCRIPT = "{0}go test -count=1 -run '{1}' {2}"
+    JSON_FINAL_ACTIONS = ["pass", "fail", "skip"]
+    JSON_RUN_ACTION = "run"
+    VET_FLAG = " -vet=all"
+
+    COVERAGE_PREFIX = "coverage: "
+
+    STATUS_PASS = "PASS"
+    STATUS_FAIL = "FAIL"
+    STATUS_NO_TESTS = "NO TESTS"
+
+    TOOL = "code_coverage"
+    EXECUTABLE = "go"
+
+    def __init__(self, config, cache=None, fail_fast=False, jobs=1,
+                 vet_handoff=None, slow_tests=None, trend=None,
+                 binaries=None, flaky=None):
+        """
+        :param config: Config
+        :param cache: ResultCache, optional
+        :param fail_fast: bool, stop the tests on the first failing package
+        :param jobs: int, packages tested at once in profile mode
+        :param vet_handoff: VetHandoff, optional, packages it expects are
+            vetted by go test and the output handed over to go vet
+        :param slow_tests: SlowTests, optional, records how long each
+            package and test took
+        :param trend: CoverageTrend, optional, records each package's
+            coverage and fails those which dropped from the baseline
+        :param binaries: BinaryStore, optional, in profile mode each
+            package's tests are compiled once and the binary reused
+        :param flaky: FlakyTests, optional, the failed tests of a package
+            are retried and their outcomes recorded
+        """
         self.config = config
+        self.cache = cache
+        self.fail_fast = fail_fast
+        self.jobs = jobs
+        self.vet_handoff = vet_handoff
+        self.slow_tests = slow_tests
+        self.trend = trend
+        self.binaries = binaries
+        self.flaky = flaky
+        # The merged coverage profile, set after a run in profile mode.
+        self.profile = None
+        self._import_paths = {}
+        # Directory of each package listed by go list, by import path.
+        self._package_dirs = {}
+        # (import path, [test]) of each failed package, for retries.
+        self._failed_tests = {}
+        # Tests started but not finished, by import path, in json mode.
+        self._running = {}
+        # Import paths go test was given in json mode.
+        self._listed = []
+        # Why go list didn't list the packages, None if it did.
+        self._list_error = None
 
     def get_coverage(self, base_package, has_error):
         """Run go test -cover, parses the output line by line.
@@ -34,71 +103,514 @@ class CodeCoverage:
         Threshold taken from config.code_coverage.threshold
             must be of type float (e.g 50.0)
 
+        Passing results are cached when a cache is given, failures are
+        always rerun in case they were flaky.
+
+        go test is stopped after config.code_coverage.timeout seconds, or
+        when the run's deadline passes. The packages reported by then still
+        count, running out of time fails the build.
+
+        With a trend, a package whose coverage dropped too far from the
+        baseline fails, cached results included.
+
+        With flaky tests, the tests which failed in a package are rerun once
+        go test has finished, so the failed packages are reported last and
+        fail fast only stops on a failure that survived its retries. The
+        package passes, with the coverage of its first run, if they all pass
+        on a retry or are quarantined.
+
+        When the vet handoff expects the package, go test vets it and the
+        vet output is published rather than reported here. The handoff is
+        left for the caller to abandon if the tests weren't run through.
+
         :param base_package: string
         :param has_error: bool
         :return: bool
         """
+        cache_key = self.cache_key(base_package)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            # Only passing runs are cached, all they can fail on is a drop.
+            dropped = [self._record_trend(base_package, package, coverage,
+                                          elapsed)
+                       for package, (coverage, elapsed)
+                       in sorted(cached["packages"].items())]
+            dropped = [diagnostic for diagnostic in dropped if diagnostic]
+            self._log_results(bool(dropped), cached["total_coverage"],
+                              dropped)
+            report(dropped)
+            return True if dropped else has_error
+
         err = False
-        output = ""
-        out, err = self._run_tests(base_package)
+        diagnostics = []
+
+        if self.config.code_coverage.profile:
+            process = self._run_profiles(base_package)
+            results = self._parse_profiles(process, base_package)
+        elif self.config.code_coverage.json:
+            process = self._run_json_tests(base_package)
+            results = self._parse_json(process, base_package)
+        else:
+            process = self._run_tests(base_package)
+            results = self._parse_text(process, base_package)
+
+        # Looked up once rather than for every package reported.
+        ignored = self.config.code_coverage.ignored
+        threshold = self.config.code_coverage.threshold
+        coverage_count = 0
+        coverage_cum = 0.0
+        counted = []
+        # package to (coverage, elapsed), cached for the trend
+        covered = {}
+        stopped = False
+
+        if self.flaky is not None:
+            results = self._retry_failed(base_package, results, diagnostics)
+
+        # Parsed as the lines arrive, each package is reported as soon as
+        # go test prints it.
+        for package, status, coverage, elapsed in results:
+
+            if elapsed is not None and self.slow_tests is not None:
+                self.slow_tests.add_package(package, elapsed)
+
+            if status == self.STATUS_FAIL:
+                LOGGER.debug("{0}: FAIL".format(package))
+                diagnostics.append(Diagnostic(
+                    self.TOOL, base_package, "{0} FAILED.".format(package),
+                    rule="failed"))
+                err = True
+                if self.fail_fast:
+                    LOGGER.info("Stopping tests early, fail fast is enabled")
+                    process.kill()
+                    stopped = True
+                    break
+                continue
+
+            if ignored.matches(package):
+                continue
+
+            if coverage:
+                # Allow to be passed through as none
+                # See `elif status == self.STATUS_NO_TESTS`
+                cv = float(coverage[:-1])
+                if cv < threshold:
+                    err = True
+                    diagnostics.append(Diagnostic(
+                        self.TOOL, base_package,
+                        "{0} under coverage threshold at {1}".format(
+                            package, coverage),
+                        rule="threshold"))
+
+                coverage_cum += cv
+                covered[package] = (cv, elapsed)
+                dropped = self._record_trend(base_package, package, cv,
+                                             elapsed)
+                if dropped:
+                    err = True
+                    diagnostics.append(dropped)
+                LOGGER.debug("{0}: {1}{2}".format(
+                    package, coverage, self._format_elapsed(elapsed)))
+
+            elif status == self.STATUS_NO_TESTS:
+                err = True
+                diagnostics.append(Diagnostic(
+                    self.TOOL, base_package,
+                    "{0} has no tests.".format(package), rule="no_tests"))
+                LOGGER.debug("{0}: no tests".format(package))
 
-        if err and err is not "\n":
-            LOGGER.info(err)
+            coverage_count += 1
+            counted.append(package)
+
+        if process.timed_out:
+            LOGGER.info("Stopping tests, out of time")
+            diagnostics += self._timed_out_diagnostics(base_package)
+            err = True
+            stopped = True
+
+        if self._list_error is not None:
+            # Nothing was tested, rather than there being nothing to test.
+            diagnostics.append(self._list_error)
+            err = True
+            stopped = True
+
+        stderr = process.other
+        if self._vet_flag(base_package) and not stopped:
+            vet_output, stderr = split_vet_output(stderr)
+            self.vet_handoff.publish(base_package, vet_output)
+        if stderr.strip():
+            LOGGER.info(stderr)
+            # Build errors, only those pointing at the source are kept.
+            diagnostics += [
+                parse_diagnostic(self.TOOL, base_package, line, "build")
+                for line in stderr.splitlines() if REGEX_POSITION.match(line)]
+            err = True
             has_error = True
 
+        report(diagnostics)
+
+        if coverage_count == 0:
+            if not stopped:
+                LOGGER.info("No packages available for coverage calculation")
+            if err:
+                # Every package failed, e.g. go test's vet stopped the build.
+                LOGGER.info(render_text(diagnostics))
+            return err if err and not has_error else has_error
+
+        if self.config.code_coverage.profile:
+            # Weighted by statements rather than averaging the packages.
+            self.profile = process.profile
+            total_coverage = round(self.profile.coverage(
+                self._import_paths[package] for package in counted), 2)
+        else:
+            total_coverage = round(coverage_cum / coverage_count, 2)
+
+        self._log_results(err, total_coverage, diagnostics)
+
+        if cache_key and not err:
+            self.cache.put(cache_key, {"err": err,
+                                       "total_coverage": total_coverage,
+                                       "packages": covered})
+
+        return err if err and not has_error else has_error
+
+    def _record_trend(self, base_package, package, coverage, elapsed):
+        """Add a package's coverage to the trend, if there is one.
+
+        :param base_package: string
+        :param package: string
+        :param coverage: float
+        :param elapsed: float or None
+        :return: Diagnostic, None if the package doesn't fail
+        """
+        if self.trend is None:
+            return None
+        dropped = self.trend.add(package, coverage, elapsed)
+        if not dropped:
+            return None
+        return Diagnostic(self.TOOL, base_package, dropped,
+                          rule="coverage_drop")
+
+    def _retry_failed(self, base_package, results, diagnostics):
+        """Yield the results, retrying the failed packages once the others
+        have all been reported.
+
+        The retries wait until go test has exited, rather than starting
+        while it still holds its slot in the process limiter, which with a
+        single slot they would wait on forever.
+
+        :param base_package: string
+        :param results: generator of (package, status, coverage, elapsed)
+        :param diagnostics: [Diagnostic], the flaky and quarantined tests
+            are added to it
+        :return: generator of (package, status, coverage, elapsed)
+        """
+        failed = []
+        for package, status, coverage, elapsed in results:
+            if status == self.STATUS_FAIL:
+                failed.append((package, coverage, elapsed))
+                continue
+            yield package, status, coverage, elapsed
+
+        # The results are exhausted, so go test has been waited on.
+        for package, coverage, elapsed in failed:
+            status, retried = self._retry(base_package, package)
+            diagnostics += retried
+            yield package, status, coverage, elapsed
+
+    def _retry(self, base_package, package):
+        """Rerun the tests which failed in a package.
+
+        :param base_package: string
+        :param package: string
+        :return: (string, [Diagnostic]), the package's status after the
+            retries and the tests which were flaky or quarantined
+        """
+        import_path, tests = self._failed_tests.pop(package, (None, []))
+        if not tests:
+            # It didn't build, or failed outside of a test.
+            return self.STATUS_FAIL, []
+
+        failing = self.flaky.retry(
+            import_path, tests,
+            lambda retried: self._rerun(base_package, import_path, retried))
+        quarantined = [test for test in failing
+                       if self.flaky.is_quarantined(import_path, test)]
+
+        diagnostics = [Diagnostic(
+            self.TOOL, base_package,
+            "{0} {1} is flaky, it passed on a retry.".format(package, test),
+            rule="flaky") for test in tests if test not in failing]
+        diagnostics += [Diagnostic(
+            self.TOOL, base_package,
+            "{0} {1} failed, it is quarantined as flaky.".format(
+                package, test),
+            rule="quarantined") for test in quarantined]
+
+        if len(quarantined) == len(failing):
+            return self.STATUS_PASS, diagnostics
+        return self.STATUS_FAIL, diagnostics
+
+    def _rerun(self, base_package, import_path, tests):
+        """Run some of a package's tests again.
+
+        A stored test binary is run where there is one, otherwise go test.
+
+        :param base_package: string
+        :param import_path: string
+        :param tests: [string]
+        :return: [string], those which failed again
+        """
+        pattern = run_pattern(tests)
+        binary = None
+        directory = self._package_dirs.get(import_path)
+        if self.binaries is not None and directory is not None:
+            binary, _ = self.binaries.find(self.binaries.key(
+                import_path, directory, self._vet_flag(base_package)))
+        if binary is not None:
+            script = self.binaries.run_script(binary, directory, run=pattern)
+        else:
+            script = self.RETRY_SCRIPT.format(self._env_prefix(), pattern,
+                                              import_path)
+        LOGGER.debug("Retry script: {0}".format(script))
+
+        process = StreamingProcess(script,
+                                   timeout=self.config.code_coverage.timeout,
+                                   heavy=True)
+        failed = failed_tests(process)
+        if process.returncode == 0:
+            return []
+        # Without a test to blame, e.g. a panic, none of them passed.
+        return failed or list(tests)
+
+    def _env_prefix(self):
+        """Return what go test needs in its environment, GOPATH for gb.
+
+        :return: string
+        """
+        if self.config.all.project_type == "gb":
+            return "GOPATH={0} ".format(os.environ.get("GOPATH", None))
+        return ""
+
+    def _timed_out_diagnostics(self, base_package):
+        """Describe what was running when the tests ran out of time.
+
+        :param base_package: string
+        :return: [Diagnostic]
+        """
+        diagnostics = [Diagnostic(
+            self.TOOL, base_package,
+            "{0} ran out of time.".format(base_package), rule="timeout")]
+        for import_path, tests in sorted(self._running.items()):
+            for test in sorted(tests):
+                diagnostics.append(Diagnostic(
+                    self.TOOL, base_package,
+                    "{0} {1} was still running.".format(import_path, test),
+                    rule="timeout"))
+        return diagnostics
+
+    def _parse_text(self, process, base_package):
+        """Parse the plain text output of go test -cover.
+
+        :param process: iterable of string, the output lines
+        :param base_package: string
+        :return: generator of (package, status, coverage, elapsed)
+        """
         package_pattern, coverage_pattern = \
             self._get_regex_patterns(base_package)
+        # Printed before the package they belong to.
+        failed = []
+        failed_coverage = None
 
-        coverage_count = 0
-        coverage_cum = 0.0
+        for line in process:
 
-        lines = out.split('\n')
-        for line in lines:
+            test = REGEX_FAILED_TEST.match(line)
+            if test:
+                failed.append(test.group(1))
+                continue
+            if line.startswith(self.COVERAGE_PREFIX):
+                # On a line of its own when a package fails.
+                failed_coverage = self._find_coverage(line)
+                continue
 
+            if not self.REGEX_PATTERN_RESULT.match(line):
+                # e.g. a test's log, which the gb pattern can match too.
+                continue
             package = re.search(package_pattern, line)
 
             if package is None:
                 continue
             package = package.group().strip()
+            elapsed = self.REGEX_PATTERN_ELAPSED.search(line)
+            elapsed = float(elapsed.group(1)) if elapsed else None
 
             if re.match(self.REGEX_PATTERN_FAIL, line):
-                output += "{0} FAILED.\n".format(package)
-                err = True
-                continue
-
-            if package in self.config.code_coverage.ignored_packages:
+                self._failed_tests[package] = (line.split()[1], failed)
+                yield package, self.STATUS_FAIL, failed_coverage, elapsed
+                failed, failed_coverage = [], None
                 continue
+            failed, failed_coverage = [], None
 
             coverage = re.search(coverage_pattern, line)
-
             if coverage:
-                # Allow to be passed through as none
-                # See `elif "[no test files]"`
-                coverage = coverage.group(0)
+                yield package, self.STATUS_PASS, coverage.group(0), elapsed
+            elif self.NOTESTFILES_IDENTIFIER in line:
+                yield package, self.STATUS_NO_TESTS, None, elapsed
+            else:
+                yield package, self.STATUS_PASS, None, elapsed
 
-                cv = float(coverage[:-1])
-                if cv < self.config.code_coverage.threshold:
-                    err = True
-                    output += "{0} under coverage threshold at {1}\n".format(
-                        package, coverage)
+    def _parse_json(self, process, base_package):
+        """Decode the event stream written by go test -json.
 
-                coverage_cum += cv
+        A package is reported once its final pass, fail or skip event
+        arrives. Test events are only used to time the tests and to know
+        which were running if go test runs out of time. A listed package
+        without a final event, e.g. one which didn't build, fails.
 
-            elif self.NOTESTFILES_IDENTIFIER in line:
-                err = True
-                output += "{0} has no tests.\n".format(package)
+        Package names are run through the same pattern as the text output,
+        so `ignored_packages` and the report look the same in both modes.
 
-            coverage_count += 1
+        :param process: iterable of string, the output lines
+        :param base_package: string
+        :return: generator of (package, status, coverage, elapsed)
+        """
+        package_pattern, _ = self._get_regex_patterns(base_package)
+        coverages = {}
+        no_tests = set()
+        failed = {}
+        reported = set()
 
-        if coverage_count == 0:
-            LOGGER.info("No packages available for coverage calculation")
-            return has_error
+        self._running = {}
 
-        total_coverage = round(coverage_cum / coverage_count, 2)
+        for event in json_objects(process):
+            import_path = event.get("Package")
+            if not import_path:
+                continue
+            if event.get("Test"):
+                self._track_test(import_path, event)
+                if event.get("Action") == "fail" \
+                        and "/" not in event["Test"]:
+                    failed.setdefault(import_path, []).append(event["Test"])
+                continue
 
-        self._log_results(err, total_coverage, output)
+            action = event.get("Action")
+            if action == "output":
+                text = event.get("Output", "")
+                coverage = self._find_coverage(text)
+                if coverage:
+                    coverages[import_path] = coverage
+                if self.NOTESTFILES_IDENTIFIER in text:
+                    no_tests.add(import_path)
+                continue
 
-        return err if err and not has_error else has_error
+            if action not in self.JSON_FINAL_ACTIONS:
+                continue
+
+            reported.add(import_path)
+            package = package_pattern.search("\t" + import_path)
+            package = package.group().strip() if package else import_path
+
+            if action == "fail":
+                status = self.STATUS_FAIL
+                self._failed_tests[package] = (import_path,
+                                               failed.pop(import_path, []))
+            elif import_path in no_tests:
+                status = self.STATUS_NO_TESTS
+            else:
+                status = self.STATUS_PASS
+
+            yield (package, status, coverages.pop(import_path, None),
+                   event.get("Elapsed"))
+
+        if process.timed_out:
+            # Those left were stopped rather than failed.
+            return
+        for import_path in self._listed:
+            if import_path in reported:
+                continue
+            # go test writes `FAIL\t<package> [build failed]` as plain
+            # text rather than as an event.
+            package = package_pattern.search("\t" + import_path)
+            package = package.group().strip() if package else import_path
+            self._failed_tests[package] = (import_path, [])
+            yield package, self.STATUS_FAIL, None, None
+
+    def _track_test(self, import_path, event):
+        """Keep track of a test event from go test -json.
+
+        :param import_path: string
+        :param event: dict
+        """
+        test, action = event["Test"], event.get("Action")
+        if action == self.JSON_RUN_ACTION:
+            self._running.setdefault(import_path, set()).add(test)
+        elif action in self.JSON_FINAL_ACTIONS:
+            self._running.get(import_path, set()).discard(test)
+            if self.slow_tests is not None \
+                    and event.get("Elapsed") is not None:
+                self.slow_tests.add_test(import_path, test, event["Elapsed"])
+            if action == "pass" and self.flaky is not None \
+                    and "/" not in test:
+                self.flaky.add(import_path, test, OUTCOME_PASSED)
+
+    def _parse_profiles(self, process, base_package):
+        """Report the results of each package tested in profile mode.
+
+        Package names are run through the same pattern as the text output,
+        so `ignored_packages` and the report look the same in all modes.
+
+        :param process: ProfileRun
+        :param base_package: string
+        :return: generator of (package, status, coverage, elapsed)
+        """
+        package_pattern, _ = self._get_regex_patterns(base_package)
+        self._import_paths = {}
+
+        for import_path, status, coverage, elapsed in process:
+            package = package_pattern.search("\t" + import_path)
+            package = package.group().strip() if package else import_path
+            self._import_paths[package] = import_path
+            if status == self.STATUS_FAIL:
+                self._failed_tests[package] = (
+                    import_path, process.failed_tests.get(import_path, []))
+            yield package, status, coverage, elapsed
+
+    def _find_coverage(self, text):
+        """Return the coverage in a line of output, e.g. `75.0%`.
+
+        :param text: string
+        :return: string or None
+        """
+        start = text.find(self.COVERAGE_PREFIX)
+        if start == -1:
+            return None
+        start += len(self.COVERAGE_PREFIX)
+        end = text.find("%", start)
+        if end == -1:
+            return None
+        return text[start:end + 1]
+
+    @staticmethod
+    def _format_elapsed(elapsed):
+        return "" if elapsed is None else " in {0}s".format(elapsed)
+
+    def cache_key(self, base_package):
+        """Return the cache key for a package, None if caching is disabled.
+
+        Whether go test vets the package is part of the key, a run which
+        did hands its vet output over and a cached result has none.
+
+        :param base_package: string
+        :return: string or None
+        """
+        if self.cache is None or self.config.code_coverage.profile:
+            # A cache hit has no profile to contribute to the merged one.
+            return None
+        return self.cache.key(self.TOOL, self.EXECUTABLE, base_package,
+                              [self.config.all.project_type,
+                               self.config.code_coverage,
+                               self._vet_flag(base_package)],
+                              testdata=True)
 
     def _get_regex_patterns(self, base_package):
         """Return compiled regex patterns.
@@ -136,32 +648,124 @@ class CodeCoverage:
         is present. The `vendor` directory is automatically
         excluded.
 
-        The script is then ran, and the results are
-        returned.
+        The script is then started, its output is read
+        by iterating over the returned process.
 
         :param package: string
-        :return: (stdout, stderr)
+        :return: StreamingProcess, iterates over stdout
         """
         if package == self.ALLIDENTIFIER:
             test_script = self.SCRIPTS[self.config.all.project_type]
         else:
             test_script = "go test {0}/... -cover".format(package)
+        test_script += self._vet_flag(package)
         LOGGER.debug("Test script: {0}".format(test_script))
 
-        p = subprocess.Popen(
-            [test_script],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True)
+        return StreamingProcess(test_script,
+                                timeout=self.config.code_coverage.timeout,
+                                heavy=True)
+
+    def _run_json_tests(self, package):
+        """Run the GoLang tests with go test -json.
+
+        The packages to test come from a single go list -json call,
+        vendored packages are left out.
+
+        :param package: string
+        :return: StreamingProcess, iterates over stdout
+        """
+        import_paths = self._list_packages(package)
+        self._listed = import_paths
+
+        if not import_paths:
+            # Without packages go test would test the working directory.
+            return StreamingProcess("true")
+
+        test_script = self.JSON_TEST_SCRIPT.format(" ".join(import_paths)) \
+            + self._vet_flag(package)
+        if self.config.all.project_type == "gb":
+            test_script = "GOPATH={0} {1}".format(
+                os.environ.get("GOPATH", None), test_script)
+        LOGGER.debug("Test script: {0}".format(test_script))
+
+        return StreamingProcess(test_script,
+                                timeout=self.config.code_coverage.timeout,
+                                heavy=True)
+
+    def _run_profiles(self, package):
+        """Run the GoLang tests of each package with -coverprofile.
 
-        return p.communicate()
+        Packages are tested in parallel, their profiles are merged as each
+        one finishes. With test binaries, their stored binaries are run.
 
-    def _log_results(self, err, total_coverage, output):
+        :param package: string
+        :return: ProfileRun
+        """
+        return ProfileRun(self._list_packages(package), self.jobs,
+                          self._env_prefix(),
+                          self._vet_flag(package),
+                          self.config.code_coverage.timeout,
+                          self.binaries, self._package_dirs)
+
+    def _vet_flag(self, package):
+        """Return the go test flag vetting a package, if its output is wanted.
+
+        :param package: string
+        :return: string, empty if go vet will run itself
+        """
+        if self.vet_handoff is not None and self.vet_handoff.expects(package):
+            return self.VET_FLAG
+        return ""
+
+    def _list_packages(self, package):
+        """List the packages under a base package with go list -json.
+
+        Vendored packages are left out. If go list runs out of time or
+        fails nothing is listed, and the reason is kept for get_coverage.
+
+        :param package: string
+        :return: [string], import paths
+        """
+        if package == self.ALLIDENTIFIER:
+            list_script = self.LIST_SCRIPTS[self.config.all.project_type]
+        else:
+            list_script = self.LIST_SCRIPT.format(package)
+        LOGGER.debug("List script: {0}".format(list_script))
+
+        self._list_error = None
+        process = StreamingProcess(list_script)
+        import_paths = []
+        for listed in json_objects(process):
+            import_path = listed.get("ImportPath", "")
+            if import_path.startswith("vendor/") \
+                    or "/vendor/" in import_path:
+                continue
+            import_paths.append(import_path)
+            if listed.get("Dir"):
+                self._package_dirs[import_path] = listed["Dir"]
+
+        if process.timed_out:
+            self._list_error = Diagnostic(
+                self.TOOL, package, "go list ran out of time.",
+                rule="timeout")
+        elif process.returncode != 0:
+            self._list_error = Diagnostic(
+                self.TOOL, package, "go list failed: {0}".format(
+                    process.other.strip()), rule="build")
+        if self._list_error is not None:
+            # What was listed may be incomplete, none of it is tested.
+            return []
+        return import_paths
+
+    def _log_results(self, err, total_coverage, diagnostics):
         """Log the coverage results.
 
+        The diagnostics are logged even when the run passed, they can be
+        tests which were flaky or quarantined.
+
         :param err: bool
         :param total_coverage: float
-        :param output: string
+        :param diagnostics: [Diagnostic]
         :return:
         """
         LOGGER.info("CODE COVERAGE: FAIL") if err \
@@ -171,5 +775,5 @@ class CodeCoverage:
         LOGGER.info("Coverage threshold: {0}%"
                     .format(str(self.config.code_coverage.threshold)))
 
-        if err:
-            LOGGER.info(output)
+        if diagnostics:
+            LOGGER.info(render_text(diagnostics))
@@ -0,0 +1,366 @@
+"""Coverage profile package.
+
+Parses and merges the profiles written by `go test -coverprofile`. Blocks
+are held column-wise in arrays rather than as parsed lines or objects, and
+each block's position is packed into a single integer key, so profiles with
+hundreds of thousands of blocks can be merged without keeping any of their
+text around.
+
+Coverage is weighted by statement count, as `go tool cover` reports it,
+rather than averaging per package percentages.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from go_processes.flaky_tests import REGEX_FAILED_TEST
+from go_processes.process import StreamingProcess, current_usage, \
+    time_left, track_usage
+
+MODE_PREFIX = "mode: "
+MODE_SET = "set"
+
+
+class CoverageProfile(object):
+
+    def __init__(self, mode=None):
+        self.mode = mode
+        self.files = []
+        self._file_ids = {}
+        self._blocks = {}
+        self._file = array("i")
+        self._start_line = array("i")
+        self._start_col = array("i")
+        self._end_line = array("i")
+        self._end_col = array("i")
+        self._statements = array("i")
+        self._counts = array("q")
+
+    def __len__(self):
+        return len(self._counts)
+
+    def read(self, lines):
+        """Merge a profile into this one.
+
+        :param lines: iterable of string, e.g. an open profile file
+        """
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            if line.startswith(MODE_PREFIX):
+                self._set_mode(line[len(MODE_PREFIX):])
+                continue
+
+            # name.go:line.column,line.column statements count
+            name, _, rest = line.rpartition(":")
+            position, statements, count = rest.split(" ")
+            start, end = position.split(",")
+            start_line, start_col = start.split(".")
+            end_line, end_col = end.split(".")
+            self.add(name, int(start_line), int(start_col), int(end_line),
+                     int(end_col), int(statements), int(count))
+
+    def add(self, name, start_line, start_col, end_line, end_col,
+            statements, count):
+        """Add a block, merging it with an existing block at that position.
+
+        :param name: string, the file's import path
+        """
+        file_id = self._file_ids.get(name)
+        if file_id is None:
+            file_id = self._file_ids[name] = len(self.files)
+            self.files.append(name)
+
+        if start_col < 1 << 16 and end_col < 1 << 16:
+            key = ((((file_id << 24 | start_line) << 16 | start_col) << 24
+                    | end_line) << 16 | end_col)
+        else:
+            # Generated code can have very long lines, fall back to a tuple.
+            key = (file_id, start_line, start_col, end_line, end_col)
+        index = self._blocks.get(key)
+        if index is None:
+            self._blocks[key] = len(self._counts)
+            self._file.append(file_id)
+            self._start_line.append(start_line)
+            self._start_col.append(start_col)
+            self._end_line.append(end_line)
+            self._end_col.append(end_col)
+            self._statements.append(statements)
+            self._counts.append(count)
+        elif self.mode == MODE_SET:
+            self._counts[index] = max(self._counts[index], count)
+        else:
+            self._counts[index] += count
+
+    def merge(self, other):
+        """Merge another profile's blocks into this one.
+
+        :param other: CoverageProfile
+        """
+        if other.mode is not None:
+            self._set_mode(other.mode)
+        for i in range(len(other)):
+            self.add(other.files[other._file[i]], other._start_line[i],
+                     other._start_col[i], other._end_line[i],
+                     other._end_col[i], other._statements[i],
+                     other._counts[i])
+
+    def write(self, f):
+        """Write the profile in the format go tool cover reads.
+
+        :param f: file object
+        """
+        f.write("{0}{1}\n".format(MODE_PREFIX, self.mode or MODE_SET))
+        for i in range(len(self._counts)):
+            f.write("{0}:{1}.{2},{3}.{4} {5} {6}\n".format(
+                self.files[self._file[i]], self._start_line[i],
+                self._start_col[i], self._end_line[i], self._end_col[i],
+                self._statements[i], self._counts[i]))
+
+    def file_statements(self):
+        """Return the covered and total statements of each file.
+
+        :return: dict of file to (covered, total)
+        """
+        covered = [0] * len(self.files)
+        total = [0] * len(self.files)
+        for file_id, statements, count in zip(
+                self._file, self._statements, self._counts):
+            total[file_id] += statements
+            if count > 0:
+                covered[file_id] += statements
+        return dict((name, (covered[i], total[i]))
+                    for i, name in enumerate(self.files))
+
+    def package_statements(self):
+        """Return the covered and total statements of each package.
+
+        :return: dict of import path to (covered, total)
+        """
+        packages = {}
+        for name, (covered, total) in self.file_statements().items():
+            package = name.rsplit("/", 1)[0]
+            package_covered, package_total = packages.get(package, (0, 0))
+            packages[package] = (package_covered + covered,
+                                 package_total + total)
+        return packages
+
+    def coverage(self, packages=None):
+        """Return the statement weighted coverage percentage.
+
+        :param packages: iterable of import paths to include, all if None
+        :return: float
+        """
+        statements = self.package_statements()
+        if packages is not None:
+            packages = set(packages)
+            statements = dict((p, s) for p, s in statements.items()
+                              if p in packages)
+        return percentage(*_sum_statements(statements.values()))
+
+    def _set_mode(self, mode):
+        if self.mode is None:
+            self.mode = mode
+        elif self.mode != mode:
+            raise ValueError("Cannot merge {0} and {1} coverage profiles"
+                             .format(self.mode, mode))
+
+
+def percentage(covered, total):
+    """Return covered / total as a percentage, 0 when there's nothing.
+
+    :return: float
+    """
+    return 100.0 * covered / total if total else 0.0
+
+
+def _sum_statements(statements):
+    covered = total = 0
+    for package_covered, package_total in statements:
+        covered += package_covered
+        total += package_total
+    return covered, total
+
+
+class ProfileRun(object):
+    """Runs go test -coverprofile for each package on a pool of workers.
+
+    Iterating yields each package's results in the order given, as soon as
+    it is available. The profiles are merged into `profile` as they arrive.
+
+    Given a `BinaryStore`, each package's tests are compiled once, or taken
+    from the store, and the binary is run rather than go test.
+
+    The tests which failed in each package are kept in `failed_tests`.
+    """
+
+    PROFILE_SCRIPT = "{0}go test -cover -coverprofile={1} {2}{3}"
+    NOTESTFILES_IDENTIFIER = "[no test files]"
+
+    STATUS_PASS = "PASS"
+    STATUS_FAIL = "FAIL"
+    STATUS_NO_TESTS = "NO TESTS"
+
+    def __init__(self, import_paths, jobs, env_prefix="", flags="",
+                 timeout=None, binaries=None, directories=None):
+        """
+        :param import_paths: [string]
+        :param jobs: int, number of packages tested at once
+        :param env_prefix: string, prepended to each script, e.g. GOPATH=x
+        :param flags: string, appended to each script, e.g. " -vet=all"
+        :param timeout: float, seconds all of the packages must be tested
+            in, those still running or waiting to start then fail
+        :param binaries: BinaryStore, optional
+        :param directories: dict of import path to directory, packages
+            without one are tested with go test
+        """
+        self.import_paths = import_paths
+        # Per package profiles are written here, then merged and removed.
+        self.directory = tempfile.mkdtemp()
+        self.profile = CoverageProfile()
+        self._other = []
+        # import path to [test]
+        self.failed_tests = {}
+        self._processes = {}
+        self._killed = False
+        # Whether any package ran out of time.
+        self.timed_out = False
+        self._deadline = None if timeout is None else time.time() + timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self._env_prefix = env_prefix
+        self._flags = flags
+        self._binaries = binaries
+        self._directories = directories or {}
+        # Workers account their processes to the step that started the run.
+        self._usage = current_usage()
+        self._futures = [self._executor.submit(self._test, i, import_path)
+                         for i, import_path in enumerate(import_paths)]
+
+    def __iter__(self):
+        """Yield the results of each package.
+
+        :return: generator of (import path, status, coverage, elapsed)
+        """
+        for import_path, future in zip(self.import_paths, self._futures):
+            if self._killed:
+                break
+            status, profile_path, elapsed = future.result()
+            coverage = None
+            if profile_path is not None:
+                with open(profile_path, "r") as f:
+                    package_profile = CoverageProfile()
+                    package_profile.read(f)
+                os.remove(profile_path)
+                self.profile.merge(package_profile)
+                # Kept for failed packages too, in case a retry passes.
+                if status != self.STATUS_NO_TESTS:
+                    coverage = "{0:.1f}%".format(
+                        package_profile.coverage([import_path]))
+            yield import_path, status, coverage, elapsed
+        self._close()
+
+    @property
+    def other(self):
+        return "".join(self._other)
+
+    def kill(self):
+        """Stop testing, killing the packages currently running."""
+        self._killed = True
+        for future in self._futures:
+            future.cancel()
+        for process in list(self._processes.values()):
+            process.kill()
+        self._close()
+
+    def _close(self):
+        self._executor.shutdown()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _test(self, index, import_path):
+        if self._killed:
+            return self.STATUS_FAIL, None, None
+        timeout = None
+        if self._deadline is not None:
+            timeout = max(0.0, self._deadline - time.time())
+        if time_left(timeout) == 0:
+            self.timed_out = True
+            return self.STATUS_FAIL, None, None
+        track_usage(self._usage)
+        profile_path = os.path.join(self.directory, "{0}.out".format(index))
+
+        start = time.time()
+        if self._binaries is not None and import_path in self._directories:
+            status = self._test_binary(index, import_path, profile_path,
+                                       timeout)
+        else:
+            status = self._run(index, import_path, self.PROFILE_SCRIPT.format(
+                self._env_prefix, profile_path, import_path, self._flags),
+                timeout)
+        elapsed = round(time.time() - start, 3)
+
+        if not os.path.isfile(profile_path):
+            profile_path = None
+        return status, profile_path, elapsed
+
+    def _test_binary(self, index, import_path, profile_path, timeout):
+        """Run a package's test binary, compiling it first if need be.
+
+        :return: string, the status
+        """
+        directory = self._directories[import_path]
+        key = self._binaries.key(import_path, directory, self._flags)
+        binary, no_tests = self._binaries.find(key)
+        if binary is None and not no_tests:
+            start = time.time()
+            output = self._binaries.new_output()
+            script = self._binaries.compile_script(
+                import_path, output, self._env_prefix, self._flags)
+            status = self._run(index, import_path, script, timeout)
+            if status == self.STATUS_FAIL:
+                self._binaries.discard(output)
+                return status
+            binary = self._binaries.store(key, output,
+                                          status == self.STATUS_NO_TESTS)
+            if timeout is not None:
+                timeout = max(0.0, timeout - (time.time() - start))
+        if binary is None:
+            return self.STATUS_NO_TESTS
+        if self._killed:
+            return self.STATUS_FAIL
+        return self._run(index, import_path, self._binaries.run_script(
+            binary, directory, profile_path), timeout)
+
+    def _run(self, index, import_path, script, timeout):
+        """Run a script, go test or a test binary, to completion.
+
+        :return: string, the status
+        """
+        process = self._processes[index] = StreamingProcess(
+            script, timeout=timeout, heavy=True)
+        no_tests = False
+        failed_tests = []
+        for line in process:
+            if self.NOTESTFILES_IDENTIFIER in line:
+                no_tests = True
+            failed = REGEX_FAILED_TEST.match(line)
+            if failed:
+                failed_tests.append(failed.group(1))
+        del self._processes[index]
+        if failed_tests:
+            self.failed_tests[import_path] = failed_tests
+        if process.timed_out:
+            self.timed_out = True
+
+        stderr = process.other
+        if process.returncode != 0:
+            if stderr:
+                self._other.append(stderr)
+            return self.STATUS_FAIL
+        elif no_tests:
+            return self.STATUS_NO_TESTS
+        return self.STATUS_PASS
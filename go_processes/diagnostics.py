@@ -0,0 +1,112 @@
+"""Diagnostics package.
+
+Each problem a processor finds is kept as a `Diagnostic` rather than a
+line appended to a report string, which is quadratic in the size of the
+report and has to be parsed again to do anything but log it. The
+processors log them as text, and `utils.sinks` writes a run's diagnostics
+as JSON, JUnit XML or checkstyle XML for CI servers to show.
+
+The diagnostics a step reports are collected for it while it runs, the
+same way its processes' usage is, see `track_diagnostics`.
+"""
+import re
+import threading
+from collections import namedtuple
+
+# `package` is the configured package the step ran for, `file`, `line`
+# and `column` are where in the source the problem is, when the tool says.
+Diagnostic = namedtuple("Diagnostic", ["tool", "package", "message", "file",
+                                       "line", "column", "rule"])
+Diagnostic.__new__.__defaults__ = (None, None, None, None)
+
+# e.g. `svc/api/api.go:5:6: exported Get should have comment`, go vet
+# prefixes type errors with `vet: `
+REGEX_POSITION = re.compile(
+    r"^(?:vet: )?(?P<file>[^\s:]+\.go):(?P<line>\d+)(?::(?P<column>\d+))?:"
+    r"\s*(?P<message>.*)$")
+
+_local = threading.local()
+
+
+def parse_diagnostic(tool, package, text, rule=None):
+    """Return a line of a tool's output as a diagnostic.
+
+    :param tool: string
+    :param package: string, the configured package
+    :param text: string, e.g. `file.go:1:2: message`
+    :param rule: string, optional
+    :return: Diagnostic, only the message is set if the line has no
+        position
+    """
+    match = REGEX_POSITION.match(text)
+    if match is None:
+        return Diagnostic(tool, package, text, rule=rule)
+    column = match.group("column")
+    return Diagnostic(tool, package, match.group("message"),
+                      match.group("file"), int(match.group("line")),
+                      int(column) if column else None, rule)
+
+
+def format_text(diagnostic):
+    """Return a diagnostic the way the Go tools print their own.
+
+    :param diagnostic: Diagnostic
+    :return: string
+    """
+    if diagnostic.file is None:
+        return diagnostic.message
+    position = diagnostic.file
+    if diagnostic.line is not None:
+        position += ":{0}".format(diagnostic.line)
+        if diagnostic.column is not None:
+            position += ":{0}".format(diagnostic.column)
+    return "{0}: {1}".format(position, diagnostic.message)
+
+
+def render_text(diagnostics):
+    """Return diagnostics as text, one per line.
+
+    :param diagnostics: [Diagnostic]
+    :return: string
+    """
+    return "".join(format_text(diagnostic) + "\n"
+                   for diagnostic in diagnostics)
+
+
+def to_json(diagnostics):
+    """Return diagnostics in a form `json.dump` and the cache can store.
+
+    :param diagnostics: [Diagnostic]
+    :return: [list]
+    """
+    return [list(diagnostic) for diagnostic in diagnostics]
+
+
+def from_json(stored):
+    """Return diagnostics stored with `to_json`.
+
+    :param stored: [list]
+    :return: [Diagnostic]
+    """
+    return [Diagnostic(*fields) for fields in stored]
+
+
+def track_diagnostics(collected):
+    """Collect the diagnostics reported on this thread into a list.
+
+    :param collected: list, None to stop collecting
+    :return: list, what was collected into before
+    """
+    previous = getattr(_local, "collected", None)
+    _local.collected = collected
+    return previous
+
+
+def report(diagnostics):
+    """Report a processor's diagnostics to the step running it, if any.
+
+    :param diagnostics: [Diagnostic]
+    """
+    collected = getattr(_local, "collected", None)
+    if collected is not None:
+        collected.extend(diagnostics)
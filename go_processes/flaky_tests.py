@@ -0,0 +1,158 @@
+"""Flaky tests package.
+
+Reruns the tests which failed in a package, rather than failing the build
+on the first failure, so a single flaky test doesn't mean rerunning the
+whole CI job. Only the failing tests are run again, with `-run`, up to
+`code_coverage: flaky: retries` times. A test which passes on a retry is
+flaky, one which fails every time has failed.
+
+What happened to each test is kept in a history file. A test which has
+been flaky `quarantine_after` times, most recently within QUARANTINE_DAYS,
+is quarantined: when it fails, it is still retried and reported, but
+doesn't fail its package.
+"""
+import json
+import re
+import threading
+import time
+
+DEFAULT_HISTORY = ".f8ci-flaky.json"
+DEFAULT_RETRIES = 2
+
+# How long a test stays quarantined after it was last flaky.
+QUARANTINE_DAYS = 14
+
+OUTCOME_PASSED = "passed"
+OUTCOME_FLAKY = "flaky"
+OUTCOME_FAILED = "failed"
+
+# Top level tests only, subtests are indented and rerun with their parent.
+REGEX_FAILED_TEST = re.compile(r"^--- FAIL: (\S+)")
+
+
+def failed_tests(lines):
+    """Return the tests go test or a test binary reported as failed.
+
+    :param lines: iterable of string
+    :return: [string], in the order they were reported
+    """
+    tests = []
+    for line in lines:
+        failed = REGEX_FAILED_TEST.match(line)
+        if failed and failed.group(1) not in tests:
+            tests.append(failed.group(1))
+    return tests
+
+
+def run_pattern(tests):
+    """Return the -run pattern matching exactly some top level tests.
+
+    :param tests: [string]
+    :return: string
+    """
+    return "^({0})$".format("|".join(re.escape(test) for test in tests))
+
+
+class FlakyTests(object):
+
+    def __init__(self, retries=0, quarantine_after=None, tests=None):
+        """
+        :param retries: int, times failed tests are rerun
+        :param quarantine_after: int, flaky outcomes before a test is
+            quarantined, None never to quarantine
+        :param tests: dict of (import path, test) to dict with a count of
+            each outcome and when it was `last_flaky`
+        """
+        self.retries = retries
+        self.quarantine_after = quarantine_after
+        self.tests = tests or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def read(cls, path, retries=0, quarantine_after=None):
+        """Return the history in a file, empty if there isn't a readable one.
+
+        :param path: string
+        :param retries: int
+        :param quarantine_after: int or None
+        :return: FlakyTests
+        """
+        try:
+            with open(path, "r") as f:
+                history = json.load(f)
+        except (IOError, OSError, ValueError):
+            return cls(retries, quarantine_after)
+        return cls(retries, quarantine_after, dict(
+            ((test["package"], test["test"]),
+             dict((key, test[key]) for key in [OUTCOME_PASSED, OUTCOME_FLAKY,
+                                               OUTCOME_FAILED, "last_flaky"]))
+            for test in history.get("tests", [])))
+
+    def write(self, path):
+        """
+        :param path: string
+        """
+        with self._lock:
+            tests = [dict(stats, package=package, test=test)
+                     for (package, test), stats in sorted(self.tests.items())]
+        with open(path, "w") as f:
+            json.dump({"tests": tests}, f, indent=2, sort_keys=True)
+
+    def retry(self, import_path, tests, rerun):
+        """Rerun failed tests until they pass or the retries run out.
+
+        Each test's outcome is added to the history.
+
+        :param import_path: string
+        :param tests: [string], the tests which failed
+        :param rerun: callable taking the tests to run, returning those
+            which failed again
+        :return: [string], the tests which failed every time
+        """
+        failing = list(tests)
+        for _ in range(self.retries):
+            if not failing:
+                break
+            failing = [test for test in rerun(failing) if test in failing]
+        for test in tests:
+            self.add(import_path, test,
+                     OUTCOME_FAILED if test in failing else OUTCOME_FLAKY)
+        return failing
+
+    def add(self, import_path, test, outcome):
+        """Record a test's outcome.
+
+        Passes are only recorded for tests already in the history, so it
+        only grows with tests that have failed.
+
+        :param import_path: string
+        :param test: string
+        :param outcome: string, one of the OUTCOME_ values
+        """
+        with self._lock:
+            stats = self.tests.get((import_path, test))
+            if stats is None:
+                if outcome == OUTCOME_PASSED:
+                    return
+                stats = self.tests[(import_path, test)] = {
+                    OUTCOME_PASSED: 0, OUTCOME_FLAKY: 0, OUTCOME_FAILED: 0,
+                    "last_flaky": None}
+            stats[outcome] += 1
+            if outcome == OUTCOME_FLAKY:
+                stats["last_flaky"] = int(time.time())
+
+    def is_quarantined(self, import_path, test):
+        """
+        :param import_path: string
+        :param test: string
+        :return: bool
+        """
+        if not self.quarantine_after:
+            return False
+        with self._lock:
+            stats = self.tests.get((import_path, test))
+            if stats is None or stats["last_flaky"] is None:
+                return False
+            recent = time.time() - stats["last_flaky"] \
+                < QUARANTINE_DAYS * 24 * 60 * 60
+            return recent and stats[OUTCOME_FLAKY] >= self.quarantine_after
@@ -0,0 +1,61 @@
+"""Go lexer package.
+
+Splits Go source into tokens with a single compiled regular expression, so
+comments and string literals can be told apart from code. It is only as
+precise as the static checks need: operators other than `:=` and `...` are
+returned a character at a time, and semicolons are not inserted.
+"""
+import re
+from collections import namedtuple
+
+COMMENT = "comment"
+STRING = "string"
+RUNE = "rune"
+IDENT = "ident"
+NUMBER = "number"
+OP = "op"
+
+KEYWORDS = frozenset([
+    "break", "case", "chan", "const", "continue", "default", "defer",
+    "else", "fallthrough", "for", "func", "go", "goto", "if", "import",
+    "interface", "map", "package", "range", "return", "select", "struct",
+    "switch", "type", "var",
+])
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>[ \t\r\f]+)
+  | (?P<newline>\n)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|`[^`]*`)
+  | (?P<rune>'(?:[^'\\\n]|\\.)*')
+  | (?P<ident>[^\W\d]\w*)
+  | (?P<number>\.?\d(?:[eEpP][+-]|[\w.])*)
+  | (?P<op>:=|\.\.\.|.)
+""", re.S | re.X | re.U)
+
+Token = namedtuple("Token", ["kind", "value", "line"])
+
+
+def tokenize(source):
+    """Yield the tokens of a Go source file.
+
+    :param source: string
+    :return: generator of Token, without whitespace
+    """
+    line = 1
+    for match in TOKEN_PATTERN.finditer(source):
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+        if kind == "newline":
+            line += 1
+            continue
+        value = match.group()
+        yield Token(kind, value, line)
+        if kind == COMMENT or kind == STRING:
+            # Block comments and raw strings can span lines.
+            line += value.count("\n")
+
+
+def is_keyword(token):
+    return token.kind == IDENT and token.value in KEYWORDS
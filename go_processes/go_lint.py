@@ -1,20 +1,40 @@
-import subprocess
 import logging
 import re
 
-logging.basicConfig(level="DEBUG")
+from go_processes.batch import Batch
+from go_processes.diagnostics import Diagnostic, from_json, \
+    parse_diagnostic, render_text, report, to_json
+from go_processes.process import StreamingProcess
+
 LOGGER = logging.getLogger(__name__)
 
 
 class GoLint:
 
     LINT_SCRIPT = "golint src/{0}/..."
+    # golint given every package of a batch at once
+    BATCH_SCRIPT = "golint {0}"
+    BATCH_PATTERN = "src/{0}/..."
+    LINT_PATH = "src/{0}"
 
     REGEX_PACKAGE_PATTERN = "{0}(\/[a-zA-Z0-9\/]+)?.go"
     REGEX_FILE_PATTERN = "\/[a-zA-Z0-9]+.go"
 
-    def __init__(self, config):
+    TOOL = "golint"
+    EXECUTABLE = "golint"
+
+    def __init__(self, config, cache=None, fail_fast=False, batch=None):
+        """
+        :param config: Config
+        :param cache: ResultCache, optional
+        :param fail_fast: bool, stop at the first reported problem
+        :param batch: Batch, optional, packages in it are linted together
+            by a single golint
+        """
         self.config = config
+        self.cache = cache
+        self.fail_fast = fail_fast
+        self.batch = batch
 
     def go_lint(self, package, has_error):
         """Run golint on all packages.
@@ -25,17 +45,36 @@ class GoLint:
         :param has_error: bool
         :return: bool
         """
-        output = ""
+        cache_key = self.cache_key(package)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            diagnostics = from_json(cached["diagnostics"])
+            self._log_results(cached["err"], diagnostics)
+            report(diagnostics)
+            return cached["err"] if cached["err"] and not has_error \
+                else has_error
+
+        base_package = package
+        diagnostics = []
         err = False
 
-        out, error_output = self._run_script(package)
+        failed_packages = set()
+
+        if self.batch is not None and self.batch.expects(package):
+            process = self.batch.take(package)
+            timed_out = self.batch.timed_out
+        else:
+            process = self._run_script(package)
+            timed_out = None
 
         package_pattern = re.compile(
             self.REGEX_PACKAGE_PATTERN.format(package))
         file_pattern = re.compile(self.REGEX_FILE_PATTERN)
+        ignored = self.config.golint.ignored
+        # Set when fail fast stops before every line was read.
+        stopped = False
 
-        lines = out.split('\n')
-        for line in lines:
+        for line in process:
             package = re.search(package_pattern, line)
 
             if package is None:
@@ -44,38 +83,99 @@ class GoLint:
             package = package.group(0)
             package = re.sub(file_pattern, '', package)
 
-            if package in self.config.golint.ignored_packages:
+            if ignored.matches(package):
                 continue
 
             err = True
-            output += "{0}\n".format(line)
+            diagnostics.append(
+                parse_diagnostic(self.TOOL, base_package, line))
+
+            if package not in failed_packages:
+                failed_packages.add(package)
+                LOGGER.debug("{0}: FAIL".format(package))
+
+            if self.fail_fast:
+                if timed_out is None:
+                    process.kill()
+                stopped = True
+                break
+
+        if timed_out is None:
+            timed_out = process.timed_out
+        if timed_out:
+            # Only part of the packages were linted.
+            err = True
+            diagnostics.append(Diagnostic(
+                self.TOOL, base_package, "golint ran out of time.",
+                rule="timeout"))
 
-        self._log_results(err, out)
+        self._log_results(err, diagnostics)
+        report(diagnostics)
+
+        # Partial results would be replayed later as though they were all.
+        if cache_key and not timed_out and not stopped:
+            self.cache.put(cache_key, {"err": err,
+                                       "diagnostics": to_json(diagnostics)})
 
         return err if err and not has_error else has_error
 
+    def new_batch(self, packages):
+        """Return a batch linting the packages without cached results.
+
+        :param packages: [string]
+        :return: Batch
+        """
+        return Batch([package for package in packages
+                      if not self._is_cached(package)],
+                     self._run_batch_script, self.LINT_PATH.format)
+
+    def cache_key(self, package):
+        """Return the cache key for a package, None if caching is disabled.
+
+        :param package: string
+        :return: string or None
+        """
+        if self.cache is None:
+            return None
+        return self.cache.key(self.TOOL, self.EXECUTABLE, package,
+                              self.config.golint)
+
+    def _is_cached(self, package):
+        """Return whether a package's results are cached.
+
+        :param package: string
+        :return: bool
+        """
+        return self.cache is not None \
+            and self.cache_key(package) in self.cache
+
     def _run_script(self, package):
         """Run GoLang script for linting.
 
         :param package: string
-        :return: (stdout, stderr)
+        :return: StreamingProcess, iterates over stdout
         """
-        p = subprocess.Popen(
-            [self.LINT_SCRIPT.format(package)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True)
+        return StreamingProcess(self.LINT_SCRIPT.format(package))
 
-        return p.communicate()
+    def _run_batch_script(self, packages):
+        """Run golint over several packages at once.
 
-    def _log_results(self, has_error, out):
+        :param packages: [string]
+        :return: StreamingProcess, iterates over stdout
+        """
+        return StreamingProcess(self.BATCH_SCRIPT.format(" ".join(
+            self.BATCH_PATTERN.format(package) for package in packages)))
+
+    def _log_results(self, has_error, diagnostics):
         """Log result from linting.
 
+        Only problems in packages which aren't ignored are logged.
+
         :param has_error: bool
-        :param out: string
+        :param diagnostics: [Diagnostic]
         :return:
         """
         LOGGER.info("GOLINT: FAIL") if has_error \
             else LOGGER.info("GOLINT: PASS")
         if has_error:
-            LOGGER.info(out)
+            LOGGER.info(render_text(diagnostics))
@@ -1,32 +1,84 @@
-import subprocess
 import re
 import logging
 
-logging.basicConfig(level="DEBUG")
+from go_processes.batch import Batch
+from go_processes.diagnostics import Diagnostic, from_json, \
+    parse_diagnostic, render_text, report, to_json
+from go_processes.process import StreamingProcess, STDERR
+
 LOGGER = logging.getLogger(__name__)
 
 
 class GoVet:
 
     VET_SCRIPT = "go vet {0}/..."
+    # go vet given every package of a batch at once
+    BATCH_SCRIPT = "go vet {0}"
+    BATCH_PATTERN = "{0}/..."
 
     REGEX_PACKAGE = "{0}(\/[a-zA-Z0-9\/]+)?.go"
     REGEX_FILE_PATTERN = "\/[a-zA-Z0-9]+.go"
 
-    def __init__(self, config):
+    TOOL = "go_vet"
+    EXECUTABLE = "go"
+
+    def __init__(self, config, cache=None, fail_fast=False,
+                 vet_handoff=None, batch=None):
+        """
+        :param config: Config
+        :param cache: ResultCache, optional
+        :param fail_fast: bool, stop at the first reported problem
+        :param vet_handoff: VetHandoff, optional, output from go test -vet
+            is used rather than running go vet again where it's available
+        :param batch: Batch, optional, packages in it are vetted together
+            by a single go vet
+        """
         self.config = config
+        self.cache = cache
+        self.fail_fast = fail_fast
+        self.vet_handoff = vet_handoff
+        self.batch = batch
 
     def go_vet(self, package, has_error):
-        output = ""
+        cache_key = self.cache_key(package)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            diagnostics = from_json(cached["diagnostics"])
+            self._log_results(diagnostics, cached["err"])
+            report(diagnostics)
+            return cached["err"] if cached["err"] and not has_error \
+                else has_error
+
+        base_package = package
+        diagnostics = []
         err = False
 
-        out, err_output = self._run_script(package)
-
-        package_pattern = re.compile(self.REGEX_PACKAGE.format(package))
+        failed_packages = set()
+
+        handed_over = self.vet_handoff.take(package) \
+            if self.vet_handoff is not None else None
+        # Set when the lines come from somewhere other than our own go vet.
+        timed_out = None
+        if handed_over is not None:
+            LOGGER.debug("Using the vet output of go test")
+            process = handed_over.splitlines()
+            timed_out = False
+        elif self.batch is not None and self.batch.expects(package):
+            process = self.batch.take(package)
+            timed_out = self.batch.timed_out
+        else:
+            process = self._run_script(package)
+
+        # go vet prints paths relative to the working directory, without a
+        # leading `./`.
+        package_pattern = re.compile(self.REGEX_PACKAGE.format(
+            package[2:] if package.startswith("./") else package))
         file_pattern = re.compile(self.REGEX_FILE_PATTERN)
+        ignored = self.config.go_vet.ignored
+        # Set when fail fast stops before every line was read.
+        stopped = False
 
-        lines = err_output.split('\n')
-        for line in lines:
+        for line in process:
             package = re.search(package_pattern, line)
 
             if package is None:
@@ -35,31 +87,101 @@ class GoVet:
             package = package.group(0)
             package = re.sub(file_pattern, '', package)
 
-            if package in self.config.go_vet.ignored_packages:
+            if ignored.matches(package):
                 continue
 
             err = True
-            output += line + "\n"
+            diagnostics.append(
+                parse_diagnostic(self.TOOL, base_package, line))
+
+            if package not in failed_packages:
+                failed_packages.add(package)
+                LOGGER.debug("{0}: FAIL".format(package))
+
+            if self.fail_fast:
+                if timed_out is None:
+                    process.kill()
+                stopped = True
+                break
+
+        if timed_out is None:
+            timed_out = process.timed_out
+        if timed_out:
+            # Only part of the packages were vetted.
+            err = True
+            diagnostics.append(Diagnostic(
+                self.TOOL, base_package, "go vet ran out of time.",
+                rule="timeout"))
 
-        self._log_results(output, err)
+        self._log_results(diagnostics, err)
+        report(diagnostics)
+
+        # Partial results would be replayed later as though they were all.
+        if cache_key and not timed_out and not stopped:
+            self.cache.put(cache_key, {"diagnostics": to_json(diagnostics),
+                                       "err": err})
 
         return err if err and not has_error else has_error
 
+    def new_batch(self, packages):
+        """Return a batch vetting the packages go vet has to run for.
+
+        Packages with cached results, or whose tests will vet them, are
+        left out.
+
+        :param packages: [string]
+        :return: Batch
+        """
+        packages = [package for package in packages
+                    if not self._is_cached(package)]
+        if self.vet_handoff is not None:
+            packages = [package for package in packages
+                        if not self.vet_handoff.expects(package)]
+        # go vet reports paths relative to the working directory.
+        return Batch(packages, self._run_batch_script,
+                     self.config.all.package_dirs.get)
+
+    def _is_cached(self, package):
+        """Return whether a package's results are cached.
+
+        :param package: string
+        :return: bool
+        """
+        return self.cache is not None \
+            and self.cache_key(package) in self.cache
+
+    def cache_key(self, package):
+        """Return the cache key for a package, None if caching is disabled.
+
+        :param package: string
+        :return: string or None
+        """
+        if self.cache is None:
+            return None
+        return self.cache.key(self.TOOL, self.EXECUTABLE, package,
+                              self.config.go_vet)
+
     def _run_script(self, package):
         """Run go vet script.
 
+        go vet reports on stderr, so that is the stream iterated over.
+
         :param package: string
-        :return: (stdout, stderr)
+        :return: StreamingProcess, iterates over stderr
         """
-        p = subprocess.Popen(
-            [self.VET_SCRIPT.format(package)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True)
+        return StreamingProcess(self.VET_SCRIPT.format(package), STDERR)
 
-        return p.communicate()
+    def _run_batch_script(self, packages):
+        """Run go vet over several packages at once.
+
+        :param packages: [string]
+        :return: StreamingProcess, iterates over stderr
+        """
+        return StreamingProcess(self.BATCH_SCRIPT.format(" ".join(
+            self.BATCH_PATTERN.format(package) for package in packages)),
+            STDERR)
 
-    def _log_results(self, output, err):
+    def _log_results(self, diagnostics, err):
         LOGGER.info("GO VET: FAIL") if err else LOGGER.info("GO VET: PASS")
         if err:
-            LOGGER.info(output)
+            LOGGER.info(render_text(diagnostics))
@@ -0,0 +1,102 @@
+"""Limiter package.
+
+Bounds how many Go processes run at once across every step of a run.
+`all.jobs` only bounds the steps, and a step may start several processes,
+e.g. `code_coverage: profile` tests its packages in parallel, so on a busy
+run the number of go processes is otherwise unbounded.
+
+`go test` runs are heavy, each links a test binary per package and several
+linking at once can exhaust a runner's memory, so they have a separate,
+smaller cap. Before one starts while others are already running, it also
+waits until `/proc/meminfo` shows enough memory available. The first is
+always let through, so a small runner still makes progress.
+
+Processes ask for a slot when they start and give it back once they have
+been waited for, see `StreamingProcess`.
+"""
+import threading
+
+MEMINFO = "/proc/meminfo"
+
+# Seconds between checks on the available memory while waiting for it.
+POLL_INTERVAL = 0.25
+
+
+def available_memory_mb(path=MEMINFO):
+    """Return how much memory can be allocated without swapping.
+
+    :param path: string
+    :return: int, megabytes, None where it isn't known, e.g. not on Linux
+        or before `MemAvailable` was added in 3.14
+    """
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class ProcessLimiter(object):
+
+    def __init__(self, max_processes=None, max_heavy=None,
+                 min_available_mb=None, available=available_memory_mb):
+        """
+        :param max_processes: int, processes at once, None for no limit
+        :param max_heavy: int, heavy processes at once, None for no limit
+        :param min_available_mb: int, memory to wait for before starting a
+            heavy process while another is running, None not to wait
+        :param available: callable returning megabytes available or None
+        """
+        self.max_processes = max_processes
+        self.max_heavy = max_heavy
+        self.min_available_mb = min_available_mb
+        self.running = 0
+        self.heavy = 0
+        self._available = available
+        self._condition = threading.Condition()
+
+    def acquire(self, heavy=False, give_up=None):
+        """Wait for a slot to start a process in.
+
+        :param heavy: bool, whether it is a `go test` run
+        :param give_up: callable returning True to stop waiting, e.g. once
+            the run's deadline has passed
+        :return: bool, whether a slot was taken, release it if so
+        """
+        with self._condition:
+            while not self._admits(heavy):
+                if give_up is not None and give_up():
+                    return False
+                # Woken by a release, or polled for the memory and give_up.
+                self._condition.wait(POLL_INTERVAL)
+            self.running += 1
+            if heavy:
+                self.heavy += 1
+            return True
+
+    def release(self, heavy=False):
+        """Give back a slot taken with `acquire`.
+
+        :param heavy: bool, as passed to `acquire`
+        """
+        with self._condition:
+            self.running -= 1
+            if heavy:
+                self.heavy -= 1
+            self._condition.notify_all()
+
+    def _admits(self, heavy):
+        if self.max_processes and self.running >= self.max_processes:
+            return False
+        if not heavy:
+            return True
+        if self.max_heavy and self.heavy >= self.max_heavy:
+            return False
+        if self.min_available_mb and self.heavy:
+            available = self._available()
+            if available is not None and available < self.min_available_mb:
+                return False
+        return True
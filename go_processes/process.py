@@ -0,0 +1,343 @@
+"""Streaming subprocess wrapper shared by the processors.
+
+Rather than buffering everything with `communicate()` the command's output
+is read and yielded one line at a time, so results can be parsed and
+reported while the tool is still running. The other stream is drained on a
+background thread so a chatty child can't deadlock on a full pipe.
+
+Children are reaped with `wait4`, so the CPU time and peak RSS of each one
+can be added to the `Usage` being tracked by the calling thread.
+
+A process given a timeout, or started while a run deadline is set, has its
+process group terminated once the time is up. Iteration then ends normally,
+so whatever was parsed up to that point is kept. `stop_all` does the same
+to every process straight away, to cancel a run.
+
+With a `ProcessLimiter` set, see `set_limiter`, each process waits for a
+slot before it starts and gives it back once it has been waited for.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+# Each process gets its own session, and so its own process group, so
+# killing the group takes the go tool with it rather than just the shell.
+if sys.version_info[0] >= 3:
+    # preexec_fn isn't safe while other threads run, as the steps do.
+    _NEW_SESSION = {"start_new_session": True}
+else:  # Python 2
+    _NEW_SESSION = {"preexec_fn": os.setsid}
+
+# Seconds between asking a timed out process group to terminate and
+# killing it.
+KILL_GRACE = 2.0
+
+_tracked = threading.local()
+
+# When every process must have finished by, see `set_deadline`.
+_deadline = None
+
+# Processes not yet waited for, so `stop_all` can reach them.
+_running = set()
+_running_lock = threading.Lock()
+
+# Slots processes are started in, see `set_limiter`.
+_limiter = None
+
+
+class Usage(object):
+    """Resources used by the processes started on behalf of one step."""
+
+    def __init__(self):
+        self.processes = 0
+        self.user_time = 0.0
+        self.system_time = 0.0
+        self.max_rss_kb = 0
+        # Decoded characters, the same as bytes for the tools' ASCII output.
+        self.output_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    def add_process(self, rusage, output_bytes):
+        """Account for a finished child.
+
+        :param rusage: resource.struct_rusage, None if it wasn't available
+        :param output_bytes: int, written to stdout and stderr
+        """
+        with self._lock:
+            self.processes += 1
+            self.output_bytes += output_bytes
+            if rusage is not None:
+                self.user_time += rusage.ru_utime
+                self.system_time += rusage.ru_stime
+                self.max_rss_kb = max(self.max_rss_kb, rusage.ru_maxrss)
+
+    def add_cache_lookup(self, hit):
+        """Account for a result cache lookup.
+
+        :param hit: bool
+        """
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+
+def track_usage(usage):
+    """Add the processes this thread starts from now on to a Usage.
+
+    :param usage: Usage, None to stop tracking
+    :return: Usage, the one previously tracked
+    """
+    previous = current_usage()
+    _tracked.usage = usage
+    return previous
+
+
+def current_usage():
+    """Return the Usage tracked by this thread.
+
+    :return: Usage or None
+    """
+    return getattr(_tracked, "usage", None)
+
+
+def set_deadline(deadline):
+    """Set when every process, running or started later, must finish by.
+
+    :param deadline: float, a time.time() value, None for no deadline
+    """
+    global _deadline
+    _deadline = deadline
+
+
+def deadline_passed():
+    """Return whether the deadline set with `set_deadline` has passed.
+
+    :return: bool
+    """
+    return _deadline is not None and time.time() >= _deadline
+
+
+def time_left(timeout=None):
+    """Return how long a process may run for, given its own timeout.
+
+    :param timeout: float, seconds, None for no limit of its own
+    :return: float, seconds, None if there is no limit at all
+    """
+    if _deadline is None:
+        return timeout
+    left = max(0.0, _deadline - time.time())
+    return left if timeout is None else min(timeout, left)
+
+
+def set_limiter(limiter):
+    """Set the limiter every process started from now on takes a slot from.
+
+    :param limiter: ProcessLimiter, None to start processes straight away
+    """
+    global _limiter
+    _limiter = limiter
+
+
+def stop_all():
+    """Stop every running process, and any started until the deadline is
+    reset, as though the deadline had passed."""
+    set_deadline(time.time())
+    with _running_lock:
+        running = list(_running)
+    for process in running:
+        # Each waits out its own grace period.
+        stopper = threading.Thread(target=process._expire)
+        stopper.daemon = True
+        stopper.start()
+
+
+class StreamingProcess(object):
+
+    def __init__(self, script, stream=STDOUT, timeout=None, heavy=False):
+        """Start running a shell script.
+
+        Blocks until the limiter, if one is set, has a slot for it. Once the
+        deadline has passed it starts regardless, and is stopped straight
+        away.
+
+        :param script: string
+        :param stream: string, STDOUT or STDERR, the stream to iterate over
+        :param timeout: float, seconds before the process group is killed,
+            it is also killed when the deadline passes
+        :param heavy: bool, whether it is a `go test` run, limited separately
+        """
+        self.script = script
+        # Whether it was killed for running out of time.
+        self.timed_out = False
+        self._usage = current_usage()
+        self._stream_bytes = 0
+        self._finished = False
+        self._wait_lock = threading.Lock()
+        self._exited = threading.Event()
+        self._heavy = heavy
+        self._limiter = _limiter
+        if self._limiter is not None \
+                and not self._limiter.acquire(heavy, deadline_passed):
+            self._limiter = None
+        try:
+            self._process = subprocess.Popen(
+                [script],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=True,
+                universal_newlines=True,
+                **_NEW_SESSION)
+        except Exception:
+            self._release()
+            raise
+        with _running_lock:
+            _running.add(self)
+
+        if stream == STDERR:
+            self._stream = self._process.stderr
+            other = self._process.stdout
+        else:
+            self._stream = self._process.stdout
+            other = self._process.stderr
+
+        self._other = []
+        self._drain = threading.Thread(target=self._read_other, args=(other,))
+        self._drain.daemon = True
+        self._drain.start()
+
+        self._timer = None
+        timeout = time_left(timeout)
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def __iter__(self):
+        """Yield lines from the stream as they are written.
+
+        :return: generator of string, without trailing newlines
+        """
+        for line in iter(self._stream.readline, ""):
+            self._stream_bytes += len(line)
+            yield line.rstrip("\n")
+        self.wait()
+
+    @property
+    def other(self):
+        """Return everything written to the other stream.
+
+        Only complete once the process has finished, see `wait`.
+
+        :return: string
+        """
+        return "".join(self._other)
+
+    @property
+    def returncode(self):
+        return self._process.returncode
+
+    def wait(self):
+        """Wait for the process to finish.
+
+        :return: int, the exit code
+        """
+        with self._wait_lock:
+            if not self._finished:
+                rusage = self._reap()
+                self._exited.set()
+                with _running_lock:
+                    _running.discard(self)
+                self._release()
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._drain.join()
+                self._stream.close()
+                self._finished = True
+                if self._usage is not None:
+                    self._usage.add_process(
+                        rusage, self._stream_bytes + len(self.other))
+        return self._process.returncode
+
+    def kill(self):
+        """Kill the process group, used to stop early."""
+        self._signal(signal.SIGKILL)
+        self.wait()
+
+    def _expire(self):
+        """Stop the process group once it has run out of time.
+
+        It's asked to terminate first, so the tools can clean up after
+        themselves, and killed if it hasn't within KILL_GRACE.
+        """
+        if self._exited.is_set():
+            return
+        self.timed_out = True
+        self._signal(signal.SIGTERM)
+        if not self._exited.wait(KILL_GRACE):
+            self._signal(signal.SIGKILL)
+
+    def _release(self):
+        if self._limiter is not None:
+            self._limiter.release(self._heavy)
+            self._limiter = None
+
+    def _signal(self, signum):
+        if self._exited.is_set():
+            # The pid may belong to something else by now.
+            return
+        try:
+            os.killpg(self._process.pid, signum)
+        except OSError:
+            pass
+
+    def _reap(self):
+        """Wait for the child, returning its resource usage.
+
+        :return: resource.struct_rusage, None if it was reaped elsewhere
+        """
+        try:
+            _, status, rusage = os.wait4(self._process.pid, 0)
+        except OSError:
+            self._process.wait()
+            return None
+        if os.WIFSIGNALED(status):
+            self._process.returncode = -os.WTERMSIG(status)
+        else:
+            self._process.returncode = os.WEXITSTATUS(status)
+        return rusage
+
+    def _read_other(self, other):
+        for line in iter(other.readline, ""):
+            self._other.append(line)
+        other.close()
+
+
+def json_objects(lines):
+    """Decode a stream of JSON objects as each one is completed.
+
+    Handles both one object per line, as written by `go test -json`, and
+    the indented objects written back to back by `go list -json`.
+
+    :param lines: iterable of string
+    :return: generator of dict
+    """
+    pending = []
+    for line in lines:
+        if not pending and line.startswith("{") and line.endswith("}"):
+            yield json.loads(line)
+        elif pending or line.startswith("{"):
+            pending.append(line)
+            if line == "}":
+                yield json.loads("\n".join(pending))
+                pending = []
@@ -0,0 +1,79 @@
+"""Slow tests package.
+
+Collects how long each package and test took as go test reports it, so the
+slowest can be listed once a run is over. Packages are timed in every
+coverage mode, individual tests only with `code_coverage: json`, since the
+plain text output doesn't include them.
+"""
+import heapq
+import logging
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SlowTests(object):
+
+    def __init__(self):
+        self._packages = {}
+        self._tests = {}
+        self._lock = threading.Lock()
+
+    def add_package(self, package, elapsed):
+        """Record how long a package's tests took.
+
+        :param package: string
+        :param elapsed: float, seconds
+        """
+        with self._lock:
+            self._packages[package] = elapsed
+
+    def add_test(self, package, test, elapsed):
+        """Record how long a single test took.
+
+        :param package: string, the import path
+        :param test: string, e.g. `TestStore/subtest`
+        :param elapsed: float, seconds
+        """
+        with self._lock:
+            self._tests[(package, test)] = elapsed
+
+    def slowest_packages(self, count):
+        """Return the slowest packages, slowest first.
+
+        :param count: int
+        :return: [(package, elapsed)]
+        """
+        with self._lock:
+            return _slowest(self._packages, count)
+
+    def slowest_tests(self, count):
+        """Return the slowest tests, slowest first.
+
+        :param count: int
+        :return: [((package, test), elapsed)]
+        """
+        with self._lock:
+            return _slowest(self._tests, count)
+
+    def log(self, count):
+        """Log the slowest packages and tests.
+
+        :param count: int, how many of each
+        """
+        packages = self.slowest_packages(count)
+        if packages:
+            LOGGER.info("SLOWEST PACKAGES:\n{0}".format("".join(
+                "{0:>9.3f}s  {1}\n".format(elapsed, package)
+                for package, elapsed in packages)))
+        tests = self.slowest_tests(count)
+        if tests:
+            LOGGER.info("SLOWEST TESTS:\n{0}".format("".join(
+                "{0:>9.3f}s  {1} {2}\n".format(elapsed, package, test)
+                for (package, test), elapsed in tests)))
+
+
+def _slowest(elapsed, count):
+    # Ties are broken by name so the report is the same every time.
+    return heapq.nsmallest(count, elapsed.items(),
+                           key=lambda item: (-item[1], item[0]))
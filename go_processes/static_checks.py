@@ -0,0 +1,401 @@
+"""Static checks package.
+
+Checks Go source for constructs we don't want, without building it. Each
+.go file is tokenized once and every rule looks at the tokens in the same
+pass, so adding a rule doesn't mean walking and reading the tree again.
+
+Rules are classes registered with `register`, each gets a fresh instance
+per file. A rule's `visit` is called with every token outside comments,
+along with the brace depth it is at, and reports with `report`. Only those
+whose `default` is set run unless they're enabled, so a new rule doesn't
+start failing builds which were passing.
+
+A use which can't be avoided is allowed with a comment, either on the line
+before or at the end of the line itself:
+
+    // f8-ignore: [ go_init ]
+    func init() {
+
+`// f8-ignore` on its own allows every rule.
+
+Large trees are split between a pool of processes.
+"""
+import io
+import logging
+import os
+import re
+from collections import OrderedDict
+
+from go_processes.diagnostics import Diagnostic, report
+from go_processes.go_lexer import COMMENT, IDENT, OP, is_keyword, tokenize
+
+LOGGER = logging.getLogger(__name__)
+
+# As well as directories starting with . or _, which Go ignores too.
+SKIPPED_DIRS = ["vendor", "testdata"]
+FILE_EXTENSION = ".go"
+
+# Below this many files, starting processes costs more than it saves.
+PARALLEL_MIN_FILES = 256
+
+IGNORE_COMMENT = re.compile(r"//\s*f8-ignore\b(?:\s*:\s*\[([^\]]*)\])?")
+
+TOOL = "static_checks"
+
+RULES = OrderedDict()
+
+
+def register(rule):
+    """Add a rule class to those known, usable as a decorator.
+
+    :param rule: Rule subclass
+    :return: the rule
+    """
+    RULES[rule.name] = rule
+    return rule
+
+
+class Rule(object):
+
+    # Used in ignored_commands and f8-ignore comments.
+    name = None
+    # Logged with PASS or FAIL.
+    title = None
+    # Logged after the findings when the rule fails.
+    hint = None
+    # Whether it runs without being enabled.
+    default = False
+
+    def __init__(self):
+        self.findings = []
+
+    def visit(self, tokens, index, depth):
+        """Look at a token.
+
+        :param tokens: [Token], every token in the file outside comments
+        :param index: int, the position of the token to look at
+        :param depth: int, how many braces the token is inside
+        """
+        raise NotImplementedError
+
+    def report(self, line, message):
+        self.findings.append((line, message))
+
+
+@register
+class HttpTimeoutsRule(Rule):
+    """Use of the net/http functions which have no timeouts."""
+
+    name = "go_timeouts"
+    title = "GO TIMEOUTS"
+    default = True
+    hint = "For more info on why this is bad, please read {0}".format(
+        "https://blog.cloudflare.com/the-complete-guide-to-golang-net-http-timeouts/")  # NOQA
+
+    FUNCTIONS = frozenset(
+        ["ListenAndServe", "Get", "Post", "PostForm", "Head"])
+
+    def visit(self, tokens, index, depth):
+        token = tokens[index]
+        if token.value != "http" or index + 3 >= len(tokens):
+            return
+        dot, function, paren = tokens[index + 1:index + 4]
+        if dot.value == "." and function.value in self.FUNCTIONS \
+                and paren.value == "(":
+            self.report(token.line, "contains default http function "
+                                    "http.{0}(".format(function.value))
+
+
+@register
+class InitRule(Rule):
+    """Package init functions."""
+
+    name = "go_init"
+    title = "GO INIT"
+    hint = "init functions run on import, even in tests, and can't be " \
+           "skipped or reordered. Prefer explicit setup."
+
+    def visit(self, tokens, index, depth):
+        token = tokens[index]
+        if depth or token.value != "func" or index + 2 >= len(tokens):
+            return
+        if tokens[index + 1].value == "init" \
+                and tokens[index + 2].value == "(":
+            self.report(token.line, "declares an init function")
+
+
+@register
+class PackageCallRule(Rule):
+    """Function calls in package level variable declarations."""
+
+    name = "go_package_calls"
+    title = "GO PACKAGE CALLS"
+    hint = "Package level variables are initialised on import, move the " \
+           "call into a constructor or an explicit setup function."
+
+    # Builtins and conversions to predeclared types don't run any code of
+    # ours, nor does errors.New for sentinel errors.
+    ALLOWED = frozenset([
+        "append", "cap", "complex", "imag", "len", "make", "new", "real",
+        "bool", "byte", "complex64", "complex128", "error", "float32",
+        "float64", "int", "int8", "int16", "int32", "int64", "rune",
+        "string", "uint", "uint8", "uint16", "uint32", "uint64", "uintptr",
+        "errors.New",
+    ])
+
+    OPENING = {"(": ")", "[": "]", "{": "}"}
+    # Tokens after which a line break ends a declaration, see semicolon
+    # insertion in the Go spec.
+    ENDS_LINE = frozenset([")", "]", "}"])
+
+    def __init__(self):
+        super(PackageCallRule, self).__init__()
+        # Closing brackets expected within the current declaration, None
+        # outside of one.
+        self._stack = None
+        # Stack height of the declaration's specs, 1 in a `var ( ... )`.
+        self._level = 0
+        # Whether an initializer is being read.
+        self._initializer = False
+        # Stack height at a `func` keyword, until its body (if any) opens.
+        self._func = None
+        # Stack height inside a function literal's body, which isn't run.
+        self._body = None
+        # Index of the `}` ending the last function literal.
+        self._literal_end = None
+
+    def visit(self, tokens, index, depth):
+        token = tokens[index]
+        if self._stack is None:
+            if not depth and token.value == "var" and is_keyword(token):
+                self._stack = []
+                following = tokens[index + 1:index + 2]
+                self._level = int(bool(following)
+                                  and following[0].value == "(")
+            return
+
+        if self._ends_spec(token, tokens[index - 1]):
+            self._initializer = False
+            self._func = None
+            if not self._level:
+                self._stack = None
+                # The token may start the next declaration.
+                self.visit(tokens, index, depth)
+                return
+
+        value = token.value
+        if token.kind == OP and value in self.OPENING:
+            self._open(tokens, index)
+            self._stack.append(self.OPENING[value])
+        elif token.kind == OP and self._stack and value == self._stack[-1]:
+            self._close(index)
+        elif value == "=" and len(self._stack) == self._level:
+            self._initializer = True
+        elif value == "," and self._func == len(self._stack):
+            # A func type in a list, not a literal.
+            self._func = None
+        elif value == "func" and self._initializer and self._body is None:
+            self._func = len(self._stack)
+
+    def _open(self, tokens, index):
+        if not self._initializer or self._body is not None:
+            return
+        token, previous = tokens[index], tokens[index - 1]
+        if token.value == "{":
+            # `interface{}` and `struct{` in a signature aren't the body.
+            if self._func == len(self._stack) and not is_keyword(previous):
+                self._body = len(self._stack) + 1
+                self._func = None
+        elif token.value == "(" and self._func is None:
+            if previous.kind == IDENT and not is_keyword(previous):
+                name = previous.value
+                if index >= 3 and tokens[index - 2].value == "." \
+                        and tokens[index - 3].kind == IDENT:
+                    name = "{0}.{1}".format(tokens[index - 3].value, name)
+                if name not in self.ALLOWED:
+                    self.report(token.line, "calls {0}( in a package level "
+                                            "variable".format(name))
+            elif self._literal_end == index - 1:
+                self.report(token.line, "calls a function literal in a "
+                                        "package level variable")
+
+    def _close(self, index):
+        self._stack.pop()
+        height = len(self._stack)
+        if self._body is not None and height < self._body:
+            self._body = None
+            self._literal_end = index
+        if self._func is not None and height < self._func:
+            self._func = None
+        if self._level and not self._stack:
+            # The end of a `var ( ... )` group.
+            self._stack = None
+            self._level = 0
+            self._initializer = False
+
+    def _ends_spec(self, token, previous):
+        """Whether a declaration ended before this token."""
+        if len(self._stack) != self._level:
+            return False
+        if token.value == ";":
+            return True
+        if token.line == previous.line:
+            return False
+        return previous.kind != OP or previous.value in self.ENDS_LINE
+
+
+def check_source(source, rules):
+    """Run rules over a file's source.
+
+    :param source: string
+    :param rules: [Rule subclass]
+    :return: [(rule name, line, message)], ordered by line
+    """
+    instances = [rule() for rule in rules]
+    code = []
+    ignored = {}
+    last_line = 0
+    for token in tokenize(source):
+        if token.kind != COMMENT:
+            code.append(token)
+            last_line = token.line
+            continue
+        match = IGNORE_COMMENT.match(token.value)
+        if match is None:
+            continue
+        # A trailing comment covers its own line, otherwise the next one.
+        line = token.line if last_line == token.line \
+            else token.line + token.value.count("\n") + 1
+        names = match.group(1)
+        ignored[line] = None if names is None else set(
+            name.strip() for name in names.split(",") if name.strip())
+
+    depth = 0
+    for index, token in enumerate(code):
+        for rule in instances:
+            rule.visit(code, index, depth)
+        if token.kind == OP:
+            if token.value == "{":
+                depth += 1
+            elif token.value == "}" and depth:
+                depth -= 1
+
+    findings = []
+    for rule in instances:
+        for line, message in rule.findings:
+            if line in ignored and (ignored[line] is None
+                                    or rule.name in ignored[line]):
+                continue
+            findings.append((rule.name, line, message))
+    findings.sort(key=lambda finding: finding[1])
+    return findings
+
+
+def _check_files(args):
+    """Check a batch of files, run in the pool's processes.
+
+    :param args: ([string], [Rule subclass])
+    :return: [Diagnostic]
+    """
+    filenames, rules = args
+    findings = []
+    for filename in filenames:
+        with io.open(filename, encoding="utf-8", errors="replace") as f:
+            source = f.read()
+        for rule, line, message in check_source(source, rules):
+            findings.append(
+                Diagnostic(TOOL, None, message, filename, line, rule=rule))
+    return findings
+
+
+class StaticChecks(object):
+
+    def __init__(self, source_dir, rules=None, jobs=1, enabled=(),
+                 ignored=()):
+        """
+        :param source_dir: string, the tree to check
+        :param rules: [Rule subclass], defaults to the registered rules
+            which are on by default or enabled
+        :param jobs: int, processes to split large trees between
+        :param enabled: [string], names of rules off by default to run
+        :param ignored: [string], names of rules not to run, e.g. the
+            ignored_commands
+        :raises ValueError: if a rule enabled isn't registered
+        """
+        unknown = [name for name in enabled if name not in RULES]
+        if unknown:
+            raise ValueError("Unknown static checks: {0}, expected one of: "
+                             "{1}".format(", ".join(unknown),
+                                          ", ".join(RULES)))
+        if rules is None:
+            rules = [rule for name, rule in RULES.items()
+                     if rule.default or name in enabled]
+        self.source_dir = source_dir
+        self.rules = [rule for rule in rules if rule.name not in ignored]
+        self.jobs = jobs
+
+    def findings(self):
+        """Check every .go file in the tree.
+
+        :return: [Diagnostic], ordered by file then line
+        """
+        if not self.rules:
+            return []
+        filenames = list(self._source_files())
+        if self.jobs <= 1 or len(filenames) < PARALLEL_MIN_FILES:
+            return _check_files((filenames, self.rules))
+
+        # A few batches per process, so one slow batch can't hold up the rest
+        size = -(-len(filenames) // (self.jobs * 4))
+        batches = [(filenames[i:i + size], self.rules)
+                   for i in range(0, len(filenames), size)]
+        # Only imported for large trees, it pulls in multiprocessing.
+        from concurrent.futures import ProcessPoolExecutor
+
+        findings = []
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for batch in executor.map(_check_files, batches):
+                findings.extend(batch)
+        return findings
+
+    def validate(self, has_error):
+        """Check the tree, logging the result of each rule.
+
+        :param has_error: bool
+        :return: bool
+        """
+        by_rule = OrderedDict((rule.name, []) for rule in self.rules)
+        findings = self.findings()
+        for finding in findings:
+            by_rule[finding.rule].append(finding)
+        report(findings)
+
+        err = False
+        for rule in self.rules:
+            found = by_rule[rule.name]
+            if not found:
+                LOGGER.info("{0}: PASS".format(rule.title))
+                continue
+            err = True
+            LOGGER.info("{0}: FAIL".format(rule.title))
+            LOGGER.info("".join(format_finding(finding) for finding in found))
+            if rule.hint:
+                LOGGER.info(rule.hint)
+        return err if err and not has_error else has_error
+
+    def _source_files(self):
+        """Yield the path of every .go file under the source dir, sorted.
+
+        :return: generator of string
+        """
+        for root, dirs, files in os.walk(self.source_dir):
+            dirs[:] = sorted(d for d in dirs if d not in SKIPPED_DIRS
+                             and not d.startswith((".", "_")))
+            for name in sorted(files):
+                if name.endswith(FILE_EXTENSION):
+                    yield os.path.join(root, name)
+
+
+def format_finding(finding):
+    return "{0} {1} on line {2}\n".format(
+        finding.file, finding.message, finding.line)
@@ -0,0 +1,103 @@
+"""Tests for the batch package."""
+import threading
+import unittest
+
+from mock import Mock
+
+from go_processes.batch import Batch, PackageIndex, normalise
+
+
+class FakeProcess(list):
+
+    timed_out = False
+
+
+class TestPackageIndex(unittest.TestCase):
+
+    def test_normalise(self):
+        self.assertEqual(normalise("./svc/api"), "svc/api")
+        self.assertEqual(normalise("src/./svc/api/"), "src/svc/api")
+        self.assertEqual(normalise("."), "")
+
+    def test_most_specific_package_wins(self):
+        index = PackageIndex({"src/svc": "svc", "src/svc/api": "svc/api"})
+
+        self.assertEqual(index.package_for("src/svc/api/v1/a.go"), "svc/api")
+        self.assertEqual(index.package_for("src/svc/store/a.go"), "svc")
+        self.assertEqual(index.package_for("./src/svc/a.go"), "svc")
+        self.assertIsNone(index.package_for("src/svcx/a.go"))
+        self.assertIsNone(index.package_for("a.go"))
+
+    def test_root_package(self):
+        index = PackageIndex({".": "all"})
+
+        self.assertEqual(index.package_for("a.go"), "all")
+        self.assertEqual(index.package_for("svc/a.go"), "all")
+
+    def test_package_of_line(self):
+        index = PackageIndex({"svc/api": "./svc/api"})
+
+        self.assertEqual(index.package_of_line(
+            "svc/api/api.go:5:6: exported Get should have comment"),
+            "./svc/api")
+        self.assertEqual(index.package_of_line(
+            "vet: svc/api/api.go:5:6: undeclared name: x"), "./svc/api")
+        self.assertIsNone(index.package_of_line("# svc/api"))
+        self.assertIsNone(index.package_of_line("exit status 1"))
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_demultiplexes_one_run(self):
+        run = Mock(return_value=FakeProcess([
+            "src/a/a.go:1:1: one",
+            "src/b/sub/b.go:2:1: two",
+            "src/c/c.go:3:1: not batched",
+            "src/a/x.go:4:1: three",
+        ]))
+        batch = Batch(["a", "b"], run, "src/{0}".format)
+
+        self.assertTrue(batch.expects("a"))
+        self.assertFalse(batch.expects("c"))
+        self.assertEqual(batch.take("a"), ["src/a/a.go:1:1: one",
+                                           "src/a/x.go:4:1: three"])
+        self.assertEqual(batch.take("b"), ["src/b/sub/b.go:2:1: two"])
+        self.assertFalse(batch.timed_out)
+        run.assert_called_once_with(["a", "b"])
+
+    def test_runs_once_for_concurrent_steps(self):
+        started = threading.Event()
+
+        def run(packages):
+            started.set()
+            return FakeProcess(["{0}/a.go:1:1: x".format(package)
+                                for package in packages])
+
+        run = Mock(side_effect=run)
+        packages = ["p{0}".format(i) for i in range(8)]
+        batch = Batch(packages, run, lambda package: package)
+        taken = {}
+        threads = [threading.Thread(
+            target=lambda p=package: taken.update({p: batch.take(p)}))
+            for package in packages]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(taken, dict((package, ["{0}/a.go:1:1: x".format(
+            package)]) for package in packages))
+
+    def test_timed_out(self):
+        process = FakeProcess(["a/a.go:1:1: one"])
+        process.timed_out = True
+        batch = Batch(["a", "b"], Mock(return_value=process),
+                      lambda package: package)
+
+        self.assertEqual(batch.take("b"), [])
+        self.assertTrue(batch.timed_out)
+
+
+if __name__ == '__main__':
+    unittest.main()
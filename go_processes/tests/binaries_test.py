@@ -0,0 +1,126 @@
+"""Tests for the binaries package."""
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from go_processes.binaries import BinaryStore
+from go_processes.coverage_profile import ProfileRun
+from utils.go_source import GoSource
+
+# Stands in for a compiled test binary, writing a profile of one block.
+FAKE_BINARY = """#!/bin/sh
+profile="${1#-test.coverprofile=}"
+echo "mode: set" > "$profile"
+echo "example.com/a/a.go:3.19,4.11 1 1" >> "$profile"
+echo PASS
+"""
+
+
+class FakeStore(BinaryStore):
+    """Copies the fake binary rather than running go test -c."""
+
+    def __init__(self, root, directory):
+        super(FakeStore, self).__init__(GoSource("glide", root), directory)
+        self.log = os.path.join(directory, "compiles.log")
+        self.template = os.path.join(root, "fake.test")
+        with open(self.template, "w") as f:
+            f.write(FAKE_BINARY)
+        os.chmod(self.template, stat.S_IRWXU)
+
+    def compile_script(self, import_path, output, env_prefix="", flags=""):
+        if import_path.endswith("none"):
+            return "echo {0} >> {1}; echo '?   {0} [no test files]'".format(
+                import_path, self.log)
+        return "echo {0} >> {1}; cp {2} {3}".format(
+            import_path, self.log, self.template, output)
+
+    def go_version(self):
+        return "go version go1.10 linux/amd64"
+
+    def compiles(self):
+        if not os.path.isfile(self.log):
+            return []
+        with open(self.log) as f:
+            return f.read().split()
+
+
+class TestBinaryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.directory = os.path.join(self.root, ".binaries")
+        self._write("glide.yaml", "package: example.com\n")
+        self._write("a/a.go", 'package a\n\nimport "example.com/lib"\n')
+        self._write("a/a_test.go", "package a\n")
+        self._write("lib/lib.go", "package lib\n")
+        self._write("none/none.go", "package none\n")
+        self.store = FakeStore(self.root, self.directory)
+        self.dirs = {"example.com/a": os.path.join(self.root, "a"),
+                     "example.com/none": os.path.join(self.root, "none")}
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_key_changes_with_imports_and_flags(self):
+        a = self.dirs["example.com/a"]
+        before = self.store.key("example.com/a", a)
+
+        self.assertEqual(self.store.key("example.com/a", a), before)
+        self.assertNotEqual(self.store.key("example.com/a", a, " -vet=all"),
+                            before)
+        self._write("lib/lib.go", "package lib\n\nvar X = 1\n")
+        self.assertNotEqual(
+            FakeStore(self.root, self.directory).key("example.com/a", a),
+            before)
+
+    def test_stores_binaries_and_packages_without_tests(self):
+        self.assertEqual(self.store.find("ab12"), (None, False))
+
+        output = self.store.new_output()
+        binary = self.store.store("ab12", output, False)
+        self.assertEqual(self.store.find("ab12"), (binary, False))
+        self.assertFalse(os.path.exists(output))
+
+        self.store.store("cd34", self.store.new_output(), True)
+        self.assertEqual(self.store.find("cd34"), (None, True))
+
+    def test_runs_compile_once(self):
+        for _ in range(2):
+            run = ProfileRun(["example.com/a", "example.com/none"], 2,
+                             binaries=self.store, directories=self.dirs)
+            results = [(import_path, status, coverage)
+                       for import_path, status, coverage, _ in run]
+
+            self.assertEqual(results, [
+                ("example.com/a", ProfileRun.STATUS_PASS, "100.0%"),
+                ("example.com/none", ProfileRun.STATUS_NO_TESTS, None)])
+
+        self.assertEqual(sorted(self.store.compiles()),
+                         ["example.com/a", "example.com/none"])
+
+    def test_failed_compiles_are_not_stored(self):
+        self.store.compile_script = lambda *args: "echo broken >&2; exit 2"
+
+        run = ProfileRun(["example.com/a"], 1, binaries=self.store,
+                         directories=self.dirs)
+
+        self.assertEqual([status for _, status, _, _ in run],
+                         [ProfileRun.STATUS_FAIL])
+        self.assertEqual(run.other, "broken\n")
+        key = self.store.key("example.com/a", self.dirs["example.com/a"])
+        self.assertEqual(self.store.find(key), (None, False))
+        self.assertEqual([name for name in os.listdir(self.directory)
+                          if name.endswith(".tmp")], [])
+
+    def _write(self, name, content):
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+
+
+if __name__ == '__main__':
+    unittest.main()
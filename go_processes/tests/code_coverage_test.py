@@ -1,9 +1,40 @@
+import threading
+import time
 import unittest
 
 from mock import patch, Mock
-from ddt import ddt
+from ddt import data, ddt, unpack
 
 from go_processes.code_coverage import CodeCoverage
+from go_processes.coverage_profile import CoverageProfile
+from go_processes.diagnostics import render_text
+from go_processes.flaky_tests import FlakyTests
+from go_processes.limiter import ProcessLimiter
+from go_processes.process import StreamingProcess, set_limiter
+from go_processes.slow_tests import SlowTests
+from go_processes.vet_handoff import VetHandoff
+from utils.trends import CoverageTrend
+from utils.ignore import IgnoreList
+
+
+class FakeProcess(object):
+    """Stands in for a StreamingProcess, yields canned output."""
+
+    def __init__(self, out, other=""):
+        self.lines = out.split("\n")
+        self.other = other
+        self.killed = False
+        self.timed_out = False
+        self.returncode = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            if self.killed:
+                return
+            yield line
+
+    def kill(self):
+        self.killed = True
 
 
 @ddt
@@ -13,48 +44,461 @@ class TestCodeCoverage(unittest.TestCase):
     @patch('go_processes.code_coverage.CodeCoverage._log_results')
     def test_get_coverage_fail_glide(self, log_results_patch, run_tests_patch):
         run_tests_patch.return_value = \
-            (self._get_test_output_fail_glide(), "Error")
+            FakeProcess(self._get_test_output_fail_glide(), "Error")
 
         cc = CodeCoverage(self._mock_config())
         err = cc.get_coverage("./f8-jeeves", False)
 
         self.assertTrue(err)
-        log_results_patch\
-            .assert_called_with(True, 25.0,
-                                '/f8-jeeves has no tests.\n/f8-jeeves/environment has no tests.\n/f8-jeeves/service under coverage threshold at 0.0%\n/f8-jeeves/mypackage FAILED.\n')  # NOQA
+        self._assert_logged(
+            log_results_patch, True, 25.0,
+            '/f8-jeeves has no tests.\n/f8-jeeves/environment has no tests.\n/f8-jeeves/service under coverage threshold at 0.0%\n/f8-jeeves/mypackage FAILED.\n')  # NOQA
 
     @patch('go_processes.code_coverage.CodeCoverage._run_tests')
     @patch('go_processes.code_coverage.CodeCoverage._log_results')
     def test_get_coverage_fail_gb(self, log_results_patch, run_tests_patch):
         run_tests_patch.return_value =\
-            (self._get_test_output_fail_gb(), "Error")
+            FakeProcess(self._get_test_output_fail_gb(), "Error")
 
         cc = CodeCoverage(self._mock_config("gb", 30.00))
         err = cc.get_coverage("mypackage", False)
 
         self.assertTrue(err)
-        log_results_patch\
-            .assert_called_with(True, 75.0,
-                                'mypackage has no tests.\n')  # NOQA
+        self._assert_logged(
+            log_results_patch, True, 75.0,
+            'mypackage has no tests.\n')  # NOQA
 
     @patch('go_processes.code_coverage.CodeCoverage._run_tests')
     @patch('go_processes.code_coverage.CodeCoverage._log_results')
     def test_get_coverage_pass(self, log_results_patch, run_tests_patch):
-        run_tests_patch.return_value = (self._get_test_output_pass(), None)
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_pass())
+
+        cc = CodeCoverage(self._mock_config())
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertFalse(err)
+        self._assert_logged(log_results_patch, False, 100.0, "")
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_fail_fast(self, log_results_patch, run_tests_patch):
+        process = FakeProcess(self._get_test_output_fail_glide())
+        run_tests_patch.return_value = process
+
+        cc = CodeCoverage(self._mock_config(), fail_fast=True)
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertTrue(err)
+        self.assertTrue(process.killed)
+        self._assert_logged(
+            log_results_patch, True, 0.0,
+            '/f8-jeeves has no tests.\n/f8-jeeves/environment has no tests.\n/f8-jeeves/service under coverage threshold at 0.0%\n/f8-jeeves/mypackage FAILED.\n')  # NOQA
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_cache_hit(self, log_results_patch, run_tests_patch):
+        cache = Mock()
+        cache.get.return_value = \
+            {"err": False, "total_coverage": 100.0, "packages": {}}
+
+        cc = CodeCoverage(self._mock_config(), cache)
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertFalse(err)
+        self.assertFalse(run_tests_patch.called)
+        self._assert_logged(log_results_patch, False, 100.0, "")
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_caches_passes_only(
+            self, log_results_patch, run_tests_patch):
+        cache = Mock()
+        cache.get.return_value = None
+        cache.key.return_value = "key"
+
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_pass())
+        CodeCoverage(self._mock_config(), cache).get_coverage(
+            "./f8-jeeves", False)
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_fail_glide(), "Error")
+        CodeCoverage(self._mock_config(), cache).get_coverage(
+            "./f8-jeeves", False)
+
+        cache.put.assert_called_once_with(
+            "key", {"err": False, "total_coverage": 100.0,
+                    "packages": {"/f8-jeeves/service/apierrors":
+                                 (100.0, 0.022)}})
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_json_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_fail_json(self, log_results_patch, run_tests_patch):
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_fail_json())
+
+        cc = CodeCoverage(self._mock_config(json=True))
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertTrue(err)
+        self._assert_logged(
+            log_results_patch, True, 33.33,
+            '/f8-jeeves has no tests.\n/f8-jeeves/service under coverage threshold at 0.0%\n/f8-jeeves/mypackage FAILED.\n')  # NOQA
+
+    @patch('go_processes.code_coverage.StreamingProcess')
+    @patch('go_processes.code_coverage.CodeCoverage._list_packages')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_json_fails_packages_without_a_result(
+            self, log_results_patch, list_packages_patch, process_patch):
+        list_packages_patch.return_value = [
+            "fresh8.co/f8-jeeves/service/apierrors",
+            "fresh8.co/f8-jeeves/broken"]
+        process_patch.return_value = \
+            FakeProcess(self._get_test_output_build_failed_json())
+        cache = Mock()
+        cache.get.return_value = None
+
+        cc = CodeCoverage(self._mock_config(json=True), cache)
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertTrue(err)
+        self._assert_logged(log_results_patch, True, 100.0,
+                            "/f8-jeeves/broken FAILED.\n")
+        cache.put.assert_not_called()
+
+    @patch('go_processes.code_coverage.LOGGER')
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_fails_when_no_package_builds(
+            self, log_results_patch, run_tests_patch, logger_patch):
+        run_tests_patch.return_value = FakeProcess(
+            "FAIL\tfresh8.co/f8-jeeves/service [build failed]",
+            "# fresh8.co/f8-jeeves/service\n"
+            "f8-jeeves/service/a.go:3:9: undefined: x\n")
 
         cc = CodeCoverage(self._mock_config())
+
+        self.assertTrue(cc.get_coverage("./f8-jeeves", False))
+        self.assertEqual(log_results_patch.call_count, 0)
+        logger_patch.info.assert_any_call(
+            "/f8-jeeves/service FAILED.\n"
+            "f8-jeeves/service/a.go:3:9: undefined: x\n")
+
+    @patch('go_processes.code_coverage.CodeCoverage._rerun')
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_retries_failed_tests(
+            self, log_results_patch, run_tests_patch, rerun_patch):
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_flaky())
+        rerun_patch.return_value = []
+        flaky = FlakyTests(retries=2)
+
+        cc = CodeCoverage(self._mock_config(coverage=50.0), flaky=flaky)
         err = cc.get_coverage("./f8-jeeves", False)
 
         self.assertFalse(err)
-        log_results_patch.assert_called_with(None, 100.0, "")
+        rerun_patch.assert_called_once_with(
+            "./f8-jeeves", "fresh8.co/f8-jeeves/mypackage", ["TestA"])
+        self._assert_logged(
+            log_results_patch, False, 90.0,
+            "/f8-jeeves/mypackage TestA is flaky, it passed on a retry.\n")
+        self.assertEqual(
+            flaky.tests[("fresh8.co/f8-jeeves/mypackage", "TestA")]["flaky"],
+            1)
+
+    @patch('go_processes.code_coverage.LOGGER')
+    @patch('go_processes.code_coverage.CodeCoverage._rerun')
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    def test_get_coverage_logs_flaky_tests_once(
+            self, run_tests_patch, rerun_patch, logger_patch):
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_flaky())
+        rerun_patch.return_value = []
+
+        cc = CodeCoverage(self._mock_config(coverage=50.0),
+                          flaky=FlakyTests(retries=1))
+
+        self.assertFalse(cc.get_coverage("./f8-jeeves", False))
+        logged = [call[0][0] for call in logger_patch.info.call_args_list
+                  if "is flaky" in call[0][0]]
+        self.assertEqual(
+            logged,
+            ["/f8-jeeves/mypackage TestA is flaky, it passed on a retry.\n"])
+
+    @patch('go_processes.code_coverage.CodeCoverage._rerun')
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_retries_failed_tests_gb(
+            self, log_results_patch, run_tests_patch, rerun_patch):
+        # Test logs are indented, which the gb pattern matches too.
+        run_tests_patch.return_value = FakeProcess(
+            self._get_test_output_flaky().replace("fresh8.co/f8-jeeves/",
+                                                  ""))
+        rerun_patch.return_value = []
+
+        cc = CodeCoverage(self._mock_config(project_type="gb", coverage=50.0),
+                          flaky=FlakyTests(retries=1))
+
+        self.assertFalse(cc.get_coverage("all", False))
+        rerun_patch.assert_called_once_with("all", "mypackage", ["TestA"])
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_retries_after_go_test_frees_its_slot(
+            self, log_results_patch, run_tests_patch):
+        run_tests_patch.side_effect = lambda package: StreamingProcess(
+            "printf '%s\\n' \"$OUTPUT\"", heavy=True)
+        config = self._mock_config(coverage=50.0)
+        config.code_coverage.timeout = None
+        cc = CodeCoverage(config, flaky=FlakyTests(retries=1))
+        cc.RETRY_SCRIPT = "true '{0}{1}{2}'"
+        results = []
+        set_limiter(ProcessLimiter(max_heavy=1))
+        try:
+            with patch.dict("os.environ",
+                            {"OUTPUT": self._get_test_output_flaky()}):
+                run = threading.Thread(target=lambda: results.append(
+                    cc.get_coverage("./f8-jeeves", False)))
+                run.daemon = True
+                run.start()
+                run.join(10)
+        finally:
+            set_limiter(None)
+
+        self.assertEqual(results, [False])
+        self._assert_logged(
+            log_results_patch, False, 90.0,
+            "/f8-jeeves/mypackage TestA is flaky, it passed on a retry.\n")
 
-    def _mock_config(self, project_type="glide", coverage=90.00):
+    @data(([], True), (["TestA"], False))
+    @unpack
+    @patch('go_processes.code_coverage.CodeCoverage._rerun')
+    @patch('go_processes.code_coverage.CodeCoverage._run_json_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_quarantines_flaky_tests(
+            self, quarantined, err, log_results_patch, run_tests_patch,
+            rerun_patch):
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_flaky_json())
+        rerun_patch.side_effect = lambda package, path, tests: tests
+        flaky = FlakyTests(retries=1, quarantine_after=1, tests=dict(
+            (("fresh8.co/f8-jeeves/mypackage", test),
+             {"passed": 0, "flaky": 1, "failed": 0,
+              "last_flaky": int(time.time())})
+            for test in quarantined))
+
+        cc = CodeCoverage(self._mock_config(coverage=50.0, json=True),
+                          flaky=flaky)
+
+        self.assertEqual(cc.get_coverage("./f8-jeeves", False), err)
+        rerun_patch.assert_called_once_with(
+            "./f8-jeeves", "fresh8.co/f8-jeeves/mypackage", ["TestA"])
+        self.assertEqual(
+            flaky.tests[("fresh8.co/f8-jeeves/mypackage", "TestA")]["failed"],
+            1)
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_profiles')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_profile_is_statement_weighted(
+            self, log_results_patch, run_profiles_patch):
+        run = Mock()
+        run.__iter__ = Mock(return_value=iter([
+            ("fresh8.co/f8-jeeves/big", "PASS", "90.0%", 0.1),
+            ("fresh8.co/f8-jeeves/small", "PASS", "50.0%", 0.1),
+        ]))
+        run.other = ""
+        run.timed_out = False
+        run.profile = CoverageProfile()
+        run.profile.read(["mode: set",
+                          "fresh8.co/f8-jeeves/big/a.go:1.1,2.1 9 1",
+                          "fresh8.co/f8-jeeves/big/a.go:3.1,4.1 1 0",
+                          "fresh8.co/f8-jeeves/small/b.go:1.1,2.1 1 1",
+                          "fresh8.co/f8-jeeves/small/b.go:3.1,4.1 1 0"])
+        run_profiles_patch.return_value = run
+
+        cc = CodeCoverage(self._mock_config(coverage=40.0, profile="c.out"))
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertFalse(err)
+        self.assertIs(cc.profile, run.profile)
+        # 10 of 12 statements, rather than the 70% average of the packages.
+        self._assert_logged(log_results_patch, False, 83.33, "")
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_hands_vet_output_over(
+            self, log_results_patch, run_tests_patch):
+        vet_output = "# fresh8.co/f8-jeeves/service\n" \
+                     "f8-jeeves/service/a.go:11:2: unreachable code\n"
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_pass(), vet_output)
+        handoff = VetHandoff()
+        handoff.expect("./f8-jeeves")
+
+        cc = CodeCoverage(self._mock_config(), vet_handoff=handoff)
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        # Reported by go vet rather than as a coverage failure.
+        self.assertFalse(err)
+        self.assertEqual(handoff.take("./f8-jeeves"), vet_output)
+
+    @data((True, " -vet=all"), (False, ""))
+    @unpack
+    def test_cache_key_includes_whether_go_test_vets(self, expects, flag):
+        cache = Mock()
+        handoff = Mock()
+        handoff.expects.return_value = expects
+        config = self._mock_config()
+
+        CodeCoverage(config, cache, vet_handoff=handoff).cache_key(
+            "./f8-jeeves")
+
+        cache.key.assert_called_once_with(
+            "code_coverage", "go", "./f8-jeeves",
+            [config.all.project_type, config.code_coverage, flag],
+            testdata=True)
+
+    @data((True, None, True), (True, "c.out", False), (False, None, True),
+          (False, "c.out", False))
+    @unpack
+    @patch('go_processes.code_coverage.StreamingProcess')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_fails_when_go_list_does(
+            self, timed_out, profile, json, log_results_patch,
+            process_patch):
+        listing = FakeProcess("", "go: cannot find main module")
+        listing.timed_out = timed_out
+        listing.returncode = -9 if timed_out else 1
+        process_patch.side_effect = \
+            lambda script, **kwargs: listing if "list" in script \
+            else FakeProcess("")
+        handoff = Mock()
+        handoff.expects.return_value = True
+        cache = Mock()
+        cache.get.return_value = None
+
+        config = self._mock_config(json=json, profile=profile)
+        config.code_coverage.timeout = None
+        cc = CodeCoverage(config, cache=cache, vet_handoff=handoff)
+
+        self.assertTrue(cc.get_coverage("./f8-jeeves", False))
+        handoff.publish.assert_not_called()
+        cache.put.assert_not_called()
+        self.assertEqual(log_results_patch.call_count, 0)
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_json_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_timed_out_keeps_results(
+            self, log_results_patch, run_tests_patch):
+        process = FakeProcess("\n".join([
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves/service","Output":"coverage: 100.0% of statements\\n"}',  # NOQA
+            '{"Action":"pass","Package":"fresh8.co/f8-jeeves/service","Elapsed":0.5}',  # NOQA
+            '{"Action":"run","Package":"fresh8.co/f8-jeeves/store","Test":"TestHangs"}',  # NOQA
+        ]))
+        process.timed_out = True
+        run_tests_patch.return_value = process
+
+        cc = CodeCoverage(self._mock_config(json=True))
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertTrue(err)
+        self._assert_logged(
+            log_results_patch, True, 100.0,
+            "./f8-jeeves ran out of time.\n"
+            "fresh8.co/f8-jeeves/store TestHangs was still running.\n")
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_json_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_records_timings_json(
+            self, log_results_patch, run_tests_patch):
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_fail_json())
+        slow_tests = SlowTests()
+
+        cc = CodeCoverage(self._mock_config(json=True), slow_tests=slow_tests)
+        cc.get_coverage("./f8-jeeves", False)
+
+        self.assertEqual(slow_tests.slowest_packages(2), [
+            ("/f8-jeeves/service/apierrors", 0.022),
+            ("/f8-jeeves/mypackage", 0.019)])
+        self.assertEqual(slow_tests.slowest_tests(5), [
+            (("fresh8.co/f8-jeeves/service", "TestA"), 0)])
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_records_timings_text(
+            self, log_results_patch, run_tests_patch):
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_fail_glide())
+        slow_tests = SlowTests()
+
+        cc = CodeCoverage(self._mock_config(), slow_tests=slow_tests)
+        cc.get_coverage("./f8-jeeves", False)
+
+        self.assertEqual(slow_tests.slowest_packages(1), [
+            ("/f8-jeeves/service/apierrors", 0.022)])
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_fails_on_drop_from_baseline(
+            self, log_results_patch, run_tests_patch):
+        package = "/f8-jeeves/service/apierrors"
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_pass())
+        trend = CoverageTrend({package: 104.0}, 5.0, "a" * 40)
+
+        cc = CodeCoverage(self._mock_config(), trend=trend)
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertFalse(err)
+        self.assertEqual(trend.packages[package], (100.0, 0.022))
+
+        trend.baseline[package] = 106.0
+        run_tests_patch.return_value = \
+            FakeProcess(self._get_test_output_pass())
+        err = cc.get_coverage("./f8-jeeves", False)
+
+        self.assertTrue(err)
+        self._assert_logged(
+            log_results_patch, True, 100.0,
+            "/f8-jeeves/service/apierrors coverage dropped from 106.0% to "
+            "100.0% since aaaaaaaaaaaa, more than 5.0 points\n")
+
+    @patch('go_processes.code_coverage.CodeCoverage._run_tests')
+    @patch('go_processes.code_coverage.CodeCoverage._log_results')
+    def test_get_coverage_checks_cached_results_against_baseline(
+            self, log_results_patch, run_tests_patch):
+        cache = Mock()
+        cache.key.return_value = "key"
+        cache.get.return_value = {
+            "err": False, "total_coverage": 80.0,
+            "packages": {"/f8-jeeves/service": [80.0, 0.5]}}
+        trend = CoverageTrend({"/f8-jeeves/service": 90.0}, 1.0, "b" * 40)
+
+        err = CodeCoverage(self._mock_config(coverage=50.0), cache,
+                           trend=trend).get_coverage("./f8-jeeves", False)
+
+        self.assertTrue(err)
+        self.assertFalse(run_tests_patch.called)
+        self.assertEqual(trend.packages, {"/f8-jeeves/service": (80.0, 0.5)})
+
+    def _assert_logged(self, log_results_patch, err, total_coverage, text):
+        args = log_results_patch.call_args[0]
+        self.assertEqual(args[:2], (err, total_coverage))
+        self.assertEqual(render_text(args[2]), text)
+
+    def _mock_config(self, project_type="glide", coverage=90.00,
+                     json=False, profile=None):
         mock_coverage = Mock()
         mock_project_type = Mock()
         mock_project_type.project_type = project_type
 
         mock_coverage.ignored_packages = []
+        mock_coverage.ignored = IgnoreList()
         mock_coverage.threshold = coverage
+        mock_coverage.json = json
+        mock_coverage.profile = profile
 
         mock_config = Mock()
         mock_config.code_coverage = mock_coverage
@@ -67,6 +511,50 @@ class TestCodeCoverage(unittest.TestCase):
     def _get_test_output_fail_gb(self):
         return "?   	mypackage	[no test files]\nok  	mypackage/apierrors	0.019s	coverage: 100.0% of statements\nok  	mypackage/store	0.023s	coverage: 100.0% of statements\nok   	mypackage/environment	0.023s	coverage: 100.0% of statements"  # NOQA
 
+    def _get_test_output_fail_json(self):
+        return "\n".join([
+            '{"Action":"start","Package":"fresh8.co/f8-jeeves"}',
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves","Output":"?   \\tfresh8.co/f8-jeeves\\t[no test files]\\n"}',  # NOQA
+            '{"Action":"skip","Package":"fresh8.co/f8-jeeves","Elapsed":0}',
+            '{"Action":"run","Package":"fresh8.co/f8-jeeves/service","Test":"TestA"}',  # NOQA
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves/service","Test":"TestA","Output":"coverage: 99.0% of statements\\n"}',  # NOQA
+            '{"Action":"pass","Package":"fresh8.co/f8-jeeves/service","Test":"TestA","Elapsed":0}',  # NOQA
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves/service","Output":"coverage: 0.0% of statements\\n"}',  # NOQA
+            '{"Action":"pass","Package":"fresh8.co/f8-jeeves/service","Elapsed":0.019}',  # NOQA
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves/mypackage","Output":"FAIL\\n"}',  # NOQA
+            '{"Action":"fail","Package":"fresh8.co/f8-jeeves/mypackage","Elapsed":0.019}',  # NOQA
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves/service/apierrors","Output":"coverage: 100.0% of statements\\n"}',  # NOQA
+            '{"Action":"pass","Package":"fresh8.co/f8-jeeves/service/apierrors","Elapsed":0.022}',  # NOQA
+        ])
+
+    def _get_test_output_build_failed_json(self):
+        return "\n".join([
+            "FAIL\tfresh8.co/f8-jeeves/broken [build failed]",
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves/service/apierrors","Output":"coverage: 100.0% of statements\\n"}',  # NOQA
+            '{"Action":"pass","Package":"fresh8.co/f8-jeeves/service/apierrors","Elapsed":0.022}',  # NOQA
+        ])
+
+    def _get_test_output_flaky(self):
+        return "\n".join([
+            "--- FAIL: TestA (0.00s)",
+            "    --- FAIL: TestA/sub (0.00s)",
+            "        a_test.go:6: no",
+            "FAIL",
+            "coverage: 80.0% of statements",
+            "FAIL\tfresh8.co/f8-jeeves/mypackage\t0.019s",
+            "ok  \tfresh8.co/f8-jeeves/service\t0.022s\tcoverage: 100.0% of statements",  # NOQA
+            "FAIL",
+        ])
+
+    def _get_test_output_flaky_json(self):
+        return "\n".join([
+            '{"Action":"run","Package":"fresh8.co/f8-jeeves/mypackage","Test":"TestA"}',  # NOQA
+            '{"Action":"fail","Package":"fresh8.co/f8-jeeves/mypackage","Test":"TestA/sub","Elapsed":0}',  # NOQA
+            '{"Action":"fail","Package":"fresh8.co/f8-jeeves/mypackage","Test":"TestA","Elapsed":0}',  # NOQA
+            '{"Action":"output","Package":"fresh8.co/f8-jeeves/mypackage","Output":"coverage: 80.0% of statements\\n"}',  # NOQA
+            '{"Action":"fail","Package":"fresh8.co/f8-jeeves/mypackage","Elapsed":0.019}',  # NOQA
+        ])
+
     def _get_test_output_pass(self):
         return "ok  	fresh8.co/f8-jeeves/service/apierrors" \
                "	0.022s	coverage: 100.0% of statements"
@@ -0,0 +1,78 @@
+"""Tests for the coverage_profile package."""
+import io
+import unittest
+
+from go_processes.coverage_profile import CoverageProfile
+
+
+class TestCoverageProfile(unittest.TestCase):
+
+    def test_read_merges_set_profiles(self):
+        profile = CoverageProfile()
+        profile.read(["mode: set",
+                      "a.co/pkg/a.go:1.10,3.2 2 0",
+                      "a.co/pkg/a.go:4.10,6.2 3 1"])
+        profile.read(["mode: set",
+                      "a.co/pkg/a.go:1.10,3.2 2 1",
+                      "a.co/pkg/a.go:4.10,6.2 3 1"])
+
+        self.assertEqual(len(profile), 2)
+        self.assertEqual(profile.file_statements(), {"a.co/pkg/a.go": (5, 5)})
+        self.assertEqual(self._write(profile),
+                         "mode: set\n"
+                         "a.co/pkg/a.go:1.10,3.2 2 1\n"
+                         "a.co/pkg/a.go:4.10,6.2 3 1\n")
+
+    def test_merge_sums_count_profiles(self):
+        first = CoverageProfile()
+        first.read(["mode: count", "a.co/pkg/a.go:1.10,3.2 2 3"])
+        second = CoverageProfile()
+        second.read(["mode: count", "a.co/pkg/a.go:1.10,3.2 2 4",
+                     "a.co/pkg/a.go:4.10,6.2 1 0"])
+
+        first.merge(second)
+
+        self.assertEqual(self._write(first),
+                         "mode: count\n"
+                         "a.co/pkg/a.go:1.10,3.2 2 7\n"
+                         "a.co/pkg/a.go:4.10,6.2 1 0\n")
+
+    def test_merge_rejects_mixed_modes(self):
+        profile = CoverageProfile()
+        profile.read(["mode: set"])
+
+        with self.assertRaises(ValueError):
+            profile.read(["mode: count"])
+
+    def test_coverage_is_weighted_by_statements(self):
+        profile = CoverageProfile()
+        profile.read(["mode: set",
+                      "a.co/big/a.go:1.1,2.1 8 1",
+                      "a.co/big/b.go:1.1,2.1 2 0",
+                      "a.co/small/a.go:1.1,2.1 1 0",
+                      "a.co/small/a.go:3.1,4.1 1 1"])
+
+        self.assertEqual(profile.package_statements(),
+                         {"a.co/big": (8, 10), "a.co/small": (1, 2)})
+        self.assertAlmostEqual(profile.coverage(), 75.0)
+        self.assertAlmostEqual(profile.coverage(["a.co/small"]), 50.0)
+        self.assertEqual(profile.coverage([]), 0.0)
+
+    def test_merge_many_blocks(self):
+        profile = CoverageProfile()
+        for run in range(2):
+            profile.read("a.co/pkg/f{0}.go:{1}.1,{1}.70000 1 {2}".format(
+                i % 100, i, run) for i in range(20000))
+
+        self.assertEqual(len(profile), 20000)
+        self.assertAlmostEqual(profile.coverage(), 100.0)
+
+    @staticmethod
+    def _write(profile):
+        f = io.StringIO() if str is not bytes else io.BytesIO()
+        profile.write(f)
+        return f.getvalue()
+
+
+if __name__ == '__main__':
+    unittest.main()
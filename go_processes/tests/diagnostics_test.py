@@ -0,0 +1,44 @@
+"""Tests for the diagnostics package."""
+import json
+import unittest
+
+from go_processes.diagnostics import Diagnostic, format_text, from_json, \
+    parse_diagnostic, render_text, to_json
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_parses_positions(self):
+        self.assertEqual(
+            parse_diagnostic("golint", "./svc", "svc/a.go:5:6: exported X"),
+            Diagnostic("golint", "./svc", "exported X", "svc/a.go", 5, 6))
+        self.assertEqual(
+            parse_diagnostic("go_vet", "./svc", "vet: svc/a.go:3: bad", "x"),
+            Diagnostic("go_vet", "./svc", "bad", "svc/a.go", 3, None, "x"))
+
+    def test_keeps_lines_without_a_position(self):
+        diagnostic = parse_diagnostic("go_vet", "./svc", "exit status 1")
+
+        self.assertEqual(diagnostic, Diagnostic("go_vet", "./svc",
+                                                "exit status 1"))
+        self.assertEqual(format_text(diagnostic), "exit status 1")
+
+    def test_formats_as_the_tools_do(self):
+        for line in ["svc/a.go:5:6: exported X", "svc/a.go:3: bad"]:
+            self.assertEqual(
+                format_text(parse_diagnostic("golint", "./svc", line)), line)
+        self.assertEqual(render_text([Diagnostic("t", "p", "one"),
+                                      Diagnostic("t", "p", "two")]),
+                         "one\ntwo\n")
+
+    def test_round_trips_through_json(self):
+        diagnostics = [Diagnostic("golint", "./svc", "m", "a.go", 1, 2, "r"),
+                       Diagnostic("code_coverage", "./svc", "m")]
+
+        stored = json.loads(json.dumps(to_json(diagnostics)))
+
+        self.assertEqual(from_json(stored), diagnostics)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Tests for the flaky tests package."""
+import os
+import re
+import shutil
+import tempfile
+import time
+import unittest
+
+from go_processes import flaky_tests
+from go_processes.flaky_tests import FlakyTests, failed_tests, run_pattern
+
+
+class TestFlakyTests(unittest.TestCase):
+
+    def test_finds_failed_top_level_tests(self):
+        lines = ["--- FAIL: TestBad (0.00s)",
+                 "    --- FAIL: TestBad/sub (0.00s)",
+                 "        bad_test.go:6: no",
+                 "--- FAIL: TestOther (0.01s)",
+                 "FAIL",
+                 "--- FAIL: TestBad (0.00s)"]
+
+        self.assertEqual(failed_tests(lines), ["TestBad", "TestOther"])
+
+    def test_run_pattern_matches_exactly(self):
+        pattern = re.compile(run_pattern(["TestA", "TestB"]))
+
+        self.assertTrue(pattern.match("TestA"))
+        self.assertTrue(pattern.match("TestB"))
+        self.assertFalse(pattern.match("TestAB"))
+
+    def test_reruns_only_the_failing_tests(self):
+        flaky = FlakyTests(retries=3)
+        reruns = []
+
+        def rerun(tests):
+            reruns.append(tests)
+            # TestB is flaky, TestA really is broken.
+            return ["TestA"]
+
+        failing = flaky.retry("pkg", ["TestA", "TestB"], rerun)
+
+        self.assertEqual(failing, ["TestA"])
+        self.assertEqual(reruns, [["TestA", "TestB"], ["TestA"], ["TestA"]])
+        self.assertEqual(flaky.tests[("pkg", "TestA")]["failed"], 1)
+        self.assertEqual(flaky.tests[("pkg", "TestB")]["flaky"], 1)
+
+    def test_stops_retrying_once_they_pass(self):
+        flaky = FlakyTests(retries=3)
+        reruns = []
+
+        def rerun(tests):
+            reruns.append(tests)
+            return []
+
+        self.assertEqual(flaky.retry("pkg", ["TestA"], rerun), [])
+        self.assertEqual(len(reruns), 1)
+
+    def test_quarantines_recent_flakes(self):
+        flaky = FlakyTests(retries=1, quarantine_after=2)
+        flaky.retry("pkg", ["TestA"], lambda tests: [])
+        self.assertFalse(flaky.is_quarantined("pkg", "TestA"))
+
+        flaky.retry("pkg", ["TestA"], lambda tests: [])
+        self.assertTrue(flaky.is_quarantined("pkg", "TestA"))
+        self.assertFalse(FlakyTests(tests=flaky.tests)
+                         .is_quarantined("pkg", "TestA"))
+
+        flaky.tests[("pkg", "TestA")]["last_flaky"] = \
+            time.time() - (flaky_tests.QUARANTINE_DAYS + 1) * 24 * 60 * 60
+        self.assertFalse(flaky.is_quarantined("pkg", "TestA"))
+
+    def test_only_records_passes_of_tests_which_failed(self):
+        flaky = FlakyTests(retries=1)
+        flaky.add("pkg", "TestA", flaky_tests.OUTCOME_PASSED)
+        self.assertEqual(flaky.tests, {})
+
+        flaky.retry("pkg", ["TestA"], lambda tests: tests)
+        flaky.add("pkg", "TestA", flaky_tests.OUTCOME_PASSED)
+        self.assertEqual(flaky.tests[("pkg", "TestA")]["passed"], 1)
+
+    def test_round_trips_through_a_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "flaky.json")
+            flaky = FlakyTests(retries=1)
+            flaky.retry("pkg", ["TestA", "TestB"], lambda tests: ["TestA"])
+            flaky.write(path)
+
+            read = FlakyTests.read(path, 2, 3)
+
+            self.assertEqual(read.tests, flaky.tests)
+            self.assertEqual((read.retries, read.quarantine_after), (2, 3))
+            self.assertEqual(
+                FlakyTests.read(os.path.join(directory, "none")).tests, {})
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Tests for the go_lexer package."""
+import unittest
+
+from go_processes.go_lexer import COMMENT, IDENT, NUMBER, OP, RUNE, STRING, \
+    Token, is_keyword, tokenize
+
+
+class TestTokenize(unittest.TestCase):
+
+    def test_tokens(self):
+        tokens = list(tokenize('x := http.Get("a") // note\n'))
+
+        self.assertEqual(tokens, [
+            Token(IDENT, "x", 1),
+            Token(OP, ":=", 1),
+            Token(IDENT, "http", 1),
+            Token(OP, ".", 1),
+            Token(IDENT, "Get", 1),
+            Token(OP, "(", 1),
+            Token(STRING, '"a"', 1),
+            Token(OP, ")", 1),
+            Token(COMMENT, "// note", 1),
+        ])
+
+    def test_literals_hide_code(self):
+        tokens = list(tokenize(
+            's := "http.Get(\\"x\\")" + `raw\nhttp.Get(` + \'"\'\n'
+            "/* http.Get(\n */ n := 1.5e+3\n"))
+
+        self.assertEqual([(t.kind, t.line) for t in tokens], [
+            (IDENT, 1), (OP, 1), (STRING, 1), (OP, 1), (STRING, 1), (OP, 2),
+            (RUNE, 2), (COMMENT, 3), (IDENT, 4), (OP, 4), (NUMBER, 4),
+        ])
+        self.assertEqual(tokens[-1].value, "1.5e+3")
+
+    def test_is_keyword(self):
+        func, name = tokenize("func init")
+
+        self.assertTrue(is_keyword(func))
+        self.assertFalse(is_keyword(name))
+
+
+if __name__ == '__main__':
+    unittest.main()
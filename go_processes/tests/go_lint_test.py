@@ -0,0 +1,62 @@
+"""Tests for the go lint package."""
+import unittest
+
+from ddt import ddt, data, unpack
+from mock import Mock, patch
+
+from go_processes.go_lint import GoLint
+from utils.ignore import IgnoreList
+
+
+class FakeProcess(object):
+    """Stands in for a StreamingProcess, yields canned output."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.killed = False
+        self.timed_out = False
+
+    def __iter__(self):
+        for line in self.lines:
+            if self.killed:
+                return
+            yield line
+
+    def kill(self):
+        self.killed = True
+
+
+@ddt
+class TestGoLint(unittest.TestCase):
+
+    @data((False, 2), (True, None))
+    @unpack
+    @patch('go_processes.go_lint.GoLint._run_script')
+    @patch('go_processes.go_lint.GoLint._log_results')
+    def test_go_lint_caches_complete_results_only(
+            self, fail_fast, cached, log_results_patch, run_script_patch):
+        run_script_patch.return_value = FakeProcess([
+            "src/mypackage/a.go:1:1: exported A should have comment",
+            "src/mypackage/b.go:2:1: exported B should have comment"])
+        cache = Mock()
+        cache.key.return_value = "0123abcd"
+        cache.get.return_value = None
+
+        lint = GoLint(self._mock_config(), cache, fail_fast)
+
+        self.assertTrue(lint.go_lint("mypackage", False))
+        if cached is None:
+            cache.put.assert_not_called()
+        else:
+            cache.put.assert_called_once()
+            self.assertEqual(
+                len(cache.put.call_args[0][1]["diagnostics"]), cached)
+
+    def _mock_config(self):
+        config = Mock()
+        config.golint.ignored = IgnoreList()
+        return config
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Tests for the go vet package."""
+import unittest
+
+from ddt import ddt, data, unpack
+from mock import Mock, patch
+
+from go_processes.go_vet import GoVet
+from utils.ignore import IgnoreList
+
+
+class FakeProcess(object):
+    """Stands in for a StreamingProcess, yields canned output."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.killed = False
+        self.timed_out = False
+
+    def __iter__(self):
+        for line in self.lines:
+            if self.killed:
+                return
+            yield line
+
+    def kill(self):
+        self.killed = True
+
+
+@ddt
+class TestGoVet(unittest.TestCase):
+
+    @data((False, 2), (True, None))
+    @unpack
+    @patch('go_processes.go_vet.GoVet._run_script')
+    @patch('go_processes.go_vet.GoVet._log_results')
+    def test_go_vet_caches_complete_results_only(
+            self, fail_fast, cached, log_results_patch, run_script_patch):
+        run_script_patch.return_value = FakeProcess([
+            "# mypackage",
+            "mypackage/a.go:1:2: unreachable code",
+            "mypackage/b.go:3:4: unreachable code"])
+        cache = Mock()
+        cache.key.return_value = "0123abcd"
+        cache.get.return_value = None
+
+        vet = GoVet(self._mock_config(), cache, fail_fast)
+
+        self.assertTrue(vet.go_vet("./mypackage", False))
+        if cached is None:
+            cache.put.assert_not_called()
+        else:
+            cache.put.assert_called_once()
+            self.assertEqual(
+                len(cache.put.call_args[0][1]["diagnostics"]), cached)
+
+    @data("./mypackage", "mypackage")
+    @patch('go_processes.go_vet.GoVet._run_script')
+    @patch('go_processes.go_vet.GoVet._log_results')
+    def test_go_vet_matches_packages_with_a_leading_dot(
+            self, package, log_results_patch, run_script_patch):
+        run_script_patch.return_value = FakeProcess([
+            "# mypackage",
+            "mypackage/a.go:1:2: unreachable code"])
+
+        vet = GoVet(self._mock_config())
+
+        self.assertTrue(vet.go_vet(package, False))
+        diagnostics, err = log_results_patch.call_args[0]
+        self.assertEqual([d.message for d in diagnostics],
+                         ["unreachable code"])
+
+    def _mock_config(self):
+        config = Mock()
+        config.go_vet.ignored = IgnoreList()
+        return config
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""Tests for the limiter package."""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from go_processes import process as process_module
+from go_processes.limiter import ProcessLimiter, available_memory_mb
+from go_processes.process import StreamingProcess, set_deadline, set_limiter
+
+
+class TestProcessLimiter(unittest.TestCase):
+
+    def _acquire_later(self, limiter, heavy=False):
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire(heavy)
+            acquired.set()
+        thread = threading.Thread(target=acquire)
+        thread.daemon = True
+        thread.start()
+        return acquired
+
+    def test_caps_processes(self):
+        limiter = ProcessLimiter(max_processes=2)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire(heavy=True))
+
+        acquired = self._acquire_later(limiter)
+        self.assertFalse(acquired.wait(0.1))
+
+        limiter.release(heavy=True)
+        self.assertTrue(acquired.wait(1))
+        self.assertEqual((limiter.running, limiter.heavy), (2, 0))
+
+    def test_caps_heavy_processes_separately(self):
+        limiter = ProcessLimiter(max_processes=3, max_heavy=1)
+        limiter.acquire(heavy=True)
+
+        self.assertTrue(limiter.acquire())
+        acquired = self._acquire_later(limiter, heavy=True)
+        self.assertFalse(acquired.wait(0.1))
+
+        limiter.release(heavy=True)
+        self.assertTrue(acquired.wait(1))
+
+    def test_waits_for_memory_while_heavy_processes_run(self):
+        available = [100]
+        limiter = ProcessLimiter(min_available_mb=500,
+                                 available=lambda: available[0])
+        # The first is let through however little memory is available.
+        self.assertTrue(limiter.acquire(heavy=True))
+        self.assertTrue(limiter.acquire())
+
+        acquired = self._acquire_later(limiter, heavy=True)
+        self.assertFalse(acquired.wait(0.3))
+
+        available[0] = 1000
+        self.assertTrue(acquired.wait(1))
+
+    def test_gives_up(self):
+        limiter = ProcessLimiter(max_processes=1)
+        limiter.acquire()
+
+        self.assertFalse(limiter.acquire(give_up=lambda: True))
+        self.assertEqual(limiter.running, 1)
+
+    def test_reads_available_memory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "meminfo")
+            with open(path, "w") as f:
+                f.write("MemTotal:       16384000 kB\n"
+                        "MemFree:         1024000 kB\n"
+                        "MemAvailable:    4096000 kB\n")
+
+            self.assertEqual(available_memory_mb(path), 4000)
+            self.assertIsNone(
+                available_memory_mb(os.path.join(directory, "none")))
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestLimitedProcesses(unittest.TestCase):
+
+    def tearDown(self):
+        set_limiter(None)
+        set_deadline(None)
+
+    def test_processes_hold_a_slot_until_waited_for(self):
+        limiter = ProcessLimiter(max_processes=1, max_heavy=1)
+        set_limiter(limiter)
+
+        process = StreamingProcess("echo one", heavy=True)
+        self.assertEqual((limiter.running, limiter.heavy), (1, 1))
+
+        self.assertEqual(list(process), ["one"])
+        self.assertEqual((limiter.running, limiter.heavy), (0, 0))
+
+    def test_processes_run_one_at_a_time(self):
+        set_limiter(ProcessLimiter(max_processes=1))
+        starts = []
+
+        def run():
+            process = StreamingProcess("sleep 0.2; echo done")
+            starts.append(time.time())
+            list(process)
+        threads = [threading.Thread(target=run) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertGreaterEqual(abs(starts[1] - starts[0]), 0.15)
+
+    def test_starts_without_a_slot_once_the_deadline_passes(self):
+        limiter = ProcessLimiter(max_processes=1)
+        limiter.acquire()
+        set_limiter(limiter)
+        set_deadline(time.time())
+
+        process = StreamingProcess("sleep 5")
+        list(process)
+
+        self.assertTrue(process.timed_out)
+        self.assertEqual(limiter.running, 1)
+        self.assertFalse(process_module._running)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""Tests for the process package."""
+import os
+import sys
+import time
+import unittest
+
+from mock import patch
+
+from go_processes import process as process_module
+from go_processes.process import StreamingProcess, STDERR, Usage, \
+    deadline_passed, json_objects, set_deadline, time_left, track_usage
+
+
+class TestStreamingProcess(unittest.TestCase):
+
+    def test_iterates_stdout_and_collects_stderr(self):
+        process = StreamingProcess("echo one; echo oops >&2; echo two")
+
+        self.assertEqual(list(process), ["one", "two"])
+        self.assertEqual(process.other, "oops\n")
+        self.assertEqual(process.returncode, 0)
+
+    def test_iterates_stderr(self):
+        process = StreamingProcess("echo one; echo oops >&2", STDERR)
+
+        self.assertEqual(list(process), ["oops"])
+        self.assertEqual(process.other, "one\n")
+
+    def test_yields_lines_before_the_process_ends(self):
+        process = StreamingProcess("echo first; sleep 5; echo second")
+        start = time.time()
+
+        first = next(iter(process))
+        process.kill()
+
+        self.assertEqual(first, "first")
+        self.assertLess(time.time() - start, 4)
+
+    def test_does_not_deadlock_on_large_output(self):
+        process = StreamingProcess(
+            "head -c 200000 /dev/zero | tr '\\\\0' 'x' >&2; echo done")
+
+        self.assertEqual(list(process), ["done"])
+        self.assertEqual(len(process.other), 200000)
+
+    def test_accounts_usage_to_the_tracked_step(self):
+        usage = Usage()
+        previous = track_usage(usage)
+        try:
+            list(StreamingProcess("echo one; echo oops >&2; exit 3"))
+            process = StreamingProcess("sleep 5")
+            process.kill()
+        finally:
+            track_usage(previous)
+
+        self.assertEqual(usage.processes, 2)
+        self.assertEqual(usage.output_bytes, len("one\noops\n"))
+        self.assertGreater(usage.max_rss_kb, 0)
+        self.assertLess(process.returncode, 0)
+
+    def test_timeout_keeps_output_so_far(self):
+        start = time.time()
+        process = StreamingProcess("echo first; sleep 5; echo second",
+                                   timeout=0.5)
+
+        self.assertEqual(list(process), ["first"])
+        self.assertTrue(process.timed_out)
+        self.assertLess(time.time() - start, 4)
+
+    @patch.object(process_module, "KILL_GRACE", 0.2)
+    def test_timeout_kills_what_ignores_terminate(self):
+        process = StreamingProcess(
+            "trap '' TERM; echo ready; sleep 5; echo second", timeout=0.3)
+
+        self.assertEqual(list(process), ["ready"])
+        self.assertTrue(process.timed_out)
+
+    def test_finishing_in_time(self):
+        process = StreamingProcess("echo one", timeout=5)
+
+        self.assertEqual(list(process), ["one"])
+        self.assertFalse(process.timed_out)
+
+    def test_deadline(self):
+        set_deadline(time.time() + 0.5)
+        try:
+            process = StreamingProcess("echo first; sleep 5; echo second",
+                                       timeout=10)
+            self.assertEqual(list(process), ["first"])
+            self.assertTrue(process.timed_out)
+            self.assertTrue(deadline_passed())
+            self.assertEqual(time_left(3), 0)
+        finally:
+            set_deadline(None)
+
+        self.assertFalse(deadline_passed())
+        self.assertEqual(time_left(3), 3)
+        self.assertIsNone(time_left())
+
+    def test_runs_in_its_own_session(self):
+        process = StreamingProcess(
+            "{0} -c 'import os; print(os.getsid(0))'".format(sys.executable))
+
+        self.assertNotEqual(int(list(process)[0]), os.getsid(0))
+
+    def test_reports_exit_code(self):
+        process = StreamingProcess("exit 3")
+
+        self.assertEqual(list(process), [])
+        self.assertEqual(process.returncode, 3)
+
+
+class TestJsonObjects(unittest.TestCase):
+
+    def test_decodes_line_and_indented_objects(self):
+        lines = ['{"Action":"start"}',
+                 'not json',
+                 '{',
+                 '\t"ImportPath": "a",',
+                 '\t"Deps": [',
+                 '\t\t"fmt"',
+                 '\t]',
+                 '}',
+                 '{"Action":"pass"}']
+
+        self.assertEqual(list(json_objects(lines)), [
+            {"Action": "start"},
+            {"ImportPath": "a", "Deps": ["fmt"]},
+            {"Action": "pass"},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
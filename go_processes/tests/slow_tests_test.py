@@ -0,0 +1,50 @@
+"""Tests for the slow_tests package."""
+import unittest
+
+from mock import patch
+
+from go_processes.slow_tests import SlowTests
+
+
+class TestSlowTests(unittest.TestCase):
+
+    def test_slowest_first(self):
+        slow_tests = SlowTests()
+        slow_tests.add_package("a", 1.0)
+        slow_tests.add_package("b", 3.0)
+        slow_tests.add_package("c", 2.0)
+        slow_tests.add_package("d", 2.0)
+
+        self.assertEqual(slow_tests.slowest_packages(3),
+                         [("b", 3.0), ("c", 2.0), ("d", 2.0)])
+        self.assertEqual(len(slow_tests.slowest_packages(10)), 4)
+
+    def test_latest_timing_wins(self):
+        slow_tests = SlowTests()
+        slow_tests.add_test("a", "TestA", 5.0)
+        slow_tests.add_test("a", "TestA", 0.5)
+        slow_tests.add_test("a", "TestB", 1.0)
+
+        self.assertEqual(slow_tests.slowest_tests(1),
+                         [(("a", "TestB"), 1.0)])
+
+    @patch("go_processes.slow_tests.LOGGER")
+    def test_log(self, logger):
+        slow_tests = SlowTests()
+        slow_tests.add_package("a", 1.5)
+        slow_tests.add_test("a", "TestA", 0.25)
+
+        slow_tests.log(5)
+
+        logger.info.assert_any_call("SLOWEST PACKAGES:\n    1.500s  a\n")
+        logger.info.assert_any_call("SLOWEST TESTS:\n    0.250s  a TestA\n")
+
+    @patch("go_processes.slow_tests.LOGGER")
+    def test_log_nothing_recorded(self, logger):
+        SlowTests().log(5)
+
+        self.assertFalse(logger.info.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
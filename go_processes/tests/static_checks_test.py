@@ -0,0 +1,184 @@
+"""Tests for the static_checks package."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from ddt import ddt, data, unpack
+from mock import patch
+
+from go_processes import static_checks
+from go_processes.static_checks import HttpTimeoutsRule, InitRule, \
+    PackageCallRule, Rule, StaticChecks, check_source
+
+
+@ddt
+class TestRules(unittest.TestCase):
+
+    @data('var x = f()\n',
+          'var x, y = 1, pkg.New()\n',
+          'var x = 1 +\n\tf()\n',
+          'var (\n\ta = 1\n\tb = f()\n)\n',
+          'var m = map[string]int{"a": f()}\n',
+          'var x = func() int { return 1 }()\n')
+    def test_package_call_found(self, source):
+        findings = check_source("package p\n" + source, [PackageCallRule])
+
+        self.assertEqual(len(findings), 1)
+        self.assertEqual(findings[0][0], "go_package_calls")
+
+    @data('var x = 1\nfunc f() {}\n',
+          'var x = errors.New("x")\n',
+          'var b = []byte("x")\n',
+          'var _ I = (*T)(nil)\n',
+          'var h = func(w io.Writer) { f() }\n',
+          'var h = func() interface{} { return f() }\n',
+          'var t struct{ f func() }\n',
+          'var s = "f()" // f()\n',
+          'func g() {\n\tvar x = f()\n}\n',
+          'var x int\n\nfunc g() { f() }\n')
+    def test_package_call_not_found(self, source):
+        self.assertEqual(
+            check_source("package p\n" + source, [PackageCallRule]), [])
+
+    def test_package_call_message(self):
+        findings = check_source("package p\n\nvar x = pkg.New()\n",
+                                [PackageCallRule])
+
+        self.assertEqual(findings, [
+            ("go_package_calls", 3,
+             "calls pkg.New( in a package level variable")])
+
+    @data(("func init() {}\n", 1),
+          ("func (t T) init() {}\n", 0),
+          ("func f() { init := 1 }\n", 0),
+          ("// func init() {}\n", 0))
+    @unpack
+    def test_init(self, source, count):
+        self.assertEqual(len(check_source(source, [InitRule])), count)
+
+    def test_timeouts_ignore_comments_and_strings(self):
+        findings = check_source(
+            '// http.Get(url)\ns := "http.Get(url)"\nhttp.Get(url)\n',
+            [HttpTimeoutsRule])
+
+        self.assertEqual(findings, [
+            ("go_timeouts", 3, "contains default http function http.Get(")])
+
+
+class TestIgnoreComments(unittest.TestCase):
+
+    RULES = [HttpTimeoutsRule, InitRule, PackageCallRule]
+
+    def test_next_line(self):
+        findings = check_source(
+            "// f8-ignore: [ go_init ]\nfunc init() {}\nvar x = f()\n",
+            self.RULES)
+
+        self.assertEqual([f[0] for f in findings], ["go_package_calls"])
+
+    def test_same_line(self):
+        findings = check_source(
+            "var x = f() // f8-ignore: [ go_package_calls ]\n"
+            "func init() {}\n",
+            self.RULES)
+
+        self.assertEqual([f[0] for f in findings], ["go_init"])
+
+    def test_other_rule_not_ignored(self):
+        findings = check_source(
+            "// f8-ignore: [ go_timeouts, go_package_calls ]\n"
+            "func init() {}\n",
+            self.RULES)
+
+        self.assertEqual([f[0] for f in findings], ["go_init"])
+
+    def test_every_rule(self):
+        self.assertEqual(check_source(
+            "/* f8-ignore */ // f8-ignore\nfunc init() { http.Get(x) }\n",
+            self.RULES), [])
+
+
+class TestStaticChecks(unittest.TestCase):
+
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.source_dir)
+
+    def test_findings(self):
+        self._write("b/b.go", "package b\n\nfunc init() {}\n")
+        self._write("a/a.go", "package a\n\nvar x = f()\n")
+        self._write("vendor/v/v.go", "func init() {}\n")
+        self._write("a/testdata/t.go", "func init() {}\n")
+        self._write(".cache/c.go", "func init() {}\n")
+
+        findings = StaticChecks(self.source_dir,
+                                static_checks.RULES.values()).findings()
+
+        self.assertEqual(
+            [(os.path.relpath(f.file, self.source_dir), f.line, f.rule)
+             for f in findings],
+            [("a/a.go", 3, "go_package_calls"), ("b/b.go", 3, "go_init")])
+
+    @patch.object(static_checks, "PARALLEL_MIN_FILES", 2)
+    def test_parallel_matches_serial(self):
+        for i in range(6):
+            self._write("p{0}/p.go".format(i), "func init() {}\n")
+
+        serial = StaticChecks(self.source_dir, [InitRule], jobs=1).findings()
+        parallel = StaticChecks(self.source_dir, [InitRule],
+                                jobs=2).findings()
+
+        self.assertEqual(len(serial), 6)
+        self.assertEqual(parallel, serial)
+
+    @patch.object(static_checks, "LOGGER")
+    def test_validate(self, logger):
+        self._write("a/a.go", "func init() {}\n")
+
+        err = StaticChecks(self.source_dir,
+                           [HttpTimeoutsRule, InitRule]).validate(False)
+
+        self.assertTrue(err)
+        messages = [c[0][0] for c in logger.info.call_args_list]
+        self.assertEqual(messages[0], "GO TIMEOUTS: PASS")
+        self.assertEqual(messages[1], "GO INIT: FAIL")
+        self.assertIn("declares an init function on line 1", messages[2])
+
+    def test_validate_keeps_previous_error(self):
+        self.assertTrue(StaticChecks(self.source_dir, []).validate(True))
+
+    def test_registered_rules(self):
+        self.assertTrue(all(issubclass(rule, Rule)
+                            for rule in static_checks.RULES.values()))
+        self.assertEqual(list(static_checks.RULES),
+                         ["go_timeouts", "go_init", "go_package_calls"])
+
+    def test_only_the_timeouts_rule_is_on_by_default(self):
+        self._write("a/a.go", "package a\n\nvar x = f()\n\nfunc init() {}\n")
+
+        self.assertEqual(StaticChecks(self.source_dir).rules,
+                         [HttpTimeoutsRule])
+        self.assertEqual(StaticChecks(self.source_dir).findings(), [])
+
+    def test_selects_rules_by_name(self):
+        checks = StaticChecks(self.source_dir,
+                              enabled=["go_init", "go_package_calls"],
+                              ignored=["go_timeouts", "go_package_calls"])
+
+        self.assertEqual(checks.rules, [InitRule])
+        with self.assertRaises(ValueError):
+            StaticChecks(self.source_dir, enabled=["go_inits"])
+
+    def _write(self, name, content):
+        path = os.path.join(self.source_dir, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+
+
+if __name__ == '__main__':
+    unittest.main()
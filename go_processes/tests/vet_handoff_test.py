@@ -0,0 +1,63 @@
+"""Tests for the vet_handoff package."""
+import threading
+import unittest
+
+from go_processes.vet_handoff import VetHandoff, split_vet_output
+
+
+class TestVetHandoff(unittest.TestCase):
+
+    def test_take_waits_for_published_output(self):
+        handoff = VetHandoff()
+        handoff.expect("./svc")
+        timer = threading.Timer(
+            0.05, handoff.publish, ["./svc", "svc/a.go:1:1: bad\n"])
+        timer.start()
+
+        self.assertEqual(handoff.take("./svc"), "svc/a.go:1:1: bad\n")
+        timer.join()
+
+    def test_abandoned_or_unexpected_output_is_none(self):
+        handoff = VetHandoff()
+        handoff.expect("./svc")
+        handoff.abandon("./svc")
+
+        self.assertIsNone(handoff.take("./svc"))
+        self.assertIsNone(handoff.take("./api"))
+        self.assertFalse(handoff.expects("./api"))
+
+    def test_abandon_after_publish_keeps_output(self):
+        handoff = VetHandoff()
+        handoff.expect("./svc")
+        handoff.publish("./svc", "")
+        handoff.abandon("./svc")
+
+        self.assertEqual(handoff.take("./svc"), "")
+
+
+class TestSplitVetOutput(unittest.TestCase):
+
+    def test_splits_package_blocks_from_the_rest(self):
+        stderr = ("go: downloading example.com/dep v1.0.0\n"
+                  "# example.com/svc\n"
+                  "svc/a.go:6:9: fmt.Sprintf format %d has arg of wrong type\n"
+                  "svc/b.go:3:2: cannot use x (variable of type int)\n"
+                  "\thave int\n"
+                  "\n"
+                  "panic during cleanup\n")
+
+        vet, rest = split_vet_output(stderr)
+
+        self.assertEqual(vet, "# example.com/svc\n"
+                              "svc/a.go:6:9: fmt.Sprintf format %d has arg "
+                              "of wrong type\n"
+                              "svc/b.go:3:2: cannot use x (variable of type "
+                              "int)\n"
+                              "\thave int\n")
+        self.assertEqual(rest, "go: downloading example.com/dep v1.0.0\n"
+                               "\n"
+                               "panic during cleanup\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
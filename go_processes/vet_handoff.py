@@ -0,0 +1,100 @@
+"""Vet handoff package.
+
+`go test -vet=all` type checks and vets each package while building its
+tests, writing the same diagnostics to stderr that `go vet` would. Rather
+than compiling everything a second time, the code coverage step hands that
+output over to the go vet step for the same package.
+
+The go vet step is always scheduled after the code coverage step for its
+package, so by the time it waits for the output the coverage step is
+already running. When the coverage step didn't test (a cache hit, or it
+was stopped early) it abandons the handoff and go vet is run as usual.
+"""
+import threading
+
+BUILD_HEADER = "# "
+
+
+class VetHandoff(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+        self._outputs = {}
+
+    def expect(self, package):
+        """Mark a package's vet output as coming from its test run.
+
+        :param package: string, as configured
+        """
+        with self._lock:
+            self._events[package] = threading.Event()
+
+    def expects(self, package):
+        """Return whether a package's test run will vet it.
+
+        :param package: string
+        :return: bool
+        """
+        with self._lock:
+            return package in self._events
+
+    def publish(self, package, output):
+        """Hand over the vet output of a package's test run.
+
+        :param package: string
+        :param output: string, as go vet would write to stderr
+        """
+        self._finish(package, output)
+
+    def abandon(self, package):
+        """Give up on handing over output, go vet runs itself instead.
+
+        Does nothing if the output was already published.
+
+        :param package: string
+        """
+        self._finish(package, None)
+
+    def take(self, package):
+        """Wait for the vet output of a package's test run.
+
+        :param package: string
+        :return: string, None if go vet has to be run
+        """
+        with self._lock:
+            event = self._events.get(package)
+        if event is None:
+            return None
+        event.wait()
+        with self._lock:
+            return self._outputs.pop(package, None)
+
+    def _finish(self, package, output):
+        with self._lock:
+            event = self._events.get(package)
+            if event is None or event.is_set():
+                return
+            if output is not None:
+                self._outputs[package] = output
+            event.set()
+
+
+def split_vet_output(stderr):
+    """Split the build and vet output out of what go test wrote to stderr.
+
+    Each package's problems follow a `# import/path` header, anything
+    else is left for the caller to report.
+
+    :param stderr: string
+    :return: (string, string), the vet output and the rest
+    """
+    vet, rest = [], []
+    in_block = False
+    for line in stderr.splitlines(True):
+        if line.startswith(BUILD_HEADER):
+            in_block = True
+        elif not line.strip() or not line[0].isspace() and ":" not in line:
+            in_block = False
+        (vet if in_block else rest).append(line)
+    return "".join(vet), "".join(rest)
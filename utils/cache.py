@@ -0,0 +1,459 @@
+"""Cache package.
+
+Stores the parsed results of a tool run against a package, keyed by a hash
+of everything that could change them: the package's .go files and those of
+its local imports, the tool's version and the config section the tool
+reads.
+
+Where they are stored is up to the backend. DirectoryBackend keeps them on
+disk, evicting entries least recently used first once the cache grows past
+its size limit. HttpBackend shares them between machines through a store
+which answers GET, HEAD and PUT for each key, and POST /batch for several
+at once, such as the one in `utils.cache_server`. As the key is a hash of
+the results' inputs, any build of the same tree can use them.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+
+try:
+    from http.client import HTTPConnection, HTTPException, HTTPSConnection
+    from urllib.parse import urlsplit
+except ImportError:  # Python 2
+    from httplib import HTTPConnection, HTTPException, HTTPSConnection
+    from urlparse import urlsplit
+
+from go_processes.process import current_usage
+from utils.go_source import GoSource
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = ".f8ci-cache"
+DEFAULT_MAX_SIZE_MB = 100
+
+# Requests a HttpBackend has open at once, and seconds it waits on each.
+DEFAULT_CONNECTIONS = 4
+DEFAULT_TIMEOUT = 10
+# Keys looked up in a single POST /batch.
+BATCH_SIZE = 100
+
+
+class ResultCache(object):
+
+    # Bump when the layout of stored results changes.
+    VERSION = 2
+
+    def __init__(self, source, directory=DEFAULT_DIRECTORY,
+                 max_size_mb=DEFAULT_MAX_SIZE_MB, backend=None):
+        """
+        :param source: GoSource
+        :param directory: string, for the default DirectoryBackend
+        :param max_size_mb: number, for the default DirectoryBackend
+        :param backend: DirectoryBackend or HttpBackend, optional
+        """
+        self.source = source
+        self.backend = backend if backend is not None \
+            else DirectoryBackend(directory, max_size_mb)
+        self._versions = {}
+        self._fingerprints = {}
+        self._prefetched = {}
+
+    def key(self, tool, executable, package, config_section,
+            testdata=False):
+        """Build the cache key for running a tool against a package.
+
+        :param tool: string
+        :param executable: string, the binary whose version affects results
+        :param package: string
+        :param config_section: dict, or a config Section
+        :param testdata: bool, whether the results depend on the files
+            under the package's testdata directories, i.e. it runs the tests
+        :return: string
+        """
+        fingerprint = (package, testdata)
+        if fingerprint not in self._fingerprints:
+            self._fingerprints[fingerprint] = self.source.fingerprint(
+                package, testdata)
+
+        key = json.dumps([self.VERSION,
+                          tool,
+                          package,
+                          self.source.project_type,
+                          self._fingerprints[fingerprint],
+                          self.tool_version(executable),
+                          config_section], sort_keys=True,
+                         default=lambda section: section.as_dict())
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def __contains__(self, key):
+        """Whether results are stored for a key, without using them.
+
+        :param key: string
+        :return: bool
+        """
+        return key in self._prefetched or key in self.backend
+
+    def prefetch(self, keys):
+        """Fetch the results for several keys up front, in batches.
+
+        Saves a round trip per step with a remote backend. Replaces those
+        fetched before.
+
+        :param keys: iterable of string
+        :return: int, number of keys with results
+        """
+        self._prefetched = self.backend.get_many(sorted(set(keys)))
+        return len(self._prefetched)
+
+    def get(self, key):
+        """Return the stored results for a key, None on a miss.
+
+        A hit marks the entry as recently used.
+
+        :param key: string
+        :return: dict or None
+        """
+        data = self._prefetched.get(key)
+        if data is None:
+            data = self.backend.get(key)
+        usage = current_usage()
+        try:
+            value = json.loads(data) if data is not None else None
+        except ValueError:
+            value = None
+        if value is None:
+            if usage is not None:
+                usage.add_cache_lookup(False)
+            return None
+        LOGGER.debug("Cache hit: {0}".format(key))
+        if usage is not None:
+            usage.add_cache_lookup(True)
+        return value
+
+    def put(self, key, value):
+        """Store results for a key.
+
+        :param key: string
+        :param value: dict, must be JSON serialisable
+        """
+        self.backend.put(key, json.dumps(value))
+
+    def prune(self):
+        """Have the backend evict entries until under its size limit.
+
+        :return: int, number of entries removed
+        """
+        return self.backend.prune()
+
+    def tool_version(self, executable):
+        """Identify the installed version of a tool.
+
+        `go version` is used for go, other tools rarely report a version so
+        the binary's size and modification time stand in for one.
+
+        :param executable: string
+        :return: string
+        """
+        if executable not in self._versions:
+            path = _find_executable(executable)
+            if path is None:
+                version = ""
+            elif executable == "go":
+                p = subprocess.Popen(
+                    [path, "version"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    universal_newlines=True)
+                version = p.communicate()[0].strip()
+            else:
+                stat = os.stat(path)
+                version = "{0}:{1}:{2}".format(
+                    path, stat.st_size, int(stat.st_mtime))
+            self._versions[executable] = version
+        return self._versions[executable]
+
+
+class DirectoryBackend(object):
+    """Entries kept as files in a local directory."""
+
+    ENTRY_EXTENSION = ".json"
+    # Whether a lookup costs a round trip, so is worth prefetching.
+    REMOTE = False
+
+    def __init__(self, directory=DEFAULT_DIRECTORY,
+                 max_size_mb=DEFAULT_MAX_SIZE_MB):
+        """
+        :param directory: string
+        :param max_size_mb: number
+        """
+        self.directory = directory
+        self.max_size = int(max_size_mb * 1024 * 1024)
+
+    def __contains__(self, key):
+        return os.path.isfile(self.path(key))
+
+    def get(self, key):
+        """Return an entry, marking it as recently used.
+
+        :param key: string
+        :return: string or None
+        """
+        path = self.path(key)
+        try:
+            with open(path, "r") as f:
+                data = f.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return data
+
+    def get_many(self, keys):
+        """
+        :param keys: [string]
+        :return: dict of key to entry, for the keys with one
+        """
+        entries = {}
+        for key in keys:
+            data = self.get(key)
+            if data is not None:
+                entries[key] = data
+        return entries
+
+    def put(self, key, data):
+        """Store an entry.
+
+        Written to a temporary file first so concurrent readers never see
+        a partial entry.
+
+        :param key: string
+        :param data: string
+        """
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.rename(tmp, path)
+        except (IOError, OSError) as e:
+            LOGGER.warning("Unable to write cache entry: {0}".format(e))
+
+    def prune(self):
+        """Evict the least recently used entries until under the size limit.
+
+        :return: int, number of entries removed
+        """
+        return prune_directory(self.directory, self.max_size)
+
+    def path(self, key):
+        """
+        :param key: string
+        :return: string, the entry's file
+        """
+        return os.path.join(
+            self.directory, key[:2], key + self.ENTRY_EXTENSION)
+
+
+class HttpBackend(object):
+    """Entries kept by a HTTP store shared between machines.
+
+    Connections are kept alive and reused by later requests, up to
+    `connections` at once. The cache only saves time, so if the store
+    can't be reached a warning is logged and the rest of the run goes on
+    without it.
+    """
+
+    REMOTE = True
+
+    def __init__(self, url, connections=DEFAULT_CONNECTIONS,
+                 timeout=DEFAULT_TIMEOUT):
+        """
+        :param url: string, e.g. `http://cache.internal:8081/f8ci`
+        :param connections: int
+        :param timeout: number, seconds
+        :raises ValueError: if it isn't a http or https URL
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError("Not a http or https URL: {0}".format(url))
+        self.url = url
+        self.timeout = timeout
+        self.available = True
+        self._connection_class = HTTPSConnection \
+            if parts.scheme == "https" else HTTPConnection
+        self._host = parts.netloc
+        self._prefix = parts.path.rstrip("/")
+        self._slots = threading.BoundedSemaphore(connections)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        response = self._request("HEAD", "/" + key)
+        return response is not None and response[0] == 200
+
+    def get(self, key):
+        """
+        :param key: string
+        :return: string or None
+        """
+        response = self._request("GET", "/" + key)
+        if response is None or response[0] != 200:
+            return None
+        return response[1].decode("utf-8")
+
+    def get_many(self, keys):
+        """Fetch entries BATCH_SIZE keys a request.
+
+        :param keys: [string]
+        :return: dict of key to entry, for the keys with one
+        """
+        entries = {}
+        for i in range(0, len(keys), BATCH_SIZE):
+            body = json.dumps({"keys": keys[i:i + BATCH_SIZE]})
+            response = self._request("POST", "/batch", body.encode("utf-8"))
+            if response is None or response[0] != 200:
+                break
+            try:
+                entries.update(json.loads(
+                    response[1].decode("utf-8"))["entries"])
+            except (ValueError, KeyError, TypeError):
+                LOGGER.warning("Bad batch response from the result cache")
+                break
+        return entries
+
+    def put(self, key, data):
+        """
+        :param key: string
+        :param data: string
+        """
+        response = self._request("PUT", "/" + key, data.encode("utf-8"))
+        if response is not None and response[0] not in (200, 201, 204):
+            LOGGER.warning("Unable to write cache entry: HTTP {0}".format(
+                response[0]))
+
+    def prune(self):
+        """The store keeps to its own size limit.
+
+        :return: int, always 0
+        """
+        return 0
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _request(self, method, path, body=None):
+        """Make a request on a pooled connection.
+
+        A kept alive connection may have been closed by the store since it
+        was last used, so a failed request is retried once on a new one.
+
+        :param method: string
+        :param path: string
+        :param body: bytes, optional
+        :return: (int, bytes), the status and body, None if unreachable
+        """
+        if not self.available:
+            return None
+        headers = {"Content-Type": "application/json"} if body else {}
+        with self._slots:
+            for reused in [True, False]:
+                connection = self._connection(reused)
+                try:
+                    connection.request(method, self._prefix + path, body,
+                                       headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                except (HTTPException, socket.error, IOError) as e:
+                    connection.close()
+                    error = e
+                    continue
+                if response.getheader("Connection", "").lower() == "close":
+                    connection.close()
+                else:
+                    with self._lock:
+                        self._idle.append(connection)
+                return response.status, data
+        self.available = False
+        self.close()
+        LOGGER.warning("Unable to reach the result cache at {0}, carrying on "
+                       "without it: {1}".format(self.url, error))
+        return None
+
+    def _connection(self, reused):
+        if reused:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+        return self._connection_class(self._host, timeout=self.timeout)
+
+
+def prune_directory(directory, max_size):
+    """Remove the least recently used files until a directory is small enough.
+
+    :param directory: string
+    :param max_size: int, bytes
+    :return: int, number of files removed
+    """
+    entries = []
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    size = sum(entry[1] for entry in entries)
+    removed = 0
+    for mtime, entry_size, path in sorted(entries):
+        if size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        size -= entry_size
+        removed += 1
+    return removed
+
+
+def _find_executable(executable):
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        path = os.path.join(directory, executable)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def get_cache(config):
+    """Build the result cache described by the config, if any.
+
+    Caching is enabled by the optional `cache` section, and shared through
+    a HTTP store when it has a `url`.
+
+    :param config: Config
+    :return: ResultCache or None
+    """
+    if config.cache is None:
+        return None
+    if config.cache.url:
+        backend = HttpBackend(
+            config.cache.url,
+            connections=config.cache.connections or DEFAULT_CONNECTIONS)
+    else:
+        backend = DirectoryBackend(
+            config.cache.directory or DEFAULT_DIRECTORY,
+            config.cache.max_size_mb or DEFAULT_MAX_SIZE_MB)
+    return ResultCache(GoSource(config.all.project_type), backend=backend)
@@ -0,0 +1,194 @@
+"""Cache server package.
+
+A minimal store for a shared result cache, for testing HttpBackend and
+for self hosting, run with `python -m utils.cache_server`. Entries are
+kept in a DirectoryBackend, so the least recently used are evicted once it
+grows past its size limit.
+
+    GET /KEY      the entry, 404 if there isn't one
+    HEAD /KEY     whether there is an entry
+    PUT /KEY      store an entry
+    POST /batch   {"keys": [KEY, ...]} -> {"entries": {KEY: entry}}
+
+Keys are hex digests, as built by ResultCache.key. Any prefix before the
+key in the path is ignored, so the store can sit behind a proxy.
+"""
+import argparse
+import json
+import logging
+import re
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from utils.cache import DEFAULT_MAX_SIZE_MB, DirectoryBackend
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = ".f8ci-cache-server"
+DEFAULT_PORT = 8081
+
+# Entries stored between checks of the size limit.
+PRUNE_EVERY = 100
+# Largest request body accepted, entries are a few KB of JSON.
+MAX_BODY = 16 * 1024 * 1024
+
+REGEX_KEY = re.compile(r"/([0-9a-f]{8,128})$")
+
+
+class CacheServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, backend):
+        """
+        :param address: (string, int), host and port
+        :param backend: DirectoryBackend
+        """
+        HTTPServer.__init__(self, address, CacheHandler)
+        self.backend = backend
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def stored(self):
+        """Count a stored entry, pruning every PRUNE_EVERY."""
+        with self._lock:
+            self._puts += 1
+            prune = self._puts % PRUNE_EVERY == 0
+        if prune:
+            removed = self.backend.prune()
+            if removed:
+                LOGGER.info("Pruned {0} entries".format(removed))
+
+
+class CacheHandler(BaseHTTPRequestHandler):
+
+    # Keeps connections alive for HttpBackend's pool.
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        key = self._key()
+        if key is None:
+            return
+        data = self.server.backend.get(key)
+        if data is None:
+            self._send(404)
+        else:
+            self._send(200, data.encode("utf-8"))
+
+    def do_HEAD(self):
+        key = self._key()
+        if key is None:
+            return
+        self._send(200 if key in self.server.backend else 404)
+
+    def do_PUT(self):
+        # Read first, so a rejected body isn't left on a kept alive
+        # connection.
+        body = self._body()
+        if body is None:
+            return
+        key = self._key()
+        if key is None:
+            return
+        try:
+            json.loads(body.decode("utf-8"))
+        except ValueError:
+            self._send(400)
+            return
+        self.server.backend.put(key, body.decode("utf-8"))
+        self.server.stored()
+        self._send(204)
+
+    def do_POST(self):
+        if not self.path.endswith("/batch"):
+            self._send(404)
+            return
+        body = self._body()
+        if body is None:
+            return
+        try:
+            keys = json.loads(body.decode("utf-8"))["keys"]
+        except (ValueError, KeyError, TypeError):
+            self._send(400)
+            return
+        keys = [key for key in keys if REGEX_KEY.match("/" + str(key))]
+        entries = self.server.backend.get_many(keys)
+        self._send(200, json.dumps({"entries": entries}).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        LOGGER.debug(format % args)
+
+    def _key(self):
+        """Return the key the request is for, after rejecting a bad one.
+
+        :return: string or None
+        """
+        match = REGEX_KEY.search(self.path)
+        if match is None:
+            self._send(404)
+            return None
+        return match.group(1)
+
+    def _body(self):
+        """Read the request body, after rejecting one too large.
+
+        :return: bytes or None
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            self._send(413)
+            return None
+        return self.rfile.read(length)
+
+    def _send(self, status, body=b""):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+
+def parse_args(argv=None):
+    """Parse the command line arguments.
+
+    :param argv: [string], sys.argv by default
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve a result cache shared between CI machines.")
+    parser.add_argument("--host", default="",
+                        help="address to listen on, all by default")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY,
+                        help="where entries are stored")
+    parser.add_argument("--max-size-mb", type=float,
+                        default=DEFAULT_MAX_SIZE_MB)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Serve until interrupted."""
+    logging.basicConfig(level="INFO")
+    args = parse_args(argv)
+    server = CacheServer((args.host, args.port),
+                         DirectoryBackend(args.directory, args.max_size_mb))
+    LOGGER.info("Serving {0} on port {1}".format(
+        args.directory, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
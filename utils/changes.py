@@ -0,0 +1,204 @@
+"""Changes package.
+
+Works out which configured packages are affected by the files changed since
+a git ref. Changed files are mapped onto the Go packages containing them,
+then the reverse import graph from `go list -deps -json` is walked to find
+everything depending on those packages.
+"""
+import io
+import logging
+import os
+import subprocess
+
+from go_processes.process import StreamingProcess, json_objects
+from utils.go_source import GoSource
+
+LOGGER = logging.getLogger(__name__)
+
+GIT_DIFF_SCRIPT = ["git", "diff", "--name-only", "--no-renames",
+                   "--relative"]
+GIT_UNTRACKED_SCRIPT = ["git", "ls-files", "--others", "--exclude-standard"]
+
+LIST_SCRIPTS = {
+    "glide": "go list -deps -json ./...",
+    "gb": "GOPATH={0} go list -deps -json ./src/...",
+}
+
+# Changes to these can affect every package.
+GLOBAL_FILES = ["glide.yaml", "glide.lock", "go.mod", "go.sum",
+                "ci_config.yaml"]
+
+
+def changed_files(ref):
+    """Return the files changed between a ref and the working tree.
+
+    Uncommitted and untracked files are included, paths are relative to
+    the working directory.
+
+    :param ref: string
+    :return: [string]
+    """
+    files = []
+    for script in [GIT_DIFF_SCRIPT + [ref, "--"], GIT_UNTRACKED_SCRIPT]:
+        p = subprocess.Popen(
+            script,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True)
+        out, err = p.communicate()
+        if p.returncode != 0:
+            raise Exception(
+                "Unable to diff against {0}: {1}".format(ref, err))
+        files.extend(line for line in out.split("\n") if line)
+    return files
+
+
+class ImportGraph(object):
+    """The project's packages and who imports them."""
+
+    def __init__(self, packages):
+        """
+        :param packages: [dict], as decoded from go list -json
+        """
+        self.dirs = {}
+        self.dependents = {}
+        # Everything each package's files import, tests included.
+        self.imports = {}
+        for package in packages:
+            if package.get("Standard"):
+                continue
+            import_path = package["ImportPath"]
+            self.dirs[import_path] = os.path.abspath(package.get("Dir", ""))
+            self.imports[import_path] = set(
+                package.get("Imports", []) + package.get("TestImports", [])
+                + package.get("XTestImports", []))
+            # A package whose tests import a changed one is tested again.
+            for imported in self.imports[import_path]:
+                self.dependents.setdefault(imported, set()).add(import_path)
+
+    @classmethod
+    def from_go_list(cls, project_type):
+        """Build the graph from a single go list -deps -json call.
+
+        :param project_type: string
+        :return: ImportGraph
+        """
+        script = LIST_SCRIPTS[project_type].format(
+            os.environ.get("GOPATH", None))
+        LOGGER.debug("List script: {0}".format(script))
+        return cls(json_objects(StreamingProcess(script)))
+
+    def is_stale(self, filenames):
+        """Return whether changes to the files may have changed the graph.
+
+        That's a .go file in a directory which wasn't a package, or one
+        importing something its package didn't. Removed imports only make
+        the graph err on the side of testing more, so they are ignored.
+
+        :param filenames: [string]
+        :return: bool
+        """
+        by_dir = dict((d, p) for p, d in self.dirs.items())
+        for filename in filenames:
+            if not filename.endswith(GoSource.FILE_EXTENSION) \
+                    or not os.path.isfile(filename):
+                continue
+            package = by_dir.get(os.path.dirname(os.path.abspath(filename)))
+            if package is None:
+                return True
+            with io.open(filename, encoding="utf-8", errors="replace") as f:
+                imports = GoSource.parse_imports(f.read())
+            if not set(imports) <= self.imports[package]:
+                return True
+        return False
+
+    def packages_in(self, filenames):
+        """Return the packages holding the given files.
+
+        Files outside a package directory, testdata for example, belong to
+        the closest package above them.
+
+        :param filenames: [string]
+        :return: set of import paths
+        """
+        by_dir = dict((d, p) for p, d in self.dirs.items())
+        packages = set()
+        for filename in filenames:
+            directory = os.path.dirname(os.path.abspath(filename))
+            while directory not in by_dir:
+                parent = os.path.dirname(directory)
+                if parent == directory:
+                    break
+                directory = parent
+            if directory in by_dir:
+                packages.add(by_dir[directory])
+        return packages
+
+    def affected(self, packages):
+        """Return the packages and everything which transitively imports them.
+
+        :param packages: iterable of import paths
+        :return: set of import paths
+        """
+        affected = set()
+        pending = list(packages)
+        while pending:
+            package = pending.pop()
+            if package in affected:
+                continue
+            affected.add(package)
+            pending.extend(self.dependents.get(package, ()))
+        return affected
+
+    def affected_dirs(self, filenames):
+        """Return the directories of every package affected by the files.
+
+        :param filenames: [string]
+        :return: set of string
+        """
+        return set(self.dirs[package] for package in
+                   self.affected(self.packages_in(filenames)))
+
+
+def affected_packages(ref, packages, source, graph=None):
+    """Filter the configured packages down to those affected since a ref.
+
+    :param ref: string
+    :param packages: [string], as configured under all.packages
+    :param source: GoSource, maps configured packages onto directories
+    :param graph: ImportGraph, built with go list when not given
+    :return: [string], in configured order
+    """
+    files = changed_files(ref)
+    if any(os.path.basename(f) in GLOBAL_FILES for f in files):
+        LOGGER.info("Project files changed since {0}, testing everything"
+                    .format(ref))
+        return list(packages)
+    return packages_affected_by(files, packages, source, graph)
+
+
+def packages_affected_by(files, packages, source, graph=None):
+    """Filter the configured packages down to those affected by some files.
+
+    :param files: [string], changed files
+    :param packages: [string], as configured under all.packages
+    :param source: GoSource, maps configured packages onto directories
+    :param graph: ImportGraph, built with go list when not given
+    :return: [string], in configured order
+    """
+    if any(os.path.basename(f) in GLOBAL_FILES for f in files):
+        return list(packages)
+
+    if not files:
+        return []
+
+    if graph is None:
+        graph = ImportGraph.from_go_list(source.project_type)
+    dirs = graph.affected_dirs(files)
+
+    affected = []
+    for package in packages:
+        root = os.path.abspath(source.package_dir(package))
+        if any(d == root or d.startswith(root + os.sep) for d in dirs):
+            affected.append(package)
+    return affected
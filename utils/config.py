@@ -1,5 +1,25 @@
+"""Config package.
+
+Loads `ci_config.yaml` once, checking it against a schema, into frozen
+objects with a slot per key. A key missing from the file is None, one the
+schema doesn't know, or of the wrong type, is an error naming it, rather
+than being silently ignored.
+
+Values the tools look up over and over are worked out when the config is
+loaded: each `ignored_packages` list is compiled into an `ignored`
+matcher, the coverage threshold is a float and `all.package_dirs` maps
+each configured package onto its directory.
+"""
+from collections import OrderedDict
+
 import yaml
 
+from utils.go_source import ALLIDENTIFIER, GoSource
+from utils.ignore import IgnoreList
+
+# libyaml's loader is several times faster, where it's installed.
+LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 ___author___ = "Lee Archer (github.com/lbn)"
 ___credits___ = ["Jim Hill (github.com/jimah)",
                  "Lee Archer (github.com/lbn)"]
@@ -9,23 +29,230 @@ ___maintainer___ = "Jim Hill"
 ___email___ = "jimi2204@googlemail.com"
 ___status___ = "Development"
 
+# Value types a key may have.
+STRING = "string"
+STRINGS = "list of strings"
+NUMBER = "number"
+INTEGER = "integer"
+BOOLEAN = "boolean"
+
+# unicode as well as str on Python 2.
+_STRING_TYPES = (str, type(u""))
+
+
+class ConfigError(Exception):
+    """The config file doesn't match the schema."""
+
+
+class Section(object):
+    """A frozen section of the config.
+
+    FIELDS maps each key to its type, one of the type names above or a
+    Section subclass, and whether it is required.
+    """
+
+    __slots__ = ("_values",)
+    FIELDS = OrderedDict()
+
+    def __init__(self, values, path=""):
+        """
+        :param values: dict, as loaded from the file
+        :param path: string, where the section is, for errors
+        :raises ConfigError: for unknown keys and values of the wrong type
+        """
+        if not isinstance(values, dict):
+            raise ConfigError("{0} should be a mapping, not {1!r}".format(
+                path or "The config", values))
+        unknown = sorted(key for key in values if key not in self.FIELDS)
+        if unknown:
+            raise ConfigError("Unknown {0} {1}, expected one of: {2}".format(
+                "keys" if len(unknown) > 1 else "key",
+                ", ".join(_join(path, key) for key in unknown),
+                ", ".join(self.FIELDS)))
+        for key, (kind, _) in self.FIELDS.items():
+            value = values.get(key)
+            if value is not None:
+                value = _convert(kind, value, _join(path, key))
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, "_values", values)
+        self._derive()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The config is read only")
+
+    def __repr__(self):
+        return "{0}({1!r})".format(type(self).__name__, self.as_dict())
+
+    def _derive(self):
+        """Work out the values looked up over and over."""
+
+    def as_dict(self):
+        """Return the section as it was loaded, e.g. for cache keys.
+
+        :return: dict
+        """
+        values = {}
+        for key, (kind, _) in self.FIELDS.items():
+            value = getattr(self, key)
+            if isinstance(value, Section):
+                value = value.as_dict()
+            elif isinstance(value, tuple):
+                value = list(value)
+            if key in self._values:
+                values[key] = value
+        return values
+
+    @classmethod
+    def missing_keys(cls, values, path=""):
+        """Return the required keys missing from a section and those in it.
+
+        :param values: dict
+        :param path: string
+        :return: [string], e.g. `code_coverage.threshold`
+        """
+        missing = []
+        for key, (kind, required) in cls.FIELDS.items():
+            if key not in values:
+                if required:
+                    missing.append(_join(path, key))
+            elif isinstance(kind, type) and issubclass(kind, Section) \
+                    and isinstance(values[key], dict):
+                missing += kind.missing_keys(values[key], _join(path, key))
+        return missing
+
+
+class _IgnoringSection(Section):
+
+    __slots__ = ()
+
+    def _derive(self):
+        # Compiled once, every output line a tool reports is checked.
+        object.__setattr__(self, "ignored", IgnoreList(self.ignored_packages))
+
+
+class AllConfig(Section):
+
+    FIELDS = OrderedDict([
+        ("packages", (STRINGS, True)),
+        ("project_type", (STRING, True)),
+        ("ignored_commands", (STRINGS, True)),
+        ("jobs", (INTEGER, False)),
+        ("fail_fast", (BOOLEAN, False)),
+        ("timeout", (NUMBER, False)),
+        ("go_cache", (STRING, False)),
+        ("max_processes", (INTEGER, False)),
+        ("max_test_processes", (INTEGER, False)),
+        ("min_available_mb", (NUMBER, False)),
+    ])
+    __slots__ = tuple(FIELDS) + ("package_dirs",)
 
-class Config(dict):
+    def _derive(self):
+        dirs = {}
+        if self.project_type is not None:
+            source = GoSource(self.project_type)
+            for package in (self.packages or ()) + (ALLIDENTIFIER,):
+                dirs[package] = source.package_dir(package)
+        object.__setattr__(self, "package_dirs", dirs)
 
-    REQUIRED_PARENT_KEYS = ["all", "go_vet", "golint", "code_coverage"]
-    REQUIRED_CHILD_KEYS = {
-        "all": ["packages", "project_type", "ignored_commands"],
-        "go_vet": ["ignored_packages"],
-        "golint": ["ignored_packages"],
-        "code_coverage": ["ignored_packages", "threshold"],
-    }
 
-    def __init__(self, d):
-        d = {k: Config(d[k]) if type(d[k]) is dict else d[k] for k in d}
-        super(Config, self).__init__(d)
+class TrendsConfig(Section):
 
-    def __getattr__(self, attr):
-        return self.get(attr)
+    FIELDS = OrderedDict([
+        ("path", (STRING, False)),
+        ("baseline", (STRING, False)),
+        ("max_drop", (NUMBER, False)),
+    ])
+    __slots__ = tuple(FIELDS)
+
+
+class BinariesConfig(Section):
+
+    FIELDS = OrderedDict([
+        ("directory", (STRING, False)),
+        ("max_size_mb", (NUMBER, False)),
+    ])
+    __slots__ = tuple(FIELDS)
+
+
+class FlakyConfig(Section):
+
+    FIELDS = OrderedDict([
+        ("retries", (INTEGER, False)),
+        ("history", (STRING, False)),
+        ("quarantine_after", (INTEGER, False)),
+    ])
+    __slots__ = tuple(FIELDS)
+
+
+class CoverageConfig(_IgnoringSection):
+
+    FIELDS = OrderedDict([
+        ("ignored_packages", (STRINGS, True)),
+        ("threshold", (NUMBER, True)),
+        ("json", (BOOLEAN, False)),
+        ("profile", (STRING, False)),
+        ("timeout", (NUMBER, False)),
+        ("trends", (TrendsConfig, False)),
+        ("binaries", (BinariesConfig, False)),
+        ("flaky", (FlakyConfig, False)),
+    ])
+    __slots__ = tuple(FIELDS) + ("ignored",)
+
+    def _derive(self):
+        super(CoverageConfig, self)._derive()
+        if self.threshold is not None:
+            object.__setattr__(self, "threshold", float(self.threshold))
+
+
+class VetConfig(_IgnoringSection):
+
+    FIELDS = OrderedDict([
+        ("ignored_packages", (STRINGS, True)),
+        ("from_tests", (BOOLEAN, False)),
+        ("batch", (BOOLEAN, False)),
+    ])
+    __slots__ = tuple(FIELDS) + ("ignored",)
+
+
+class LintConfig(_IgnoringSection):
+
+    FIELDS = OrderedDict([
+        ("ignored_packages", (STRINGS, True)),
+        ("batch", (BOOLEAN, False)),
+    ])
+    __slots__ = tuple(FIELDS) + ("ignored",)
+
+
+class StaticChecksConfig(Section):
+
+    FIELDS = OrderedDict([
+        ("enabled_rules", (STRINGS, False)),
+    ])
+    __slots__ = tuple(FIELDS)
+
+
+class CacheConfig(Section):
+
+    FIELDS = OrderedDict([
+        ("directory", (STRING, False)),
+        ("max_size_mb", (NUMBER, False)),
+        ("url", (STRING, False)),
+        ("connections", (INTEGER, False)),
+    ])
+    __slots__ = tuple(FIELDS)
+
+
+class Config(Section):
+
+    FIELDS = OrderedDict([
+        ("all", (AllConfig, True)),
+        ("code_coverage", (CoverageConfig, True)),
+        ("go_vet", (VetConfig, True)),
+        ("golint", (LintConfig, True)),
+        ("cache", (CacheConfig, False)),
+        ("static_checks", (StaticChecksConfig, False)),
+    ])
+    __slots__ = tuple(FIELDS)
 
     def validate_config(self, config_dict):
         """Validate configuration file.
@@ -33,18 +260,56 @@ class Config(dict):
         :param config_dict: dict
         :return bool: True if valid
         """
-        if any(key not in config_dict for key in self.REQUIRED_PARENT_KEYS):
-            return False
-        for k, v in self.REQUIRED_CHILD_KEYS.items():
-            if any(key not in config_dict[k] for key in v):
-                return False
-        return True
+        return not self.missing_keys(config_dict)
+
+
+def _join(path, key):
+    return "{0}.{1}".format(path, key) if path else key
+
+
+def _convert(kind, value, path):
+    """Check a value's type, converting sections and lists.
+
+    :param kind: string or Section subclass
+    :param value: as loaded
+    :param path: string, for errors
+    :return: the value, a Section or tuple for sections and lists
+    :raises ConfigError: if it is of the wrong type
+    """
+    if isinstance(kind, type) and issubclass(kind, Section):
+        return kind(value, path)
+    if kind == STRINGS:
+        if isinstance(value, list) \
+                and all(isinstance(item, _STRING_TYPES) for item in value):
+            return tuple(value)
+    elif kind == STRING:
+        if isinstance(value, _STRING_TYPES):
+            return value
+    elif kind == BOOLEAN:
+        if isinstance(value, bool):
+            return value
+    elif kind == INTEGER:
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    raise ConfigError("{0} should be a {1}, not {2!r}".format(
+        path, kind, value))
 
 
 def get_config(file="ci_config.yaml"):
+    """Load and check a config file.
+
+    :param file: string
+    :return: Config
+    :raises ConfigError: if it is missing required keys, has unknown keys
+        or values of the wrong type
+    """
     with open(file, "r") as f:
-        config = Config(yaml.load(f))
-        if not config.validate_config(config):
-            print(config)
-            raise Exception("Missing config values")
-        return config
+        values = yaml.load(f, Loader=LOADER)
+    config = Config(values if values is not None else {})
+    missing = config.missing_keys(values or {})
+    if missing:
+        raise ConfigError("Missing config values: {0}".format(
+            ", ".join(missing)))
+    return config
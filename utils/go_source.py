@@ -0,0 +1,240 @@
+"""Go source package.
+
+Maps configured packages onto directories and resolves their local imports
+without calling out to the Go toolchain. Used to fingerprint a package, its
+files and everything it imports from the project or its vendor directory,
+so results can be reused while none of them change.
+"""
+import hashlib
+import io
+import os
+import re
+
+GB = "gb"
+GLIDE = "glide"
+
+ALLIDENTIFIER = "all"
+
+
+class GoSource(object):
+
+    FILE_EXTENSION = ".go"
+    SKIPPED_DIRS = ["vendor", "testdata"]
+
+    REGEX_IMPORT_BLOCK = re.compile(r"^import\s*\((.*?)\)", re.M | re.S)
+    REGEX_IMPORT_LINE = re.compile(r'^import\s+(?:[\w.]+\s+)?"([^"]+)"', re.M)
+    REGEX_IMPORT_SPEC = re.compile(r'(?:[\w.]+\s+)?"([^"]+)"')
+    REGEX_GLIDE_PACKAGE = re.compile(r"^package:\s*['\"]?([^'\"\s]+)", re.M)
+    REGEX_GO_MOD_MODULE = re.compile(r"^module\s+(\S+)", re.M)
+
+    def __init__(self, project_type, root="."):
+        """
+        :param project_type: string, "gb" or "glide"
+        :param root: string, the project root
+        """
+        self.project_type = project_type
+        self.root = root
+        self._import_prefix = None
+        self._files = {}
+        self._imports = {}
+
+    def package_dir(self, package):
+        """Return the directory holding a configured package.
+
+        :param package: string
+        :return: string
+        """
+        if self.project_type == GB:
+            if package == ALLIDENTIFIER:
+                return os.path.join(self.root, "src")
+            return os.path.join(self.root, "src", package)
+        if package == ALLIDENTIFIER:
+            return self.root
+        return os.path.normpath(os.path.join(self.root, package))
+
+    def package_dirs(self, package):
+        """Return every directory containing .go files under a package.
+
+        Mirrors the `package/...` pattern passed to the Go tools.
+
+        :param package: string
+        :return: [string], sorted
+        """
+        dirs = []
+        for root, subdirs, files in os.walk(self.package_dir(package)):
+            subdirs[:] = sorted(d for d in subdirs if self._is_source_dir(d))
+            if any(f.endswith(self.FILE_EXTENSION) for f in files):
+                dirs.append(root)
+        return dirs
+
+    def go_files(self, directory):
+        """Return the sorted .go files directly inside a directory.
+
+        :param directory: string
+        :return: [string]
+        """
+        if directory not in self._files:
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                names = []
+            self._files[directory] = sorted(
+                os.path.join(directory, name) for name in names
+                if name.endswith(self.FILE_EXTENSION))
+        return self._files[directory]
+
+    def imports(self, directory):
+        """Return the local directories imported by the files in a directory.
+
+        Standard library and unresolvable imports are left out.
+
+        :param directory: string
+        :return: [string]
+        """
+        if directory not in self._imports:
+            paths = set()
+            for filename in self.go_files(directory):
+                paths.update(self.parse_imports(self._read(filename)))
+            resolved = (self.resolve_import(path) for path in paths)
+            self._imports[directory] = sorted(d for d in resolved if d)
+        return self._imports[directory]
+
+    def transitive_dirs(self, package):
+        """Return a package's directories and everything they import.
+
+        :param package: string
+        :return: [string], sorted
+        """
+        return self.imported_dirs(self.package_dirs(package))
+
+    def imported_dirs(self, directories):
+        """Return directories and everything they import.
+
+        :param directories: [string]
+        :return: [string], sorted
+        """
+        seen = set()
+        pending = list(directories)
+        while pending:
+            directory = pending.pop()
+            if directory in seen:
+                continue
+            seen.add(directory)
+            pending.extend(self.imports(directory))
+        return sorted(seen)
+
+    def fingerprint(self, package, testdata=False):
+        """Hash the contents of every file a package depends on.
+
+        :param package: string
+        :param testdata: bool, whether to include the files under the
+            package's testdata directories, which its tests read
+        :return: string, hex digest
+        """
+        directories = self.package_dirs(package)
+        files = self.testdata_files(directories) if testdata else []
+        return self.fingerprint_dirs(self.imported_dirs(directories), files)
+
+    def fingerprint_dirs(self, directories, files=()):
+        """Hash the contents of the .go files in some directories.
+
+        :param directories: [string], e.g. from `imported_dirs`
+        :param files: [string], other files to include
+        :return: string, hex digest
+        """
+        digest = hashlib.sha1()
+        for directory in directories:
+            for filename in self.go_files(directory):
+                self._add_file(digest, filename)
+        for filename in files:
+            self._add_file(digest, filename)
+        return digest.hexdigest()
+
+    def testdata_files(self, directories):
+        """Return every file under the testdata directories of some
+        directories, e.g. fixtures and golden files.
+
+        :param directories: [string]
+        :return: [string], sorted within each directory
+        """
+        files = []
+        for directory in directories:
+            testdata = os.path.join(directory, "testdata")
+            for root, subdirs, names in os.walk(testdata):
+                subdirs.sort()
+                files.extend(os.path.join(root, name)
+                             for name in sorted(names))
+        return files
+
+    def resolve_import(self, path):
+        """Map an import path onto a local directory.
+
+        Vendored packages take precedence, as they do for the Go tools.
+
+        :param path: string
+        :return: string or None
+        """
+        if self.project_type == GB:
+            candidates = [os.path.join(self.root, "vendor", "src", path),
+                          os.path.join(self.root, "src", path)]
+        else:
+            candidates = [os.path.join(self.root, "vendor", path)]
+            prefix = self.import_prefix()
+            if prefix and (path == prefix or path.startswith(prefix + "/")):
+                candidates.append(os.path.normpath(
+                    os.path.join(self.root, path[len(prefix) + 1:])))
+
+        for candidate in candidates:
+            if os.path.isdir(candidate):
+                return candidate
+        return None
+
+    def import_prefix(self):
+        """Return the import path of a glide project's root.
+
+        Read from glide.yaml, falling back to go.mod.
+
+        :return: string or None
+        """
+        if self._import_prefix is None:
+            self._import_prefix = ""
+            for name, pattern in [("glide.yaml", self.REGEX_GLIDE_PACKAGE),
+                                  ("go.mod", self.REGEX_GO_MOD_MODULE)]:
+                path = os.path.join(self.root, name)
+                if not os.path.isfile(path):
+                    continue
+                match = pattern.search(self._read(path))
+                if match:
+                    self._import_prefix = match.group(1)
+                    break
+        return self._import_prefix or None
+
+    @classmethod
+    def parse_imports(cls, source):
+        """Return the import paths declared in a Go source file.
+
+        :param source: string
+        :return: [string]
+        """
+        paths = cls.REGEX_IMPORT_LINE.findall(source)
+        for block in cls.REGEX_IMPORT_BLOCK.findall(source):
+            paths.extend(cls.REGEX_IMPORT_SPEC.findall(block))
+        return paths
+
+    @classmethod
+    def _is_source_dir(cls, name):
+        """Whether the Go tools descend into a directory for `./...`."""
+        return name not in cls.SKIPPED_DIRS and not name.startswith((".", "_"))
+
+    @staticmethod
+    def _add_file(digest, filename):
+        """Add a file's name and contents to a digest."""
+        digest.update(filename.encode("utf-8"))
+        digest.update(b"\0")
+        with open(filename, "rb") as f:
+            digest.update(hashlib.sha1(f.read()).digest())
+
+    @staticmethod
+    def _read(filename):
+        with io.open(filename, encoding="utf-8", errors="replace") as f:
+            return f.read()
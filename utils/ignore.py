@@ -0,0 +1,126 @@
+"""Ignore package.
+
+Compiles an `ignored_packages` list into a trie of path segments, so a
+package reported by a tool can be checked in time proportional to its
+depth rather than the length of the list.
+
+Entries are package paths, optionally with globs:
+
+* `pkg/store` ignores that package only.
+* `pkg/generated/**` ignores pkg/generated and every package below it.
+* `pkg/*/mocks` matches a single segment with `*`, `?` or `[...]`.
+
+A leading `./` or `/` is ignored on both the entries and the packages
+checked, so `./pkg/store`, `/pkg/store` and `pkg/store` are the same.
+"""
+from fnmatch import fnmatchcase
+
+ANY_DEPTH = "**"
+GLOB_CHARACTERS = "*?["
+
+
+class _Node(object):
+
+    __slots__ = ("children", "globs", "deep", "absorbs", "end")
+
+    def __init__(self, absorbs=False):
+        # Literal segments, looked up directly.
+        self.children = {}
+        # (glob, _Node) for segments containing glob characters.
+        self.globs = []
+        # The node following a `**` segment.
+        self.deep = None
+        # Whether this node follows a `**` and so can consume any segment.
+        self.absorbs = absorbs
+        # Whether an entry ends here.
+        self.end = False
+
+
+class IgnoreList(object):
+
+    def __init__(self, patterns=None):
+        """
+        :param patterns: [string], the ignored_packages entries
+        """
+        self.patterns = list(patterns or [])
+        self._root = _Node()
+        # Tools report the same packages over and over, remember them.
+        self._matches = {}
+        for pattern in self.patterns:
+            self._add(pattern)
+
+    def __contains__(self, package):
+        return self.matches(package)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def matches(self, package):
+        """Return whether a package is ignored.
+
+        :param package: string, e.g. `pkg/store` or `/pkg/store`
+        :return: bool
+        """
+        matched = self._matches.get(package)
+        if matched is None:
+            matched = self._matches[package] = self._match(package)
+        return matched
+
+    def _add(self, pattern):
+        node = self._root
+        for segment in _segments(pattern):
+            if segment == ANY_DEPTH:
+                if node.deep is None:
+                    node.deep = _Node(absorbs=True)
+                node = node.deep
+            elif any(c in segment for c in GLOB_CHARACTERS):
+                for glob, child in node.globs:
+                    if glob == segment:
+                        node = child
+                        break
+                else:
+                    child = _Node()
+                    node.globs.append((segment, child))
+                    node = child
+            else:
+                node = node.children.setdefault(segment, _Node())
+        node.end = True
+
+    def _match(self, package):
+        if not self.patterns:
+            return False
+        nodes = _closure([self._root])
+        for segment in _segments(package):
+            following = []
+            for node in nodes:
+                child = node.children.get(segment)
+                if child is not None:
+                    following.append(child)
+                for glob, child in node.globs:
+                    if fnmatchcase(segment, glob):
+                        following.append(child)
+                if node.absorbs:
+                    following.append(node)
+            nodes = _closure(following)
+            if not nodes:
+                return False
+        return any(node.end for node in nodes)
+
+
+def _segments(path):
+    path = path.strip()
+    if path.startswith("./"):
+        path = path[2:]
+    return [segment for segment in path.split("/") if segment]
+
+
+def _closure(nodes):
+    """Add the nodes reachable by `**` matching no segments at all."""
+    reached = []
+    seen = set()
+    for node in nodes:
+        while node is not None and id(node) not in seen:
+            seen.add(id(node))
+            reached.append(node)
+            node = node.deep
+    return reached
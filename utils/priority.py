@@ -0,0 +1,125 @@
+"""Priority package.
+
+Orders a run's steps so the checks likeliest to fail, soonest, start first:
+the static checks over the whole tree, then go vet, golint and finally
+code coverage. Within a tool, the steps which have failed most often in
+earlier runs go first, then the quickest. Along with `--fail-fast`, a
+broken build is reported in seconds rather than after the coverage run.
+
+How often each step failed and how long it took are kept in a history
+file. Every run is added with older runs decaying, so a step that was
+fixed a while ago stops being treated as likely to fail.
+"""
+import json
+
+DEFAULT_HISTORY = ".f8ci-history.json"
+
+TOOL_ORDER = ["static_checks", "go_vet", "go_lint", "code_coverage"]
+
+# Weight of the existing history each time a run is added.
+DECAY = 0.8
+
+
+class StepHistory(object):
+
+    def __init__(self, steps=None):
+        """
+        :param steps: dict of (package, tool) to dict with `runs`,
+            `failures` and `elapsed`, all decayed
+        """
+        self.steps = steps or {}
+
+    @classmethod
+    def read(cls, path):
+        """Return the history in a file, empty if there isn't a readable one.
+
+        :param path: string
+        :return: StepHistory
+        """
+        try:
+            with open(path, "r") as f:
+                history = json.load(f)
+        except (IOError, OSError, ValueError):
+            return cls()
+        return cls(dict(((step["package"], step["tool"]),
+                         {"runs": step["runs"],
+                          "failures": step["failures"],
+                          "elapsed": step["elapsed"]})
+                        for step in history.get("steps", [])))
+
+    def write(self, path):
+        """
+        :param path: string
+        """
+        steps = [dict(stats, package=package, tool=tool)
+                 for (package, tool), stats in sorted(self.steps.items())]
+        with open(path, "w") as f:
+            json.dump({"steps": steps}, f, indent=2, sort_keys=True)
+
+    def add(self, results):
+        """Add the steps of a run.
+
+        Steps that weren't run, or were cancelled, are left out.
+
+        :param results: [StepResult]
+        """
+        for result in results:
+            if result.elapsed is None or result.cancelled:
+                continue
+            stats = self.steps.setdefault(
+                (result.package, result.tool),
+                {"runs": 0.0, "failures": 0.0, "elapsed": result.elapsed})
+            stats["runs"] = stats["runs"] * DECAY + 1
+            stats["failures"] = stats["failures"] * DECAY \
+                + (1 if result.has_error else 0)
+            stats["elapsed"] = stats["elapsed"] * DECAY \
+                + result.elapsed * (1 - DECAY)
+
+    def failure_rate(self, package, tool):
+        """
+        :param package: string
+        :param tool: string
+        :return: float, 0 to 1, 0 for steps never run
+        """
+        stats = self.steps.get((package, tool))
+        if not stats or not stats["runs"]:
+            return 0.0
+        return stats["failures"] / stats["runs"]
+
+    def elapsed(self, package, tool):
+        """
+        :param package: string
+        :param tool: string
+        :return: float, seconds, None for steps never run
+        """
+        stats = self.steps.get((package, tool))
+        return stats["elapsed"] if stats else None
+
+
+def prioritise(steps, history):
+    """Order steps by tool, then failure rate, then how long they take.
+
+    Steps never run before are assumed to take the average for their
+    tool.
+
+    :param steps: [Step]
+    :param history: StepHistory
+    :return: [Step]
+    """
+    totals = {}
+    for (_, tool), stats in history.steps.items():
+        total = totals.setdefault(tool, [0.0, 0])
+        total[0] += stats["elapsed"]
+        total[1] += 1
+
+    def key(step):
+        elapsed = history.elapsed(step.package, step.tool)
+        if elapsed is None:
+            total, count = totals.get(step.tool, (0.0, 0))
+            elapsed = total / count if count else 0.0
+        rank = TOOL_ORDER.index(step.tool) if step.tool in TOOL_ORDER \
+            else len(TOOL_ORDER)
+        return rank, -history.failure_rate(step.package, step.tool), elapsed
+
+    # Stable, so ties keep the configured order.
+    return sorted(steps, key=key)
@@ -0,0 +1,59 @@
+"""Registry package.
+
+Maps names to objects by import path, e.g.
+`go_processes.go_lint:GoLint`, and imports each module the first time one
+of its objects is asked for. Nothing is imported for a name which is never
+loaded, so tools turned off in `ignored_commands` cost nothing at startup.
+"""
+import importlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class Registry(object):
+
+    def __init__(self):
+        self._paths = OrderedDict()
+        self._loaded = {}
+        # Seconds each name took to import, in the order they were loaded.
+        self.load_times = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._paths
+
+    def register(self, name, path):
+        """Register an object to be imported when first loaded.
+
+        :param name: string
+        :param path: string, `module:attribute`
+        """
+        module, _, attribute = path.partition(":")
+        if not module or not attribute:
+            raise ValueError("Expected module:attribute, got {0}".format(path))
+        self._paths[name] = (module, attribute)
+
+    def names(self):
+        """Return the registered names, in the order they were registered.
+
+        :return: [string]
+        """
+        return list(self._paths)
+
+    def load(self, name):
+        """Return a registered object, importing its module if need be.
+
+        :param name: string
+        :return: object
+        :raises KeyError: if nothing is registered under the name
+        """
+        # Steps load from several threads, only the first does the import.
+        with self._lock:
+            if name not in self._loaded:
+                module, attribute = self._paths[name]
+                start = time.time()
+                loaded = getattr(importlib.import_module(module), attribute)
+                self.load_times[name] = time.time() - start
+                self._loaded[name] = loaded
+            return self._loaded[name]
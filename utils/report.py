@@ -0,0 +1,198 @@
+"""Report package.
+
+Reads and writes the results of a run as JSON. The last run's results act
+as the baseline for incremental runs, steps that are skipped because
+nothing they depend on changed take their result from it.
+
+A run report adds each step's timing and resource usage, and the same
+steps can be written as a Chrome trace (chrome://tracing or Perfetto) to
+see where a build's time goes. Its timings also balance shards, and the
+reports of every shard of a run can be merged back into one.
+"""
+import json
+import os
+
+DEFAULT_BASELINE = ".f8ci-baseline.json"
+
+USAGE_FIELDS = ("processes", "user_time", "system_time", "max_rss_kb",
+                "output_bytes", "cache_hits", "cache_misses")
+
+
+def read_report(path):
+    """Return a report as written, None if there isn't a readable one.
+
+    :param path: string
+    :return: dict or None
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def read_results(path):
+    """Return the step results recorded in a report.
+
+    :param path: string
+    :return: dict of (package, tool) to has_error, empty if there's no report
+    """
+    report = read_report(path) or {}
+    # A cancelled step never got a result.
+    return dict(((step["package"], step["tool"]), step["has_error"])
+                for step in report.get("steps", [])
+                if not step.get("cancelled"))
+
+
+def read_timings(path):
+    """Return how long each step took in a run report.
+
+    :param path: string
+    :return: dict of (package, tool) to seconds, empty if there's no report
+    """
+    report = read_report(path) or {}
+    return dict(((step["package"], step["tool"]), step["elapsed"])
+                for step in report.get("steps", [])
+                if step.get("elapsed") is not None)
+
+
+def write_results(path, results):
+    """Record step results as a report.
+
+    :param path: string
+    :param results: dict of (package, tool) to has_error
+    """
+    report = {"steps": [{"package": package, "tool": tool,
+                         "has_error": has_error}
+                        for (package, tool), has_error
+                        in sorted(results.items())]}
+    _write_json(path, report)
+
+
+def write_report(path, run_result, start, end, jobs):
+    """Record a run's results along with the timing and usage of each step.
+
+    The report can also be read as a baseline.
+
+    :param path: string
+    :param run_result: RunResult
+    :param start: float, epoch seconds the run started at
+    :param end: float, epoch seconds the run finished at
+    :param jobs: int, workers the run used
+    """
+    report = {
+        "start": start,
+        "elapsed": round(end - start, 6),
+        "jobs": jobs,
+        "has_error": run_result.has_error,
+        "steps": [step_report(result, start)
+                  for result in run_result.results],
+    }
+    _write_json(path, report)
+
+
+def step_report(result, start):
+    """Describe a step's result, timing and usage.
+
+    :param result: StepResult
+    :param start: float, epoch seconds the run started at
+    :return: dict, timing and usage are None for steps that weren't run
+    """
+    report = {
+        "package": result.package,
+        "tool": result.tool,
+        "has_error": result.has_error,
+        "cancelled": result.cancelled,
+        "start": None,
+        "elapsed": None,
+    }
+    if result.start is not None:
+        report["start"] = round(result.start - start, 6)
+        report["elapsed"] = round(result.elapsed, 6)
+    for name in USAGE_FIELDS:
+        value = None if result.usage is None else getattr(result.usage, name)
+        report[name] = round(value, 6) if isinstance(value, float) else value
+    return report
+
+
+def merge_reports(reports):
+    """Combine the run reports written by each shard of a run.
+
+    A step reported by more than one shard fails if any of them failed.
+
+    :param reports: [dict]
+    :return: dict, a run report
+    """
+    steps = {}
+    for report in reports:
+        for step in report.get("steps", []):
+            key = (step["package"], step["tool"])
+            if key in steps and steps[key]["has_error"]:
+                continue
+            steps[key] = step
+    starts = [report["start"] for report in reports if "start" in report]
+    return {
+        "start": min(starts) if starts else None,
+        "elapsed": max([report.get("elapsed") or 0.0 for report in reports]
+                       or [0.0]),
+        "jobs": sum(report.get("jobs") or 0 for report in reports),
+        "shards": len(reports),
+        "has_error": any(step["has_error"] for step in steps.values()),
+        "steps": [steps[key] for key in sorted(steps)],
+    }
+
+
+def save_report(path, report):
+    """Write a report, e.g. one from merge_reports.
+
+    :param path: string
+    :param report: dict
+    """
+    _write_json(path, report)
+
+
+def write_trace(path, run_result, start):
+    """Write the steps that ran in the Chrome trace event format.
+
+    Each worker is shown as a thread, each step as a slice on it.
+
+    :param path: string
+    :param run_result: RunResult
+    :param start: float, epoch seconds the run started at
+    """
+    workers = {}
+    events = []
+    for result in run_result.results:
+        if result.start is None:
+            continue
+        tid = workers.setdefault(result.worker, len(workers) + 1)
+        report = step_report(result, start)
+        events.append({
+            "name": "{0} {1}".format(result.package, result.tool),
+            "cat": result.tool,
+            "ph": "X",
+            "pid": 1,
+            "tid": tid,
+            "ts": int(report["start"] * 1000000),
+            "dur": int(report["elapsed"] * 1000000),
+            "args": dict((name, report[name])
+                         for name in ("has_error",) + USAGE_FIELDS),
+        })
+    for worker, tid in workers.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": 1,
+                       "tid": tid, "args": {"name": worker}})
+    _write_json(path, {"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+def _write_json(path, value):
+    # Imported here as most runs write nothing, and ci.py imports this
+    # module for every run.
+    import tempfile
+
+    # Written to a temporary file first so a failed run can't leave half a
+    # report behind.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "w") as f:
+        json.dump(value, f, indent=2, sort_keys=True)
+    os.rename(tmp, path)
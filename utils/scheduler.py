@@ -0,0 +1,281 @@
+"""Scheduler package.
+
+Runs (package, tool) steps on a bounded worker pool. Each step is expected to
+spawn a Go tool as a subprocess, so threads are used rather than processes,
+the GIL is released while waiting on the child.
+
+Log records emitted by the processors (anything under the `go_processes`
+logger) are buffered per step and replayed in submission order, keeping the
+output deterministic regardless of which step finishes first. The step
+currently being reported logs live, so its results appear as they arrive.
+
+Every step is timed, and the processes it starts are accounted to it, see
+`go_processes.process.Usage`, as are the diagnostics its processor reports.
+
+With `fail_fast` the first step to fail cancels the rest: those not yet
+started are skipped, and the processes of those running are stopped. Steps
+still running then are reported as cancelled, without their output,
+whether they passed or failed, since they were most likely stopped part
+way through.
+"""
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from go_processes.diagnostics import track_diagnostics
+from go_processes.process import Usage, stop_all, track_usage
+
+LOGGER = logging.getLogger(__name__)
+
+CAPTURED_LOGGER = "go_processes"
+
+
+def default_jobs():
+    """Return the default number of workers, one per CPU.
+
+    :return: int
+    """
+    # os.cpu_count, where there is one, saves importing multiprocessing.
+    cpu_count = getattr(os, "cpu_count", None)
+    if cpu_count is None:
+        import multiprocessing
+        try:
+            return multiprocessing.cpu_count()
+        except NotImplementedError:
+            return 1
+    return cpu_count() or 1
+
+
+class Step(object):
+    """A single tool invocation against a single package."""
+
+    def __init__(self, package, tool, func):
+        """
+        :param package: string
+        :param tool: string
+        :param func: callable taking the package, returning True on error
+        """
+        self.package = package
+        self.tool = tool
+        self.func = func
+
+    def run(self):
+        return bool(self.func(self.package))
+
+
+class StepResult(object):
+    """The outcome of a `Step` and the log records it produced.
+
+    Steps that were never run, e.g. results taken from a baseline or
+    cancelled before they started, have no timing or usage.
+    """
+
+    def __init__(self, step, has_error, records=None, start=None,
+                 elapsed=None, usage=None, worker=None, diagnostics=None,
+                 cancelled=False):
+        """
+        :param start: float, epoch seconds the step started at
+        :param elapsed: float, wall seconds
+        :param usage: Usage, of the processes the step started
+        :param worker: string, name of the thread that ran the step
+        :param diagnostics: [Diagnostic], reported by the step's processor
+        :param cancelled: bool, the step was skipped or stopped because
+            another failed, has_error is then False
+        """
+        self.package = step.package
+        self.tool = step.tool
+        self.has_error = has_error
+        self.records = records or []
+        self.start = start
+        self.elapsed = elapsed
+        self.usage = usage
+        self.worker = worker
+        self.diagnostics = diagnostics or []
+        self.cancelled = cancelled
+
+
+class RunResult(object):
+    """Aggregated results for a whole run, replaces the global `has_error`."""
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, step_result):
+        self.results.append(step_result)
+
+    @property
+    def has_error(self):
+        return any(result.has_error for result in self.results)
+
+    @property
+    def failed(self):
+        """Return the failed step results in run order.
+
+        :return: [StepResult]
+        """
+        return [result for result in self.results if result.has_error]
+
+    @property
+    def cancelled(self):
+        """Return the step results cancelled by fail fast, in run order.
+
+        :return: [StepResult]
+        """
+        return [result for result in self.results if result.cancelled]
+
+
+class _LogCapture(logging.Handler):
+    """Buffers records per step so workers don't interleave output.
+
+    Records from the step being followed are emitted straight away, those
+    from steps further down the queue wait until it is their turn.
+    """
+
+    def __init__(self):
+        super(_LogCapture, self).__init__()
+        self._local = threading.local()
+        self._buffers = {}
+        self._followed = None
+        self._follow_lock = threading.Lock()
+
+    def start(self, index):
+        self._local.index = index
+        self._local.records = []
+        with self._follow_lock:
+            self._buffers[index] = []
+
+    def stop(self):
+        records = self._local.records
+        self._local.index = None
+        self._local.records = None
+        return records
+
+    def discard(self, index):
+        """Drop a finished step's buffered records without emitting them.
+
+        :param index: int, the step's position in the run
+        """
+        with self._follow_lock:
+            self._buffers.pop(index, None)
+
+    def follow(self, index):
+        """Emit a step's buffered records and any it logs from now on.
+
+        :param index: int, the step's position in the run
+        """
+        with self._follow_lock:
+            self._followed = index
+            for record in self._buffers.pop(index, []):
+                logging.getLogger().handle(record)
+
+    def emit(self, record):
+        index = getattr(self._local, "index", None)
+        if index is None:
+            logging.getLogger().handle(record)
+            return
+
+        self._local.records.append(record)
+        with self._follow_lock:
+            if index == self._followed:
+                logging.getLogger().handle(record)
+            else:
+                self._buffers[index].append(record)
+
+
+class Scheduler(object):
+    """Run steps concurrently, report them in the order they were given."""
+
+    def __init__(self, jobs=None, fail_fast=False):
+        """
+        :param jobs: int, number of workers, defaults to the CPU count
+        :param fail_fast: bool, cancel the remaining steps once one fails
+        """
+        self.jobs = max(1, jobs or default_jobs())
+        self.fail_fast = fail_fast
+        self._cancel = threading.Event()
+        self._cancel_lock = threading.Lock()
+
+    def run(self, steps, on_step=None):
+        """Run all steps and collect their results.
+
+        :param steps: [Step]
+        :param on_step: callable, called with each Step in order as its
+            output starts being reported
+        :return: RunResult
+        """
+        result = RunResult()
+        capture = _LogCapture()
+        self._cancel.clear()
+        logger = logging.getLogger(CAPTURED_LOGGER)
+        propagate = logger.propagate
+
+        logger.addHandler(capture)
+        logger.propagate = False
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [executor.submit(self._run_step, capture, i, step)
+                           for i, step in enumerate(steps)]
+                for i, (step, future) in enumerate(zip(steps, futures)):
+                    if self._cancel.is_set():
+                        # Wait rather than follow it, a cancelled step's
+                        # output isn't reported.
+                        step_result = future.result()
+                        if step_result.cancelled:
+                            capture.discard(i)
+                            result.add(step_result)
+                            continue
+                    if on_step is not None:
+                        on_step(step)
+                    capture.follow(i)
+                    result.add(future.result())
+        finally:
+            logger.removeHandler(capture)
+            logger.propagate = propagate
+
+        return result
+
+    def _run_step(self, capture, index, step):
+        if self._cancel.is_set():
+            return StepResult(step, False, cancelled=True)
+        capture.start(index)
+        usage = Usage()
+        diagnostics = []
+        previous = track_usage(usage)
+        previous_diagnostics = track_diagnostics(diagnostics)
+        start = time.time()
+        try:
+            has_error = step.run()
+        except Exception:
+            logging.getLogger(CAPTURED_LOGGER).exception(
+                "{0} crashed on {1}".format(step.tool, step.package))
+            has_error = True
+        finally:
+            track_usage(previous)
+            track_diagnostics(previous_diagnostics)
+        elapsed = time.time() - start
+        if self.fail_fast and has_error:
+            cancelled = self._fail()
+        else:
+            # Stopped part way through, its result can't be trusted.
+            cancelled = self._cancel.is_set()
+        return StepResult(step, has_error and not cancelled, capture.stop(),
+                          start=start, elapsed=elapsed, usage=usage,
+                          worker=threading.current_thread().name,
+                          diagnostics=[] if cancelled else diagnostics,
+                          cancelled=cancelled)
+
+    def _fail(self):
+        """Cancel the run, unless another step already did.
+
+        :return: bool, True if the failure came after the run was
+            cancelled, so is most likely down to being stopped
+        """
+        with self._cancel_lock:
+            if self._cancel.is_set():
+                return True
+            self._cancel.set()
+        stop_all()
+        return False
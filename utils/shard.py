@@ -0,0 +1,88 @@
+"""Shard package.
+
+Splits a run's steps between CI nodes running in parallel. Every node works
+out the same split from the same inputs, the steps and the durations they
+took in a previous run, so nothing needs to coordinate them.
+
+Steps are handed out longest first, each to the shard with the least work
+so far, which keeps the shards finishing at about the same time. Steps
+without a recorded duration are assumed to take the average for their
+tool.
+"""
+
+# Assumed duration of every step when there are no timings at all.
+DEFAULT_DURATION = 1.0
+
+
+def parse_shard(value):
+    """Parse a shard given as `i/N`, the i-th of N counting from 1.
+
+    :param value: string
+    :return: (int, int)
+    :raises ValueError: if it isn't a valid shard
+    """
+    index, _, count = value.partition("/")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError("Shard {0} is not between 1 and {1}".format(
+            index, count))
+    return index, count
+
+
+def shard_steps(steps, index, count, timings=None):
+    """Return the steps a shard runs, in their original order.
+
+    :param steps: [Step]
+    :param index: int, the shard, from 1 to count
+    :param count: int, number of shards
+    :param timings: dict of (package, tool) to seconds, from an earlier run
+    :return: [Step]
+    """
+    durations = estimate_durations(
+        [(step.package, step.tool) for step in steps], timings or {})
+    shards = balance(durations, count)
+    mine = set(shards[index - 1])
+    return [step for step in steps if (step.package, step.tool) in mine]
+
+
+def estimate_durations(keys, timings):
+    """Give each step a duration, estimating those without timings.
+
+    :param keys: [(package, tool)]
+    :param timings: dict of (package, tool) to seconds
+    :return: dict of (package, tool) to seconds
+    """
+    # Summed in a fixed order, so every node gets exactly the same values.
+    by_tool = {}
+    known = []
+    for (package, tool), elapsed in sorted(timings.items()):
+        by_tool.setdefault(tool, []).append(elapsed)
+        known.append(elapsed)
+    default = sum(known) / len(known) if known else DEFAULT_DURATION
+
+    durations = {}
+    for key in keys:
+        if key in timings:
+            durations[key] = timings[key]
+        elif key[1] in by_tool:
+            durations[key] = sum(by_tool[key[1]]) / len(by_tool[key[1]])
+        else:
+            durations[key] = default
+    return durations
+
+
+def balance(durations, count):
+    """Split the steps into shards of about equal total duration.
+
+    :param durations: dict of (package, tool) to seconds
+    :param count: int, number of shards
+    :return: [[(package, tool)]], one list per shard
+    """
+    shards = [[] for _ in range(count)]
+    totals = [0.0] * count
+    # Ties are broken by name, so every node makes the same choices.
+    for key in sorted(durations, key=lambda k: (-durations[k], k)):
+        shard = totals.index(min(totals))
+        shards[shard].append(key)
+        totals[shard] += durations[key]
+    return shards
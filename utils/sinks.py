@@ -0,0 +1,145 @@
+"""Sinks package.
+
+Writes the diagnostics each step of a run reported, for CI servers and
+editors to show, see `go_processes.diagnostics`. Chosen with
+`--diagnostics FORMAT:PATH`:
+
+* `text`: one line per diagnostic, prefixed with its tool and package.
+* `json`: every diagnostic with its step.
+* `junit`: a test suite per tool and a test case per package, those which
+  failed listing their diagnostics, those cancelled by fail fast skipped.
+* `checkstyle`: diagnostics grouped by file, those without a file under
+  their package.
+"""
+import io
+import json
+from collections import OrderedDict
+from xml.etree import ElementTree
+
+from go_processes.diagnostics import format_text, render_text
+
+CHECKSTYLE_VERSION = "4.3"
+
+
+def write_text(results, path):
+    """
+    :param results: [StepResult]
+    :param path: string
+    """
+    with io.open(path, "w", encoding="utf-8") as f:
+        for result in results:
+            for diagnostic in result.diagnostics:
+                f.write(u"{0} {1}: {2}\n".format(
+                    result.tool, result.package, format_text(diagnostic)))
+
+
+def write_json(results, path):
+    """
+    :param results: [StepResult]
+    :param path: string
+    """
+    steps = [{"package": result.package,
+              "tool": result.tool,
+              "has_error": result.has_error,
+              "cancelled": result.cancelled,
+              "diagnostics": [dict(diagnostic._asdict())
+                              for diagnostic in result.diagnostics]}
+             for result in results]
+    with open(path, "w") as f:
+        json.dump({"steps": steps}, f, indent=2, sort_keys=True)
+
+
+def write_junit(results, path):
+    """
+    :param results: [StepResult]
+    :param path: string
+    """
+    by_tool = OrderedDict()
+    for result in results:
+        by_tool.setdefault(result.tool, []).append(result)
+
+    root = ElementTree.Element("testsuites", {
+        "tests": str(len(results)),
+        "failures": str(sum(1 for result in results if result.has_error))})
+    for tool, tool_results in by_tool.items():
+        suite = ElementTree.SubElement(root, "testsuite", {
+            "name": tool,
+            "tests": str(len(tool_results)),
+            "failures": str(sum(1 for result in tool_results
+                                if result.has_error)),
+            "skipped": str(sum(1 for result in tool_results
+                               if result.cancelled)),
+            "time": _seconds(sum(result.elapsed or 0.0
+                                 for result in tool_results))})
+        for result in tool_results:
+            case = ElementTree.SubElement(suite, "testcase", {
+                "classname": tool,
+                "name": result.package,
+                "time": _seconds(result.elapsed or 0.0)})
+            if result.cancelled:
+                ElementTree.SubElement(case, "skipped",
+                                       {"message": "cancelled"})
+            if not result.has_error:
+                continue
+            failure = ElementTree.SubElement(case, "failure", {
+                "type": tool,
+                "message": "{0} problems".format(len(result.diagnostics))
+                if result.diagnostics else "failed"})
+            failure.text = render_text(result.diagnostics)
+    _write_xml(root, path)
+
+
+def write_checkstyle(results, path):
+    """
+    :param results: [StepResult]
+    :param path: string
+    """
+    by_file = OrderedDict()
+    for result in results:
+        for diagnostic in result.diagnostics:
+            by_file.setdefault(diagnostic.file or result.package, []) \
+                .append(diagnostic)
+
+    root = ElementTree.Element("checkstyle", {"version": CHECKSTYLE_VERSION})
+    for name, diagnostics in by_file.items():
+        element = ElementTree.SubElement(root, "file", {"name": name})
+        for diagnostic in diagnostics:
+            attributes = {
+                "severity": "error",
+                "message": diagnostic.message,
+                "source": ".".join(part for part in (diagnostic.tool,
+                                                     diagnostic.rule)
+                                   if part)}
+            if diagnostic.line is not None:
+                attributes["line"] = str(diagnostic.line)
+            if diagnostic.column is not None:
+                attributes["column"] = str(diagnostic.column)
+            ElementTree.SubElement(element, "error", attributes)
+    _write_xml(root, path)
+
+
+SINKS = OrderedDict([
+    ("text", write_text),
+    ("json", write_json),
+    ("junit", write_junit),
+    ("checkstyle", write_checkstyle),
+])
+
+
+def write_diagnostics(sink, path, results):
+    """Write a run's diagnostics in one of the `SINKS` formats.
+
+    :param sink: string, a key of SINKS
+    :param path: string
+    :param results: [StepResult]
+    """
+    SINKS[sink](results, path)
+
+
+def _seconds(elapsed):
+    return "{0:.3f}".format(elapsed)
+
+
+def _write_xml(root, path):
+    ElementTree.ElementTree(root).write(path, encoding="utf-8",
+                                        xml_declaration=True)
@@ -0,0 +1,71 @@
+"""Startup package.
+
+Times how long `ci.py` takes to get going, for `--profile-startup`. The
+clock starts when the process did, where the OS can tell us, so the time
+spent starting the interpreter and importing modules is included.
+"""
+import logging
+import os
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+def process_start_time():
+    """Return when this process started, on Linux.
+
+    :return: float, a time.time() value, None where it isn't known
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name can contain spaces, fields follow its `)`.
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        ticks = os.sysconf("SC_CLK_TCK")
+        return time.time() - uptime + int(fields[19]) / float(ticks)
+    except (IOError, OSError, IndexError, ValueError, AttributeError):
+        return None
+
+
+class StartupProfile(object):
+
+    def __init__(self, started=None):
+        """
+        :param started: float, when the process started, see
+            `process_start_time`, None to start timing now
+        """
+        now = time.time()
+        self.phases = []
+        if started is not None:
+            self.phases.append(("interpreter and imports", now - started))
+        self._last = now
+
+    def mark(self, phase):
+        """Record that a phase of startup has finished.
+
+        :param phase: string, what was done since the previous mark
+        """
+        now = time.time()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return sum(elapsed for _, elapsed in self.phases)
+
+    def log(self, load_times=None):
+        """Log how long each phase took.
+
+        :param load_times: dict of name to seconds, processors imported
+            on demand once the steps were running
+        """
+        lines = ["STARTUP: {0:.1f}ms before the first step".format(
+            self.total * 1000)]
+        lines += ["{0:>9.1f}ms  {1}".format(elapsed * 1000, phase)
+                  for phase, elapsed in self.phases]
+        if load_times:
+            lines.append("Imported when first needed:")
+            lines += ["{0:>9.1f}ms  {1}".format(elapsed * 1000, name)
+                      for name, elapsed in load_times.items()]
+        LOGGER.info("\n".join(lines))
@@ -0,0 +1,106 @@
+"""Tests for the cache server package."""
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from utils import cache
+from utils.cache import DirectoryBackend, HttpBackend, ResultCache
+from utils.cache_server import CacheServer
+
+
+class TestCacheServer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = CacheServer(("127.0.0.1", 0),
+                                  DirectoryBackend(self.directory))
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={"poll_interval": 0.01})
+        self.thread.start()
+        self.url = "http://127.0.0.1:{0}/f8ci".format(
+            self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def test_round_trips_results(self):
+        backend = HttpBackend(self.url)
+        results = ResultCache(None, backend=backend)
+
+        results.put("0123abcd", {"err": False, "out": ""})
+
+        self.assertEqual(results.get("0123abcd"), {"err": False, "out": ""})
+        self.assertIsNone(results.get("4567abcd"))
+        self.assertIn("0123abcd", results)
+        self.assertNotIn("4567abcd", results)
+        self.assertEqual(
+            DirectoryBackend(self.directory).get("0123abcd"),
+            '{"err": false, "out": ""}')
+
+    def test_reuses_connections(self):
+        backend = HttpBackend(self.url, connections=2)
+        backend.put("0123abcd", "{}")
+        connection = backend._idle[0]
+
+        for _ in range(3):
+            self.assertEqual(backend.get("0123abcd"), "{}")
+
+        self.assertEqual(backend._idle, [connection])
+
+    def test_reconnects_when_the_server_closed_a_connection(self):
+        backend = HttpBackend(self.url)
+        backend.put("0123abcd", "{}")
+        backend._idle[0].sock.shutdown(socket.SHUT_RDWR)
+
+        self.assertEqual(backend.get("0123abcd"), "{}")
+        self.assertTrue(backend.available)
+
+    def test_fetches_in_batches(self):
+        backend = HttpBackend(self.url)
+        keys = ["{0:08x}".format(i) for i in range(cache.BATCH_SIZE + 5)]
+        for key in keys[::2]:
+            backend.put(key, '"{0}"'.format(key))
+        requests = []
+        request = backend._request
+
+        def counting(method, path, body=None):
+            requests.append((method, path))
+            return request(method, path, body)
+        backend._request = counting
+
+        entries = backend.get_many(keys + ["not a key"])
+
+        self.assertEqual(entries, dict((key, '"{0}"'.format(key))
+                                       for key in keys[::2]))
+        self.assertEqual(requests, [("POST", "/batch")] * 2)
+
+    def test_rejects_entries_which_are_not_json(self):
+        backend = HttpBackend(self.url)
+
+        backend.put("0123abcd", "not json")
+
+        self.assertNotIn("0123abcd", backend)
+        self.assertTrue(backend.available)
+
+    def test_carries_on_without_an_unreachable_server(self):
+        self.server.shutdown()
+        self.server.server_close()
+        backend = HttpBackend(self.url, timeout=1)
+
+        self.assertIsNone(backend.get("0123abcd"))
+        self.assertFalse(backend.available)
+        backend.put("0123abcd", "{}")
+        self.assertEqual(backend.get_many(["0123abcd"]), {})
+
+    def test_rejects_urls_which_are_not_http(self):
+        with self.assertRaises(ValueError):
+            HttpBackend("ftp://example.com/cache")
+
+
+if __name__ == '__main__':
+    unittest.main()
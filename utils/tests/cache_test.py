@@ -0,0 +1,87 @@
+"""Tests for the cache package."""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import Mock, patch
+
+from utils.cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = Mock()
+        self.source.project_type = "gb"
+        self.source.fingerprint.return_value = "abc"
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_returns_stored_value(self):
+        cache = ResultCache(self.source, self.directory)
+
+        cache.put("0123", {"err": False, "out": ""})
+
+        self.assertEqual(cache.get("0123"), {"err": False, "out": ""})
+        self.assertIsNone(cache.get("4567"))
+        self.assertIn("0123", cache)
+        self.assertNotIn("4567", cache)
+
+    @patch('utils.cache.ResultCache.tool_version', Mock(return_value="1.8"))
+    def test_key_depends_on_inputs(self):
+        cache = ResultCache(self.source, self.directory)
+        key = cache.key("golint", "golint", "mypackage", {"a": 1})
+
+        self.assertEqual(
+            key, cache.key("golint", "golint", "mypackage", {"a": 1}))
+        self.assertNotEqual(
+            key, cache.key("go_vet", "golint", "mypackage", {"a": 1}))
+        self.assertNotEqual(
+            key, cache.key("golint", "golint", "mypackage", {"a": 2}))
+        self.assertNotEqual(
+            key, cache.key("golint", "golint", "other", {"a": 1}))
+        self.source.fingerprint.side_effect = \
+            lambda package, testdata: "abc{0}".format(testdata)
+        self.assertNotEqual(
+            key, cache.key("golint", "golint", "mypackage", {"a": 1},
+                           testdata=True))
+
+    def test_prune_evicts_least_recently_used(self):
+        cache = ResultCache(self.source, self.directory, max_size_mb=0)
+        cache.backend.max_size = 50
+        for i, key in enumerate(["aa01", "bb02", "cc03"]):
+            cache.put(key, {"output": "x" * 10})
+            path = cache.backend.path(key)
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+        # Reading the oldest entry makes it the most recently used.
+        cache.get("aa01")
+
+        removed = cache.prune()
+
+        self.assertEqual(removed, 1)
+        self.assertIsNotNone(cache.get("aa01"))
+        self.assertIsNone(cache.get("bb02"))
+        self.assertIsNotNone(cache.get("cc03"))
+
+    def test_prefetched_results_are_used(self):
+        backend = Mock()
+        backend.get_many.return_value = {"aa01": '{"err": false}'}
+        backend.get.return_value = None
+        backend.__contains__ = Mock(return_value=False)
+        cache = ResultCache(self.source, backend=backend)
+
+        self.assertEqual(cache.prefetch(["aa01", "bb02", "aa01"]), 1)
+
+        backend.get_many.assert_called_once_with(["aa01", "bb02"])
+        self.assertIn("aa01", cache)
+        self.assertEqual(cache.get("aa01"), {"err": False})
+        self.assertIsNone(cache.get("bb02"))
+        backend.get.assert_called_once_with("bb02")
+
+
+if __name__ == '__main__':
+    unittest.main()
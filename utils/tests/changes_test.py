@@ -0,0 +1,113 @@
+"""Tests for the changes package."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch, Mock
+
+from utils.changes import ImportGraph, affected_packages, \
+    packages_affected_by
+
+
+class TestImportGraph(unittest.TestCase):
+
+    def test_affected_includes_transitive_dependents(self):
+        graph = self._graph()
+
+        self.assertEqual(graph.affected(["lib"]),
+                         set(["lib", "svc/store", "svc", "api"]))
+        self.assertEqual(graph.affected(["api"]), set(["api"]))
+
+    def test_affected_includes_packages_whose_tests_import_them(self):
+        graph = ImportGraph([
+            {"ImportPath": "lib", "Dir": "/p/lib"},
+            {"ImportPath": "testutil", "Dir": "/p/testutil"},
+            {"ImportPath": "svc", "Dir": "/p/svc",
+             "XTestImports": ["svc", "testutil"]},
+            {"ImportPath": "api", "Dir": "/p/api", "TestImports": ["lib"]},
+        ])
+
+        self.assertEqual(graph.affected(["testutil"]),
+                         set(["testutil", "svc"]))
+        self.assertEqual(graph.affected(["lib"]), set(["lib", "api"]))
+
+    def test_packages_in_maps_files_to_closest_package(self):
+        graph = self._graph()
+
+        self.assertEqual(
+            graph.packages_in(["/p/svc/store/store.go",
+                               "/p/svc/store/testdata/a.json",
+                               "/p/README.md"]),
+            set(["svc/store"]))
+
+    @patch('utils.changes.changed_files')
+    def test_affected_packages(self, changed_files_patch):
+        changed_files_patch.return_value = ["/p/svc/store/store.go"]
+
+        affected = affected_packages(
+            "master", ["svc", "api", "other"], self._source(), self._graph())
+
+        self.assertEqual(affected, ["svc"])
+
+    @patch('utils.changes.changed_files')
+    def test_affected_packages_project_files(self, changed_files_patch):
+        changed_files_patch.return_value = ["glide.lock"]
+
+        affected = affected_packages(
+            "master", ["svc", "api"], self._source(), self._graph())
+
+        self.assertEqual(affected, ["svc", "api"])
+
+    def test_packages_affected_by_files(self):
+        affected = packages_affected_by(
+            ["/p/lib/lib.go"], ["svc", "api", "other"], self._source(),
+            self._graph())
+
+        self.assertEqual(affected, ["svc", "api"])
+
+    def test_is_stale_on_new_packages_and_imports(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for name, content in [
+                ("lib/lib.go", 'package lib\n\nimport "fmt"\n'),
+                ("lib/lib_test.go", 'package lib\n\nimport "testing"\n'),
+                ("lib/more.go", 'package lib\n\nimport "os"\n'),
+                ("new/new.go", "package new\n")]:
+            if not os.path.isdir(os.path.join(root, os.path.dirname(name))):
+                os.makedirs(os.path.join(root, os.path.dirname(name)))
+            with open(os.path.join(root, name), "w") as f:
+                f.write(content)
+        graph = ImportGraph([
+            {"ImportPath": "lib", "Dir": os.path.join(root, "lib"),
+             "Imports": ["fmt"], "TestImports": ["testing"]},
+        ])
+
+        self.assertFalse(graph.is_stale(
+            [os.path.join(root, "lib", "lib.go"),
+             os.path.join(root, "lib", "lib_test.go"),
+             os.path.join(root, "lib", "removed.go")]))
+        self.assertTrue(graph.is_stale([os.path.join(root, "lib", "more.go")]))
+        self.assertTrue(graph.is_stale([os.path.join(root, "new", "new.go")]))
+
+    @staticmethod
+    def _source():
+        source = Mock()
+        source.package_dir.side_effect = lambda p: os.path.join("/p", p)
+        return source
+
+    @staticmethod
+    def _graph():
+        return ImportGraph([
+            {"ImportPath": "fmt", "Standard": True, "Dir": "/go/src/fmt"},
+            {"ImportPath": "lib", "Dir": "/p/lib", "Imports": ["fmt"]},
+            {"ImportPath": "svc/store", "Dir": "/p/svc/store",
+             "Imports": ["lib"]},
+            {"ImportPath": "svc", "Dir": "/p/svc", "Imports": ["svc/store"]},
+            {"ImportPath": "api", "Dir": "/p/api",
+             "Imports": ["lib", "fmt"]},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ import unittest
 from mock import patch, Mock
 from ddt import ddt, data, unpack
 
-from utils.config import Config, get_config
+from utils.config import Config, ConfigError, get_config
 
 
 @ddt
@@ -13,7 +13,7 @@ class TestConfig(unittest.TestCase):
     def test_get_config(self):
         config = get_config(
             os.path.abspath("utils/tests/test_config.yaml"))
-        self.assertEqual(config, self._get_valid_config())
+        self.assertEqual(config.as_dict(), self._get_valid_config())
 
     @patch('utils.config.Config.__init__', Mock(return_value=None))
     def test_validate_config_returns_valid(self):
@@ -48,6 +48,57 @@ class TestConfig(unittest.TestCase):
     def test_validation_config_returns_invalid(self, test_config):
         self.assertFalse(Config().validate_config(test_config))
 
+    def test_unknown_keys_are_errors(self):
+        values = self._get_valid_config()
+        values["code_coverage"]["tresholds"] = 80
+
+        with self.assertRaises(ConfigError) as raised:
+            Config(values)
+        self.assertIn("code_coverage.tresholds", str(raised.exception))
+
+    @data(("all", "packages", "your_cool_package"),
+          ("all", "jobs", "4"),
+          ("all", "jobs", True),
+          ("code_coverage", "threshold", "80"),
+          ("code_coverage", "json", "yes"),
+          ("code_coverage", "trends", []))
+    @unpack
+    def test_values_of_the_wrong_type_are_errors(self, section, key, value):
+        values = self._get_valid_config()
+        values[section][key] = value
+
+        with self.assertRaises(ConfigError) as raised:
+            Config(values)
+        self.assertIn("{0}.{1}".format(section, key), str(raised.exception))
+
+    def test_sections_are_read_only(self):
+        config = Config(self._get_valid_config())
+
+        with self.assertRaises(AttributeError):
+            config.code_coverage.threshold = 10
+        with self.assertRaises(AttributeError):
+            config.all = None
+
+    def test_derives_values_when_loaded(self):
+        config = Config(self._get_valid_config())
+
+        self.assertIsInstance(config.code_coverage.threshold, float)
+        self.assertEqual(config.all.packages, ("your_cool_package",))
+        self.assertIsNone(config.all.jobs)
+        self.assertIsNone(config.code_coverage.trends)
+        self.assertEqual(sorted(config.all.package_dirs),
+                         ["all", "your_cool_package"])
+        self.assertTrue(config.code_coverage.ignored.matches(
+            "your_cool_package/neat_inner_package"))
+
+    def test_lists_missing_keys(self):
+        values = self._get_valid_config()
+        del values["code_coverage"]["threshold"]
+        del values["golint"]
+
+        self.assertEqual(Config.missing_keys(values),
+                         ["code_coverage.threshold", "golint"])
+
     @staticmethod
     def _get_valid_config():
         return {
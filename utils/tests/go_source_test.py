@@ -0,0 +1,100 @@
+"""Tests for the go_source package."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.go_source import GoSource
+
+
+class TestGoSource(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parse_imports(self):
+        source = ('package main\n\n'
+                  'import "fmt"\n'
+                  'import lib "fresh8.co/lib"\n'
+                  'import (\n'
+                  '\t"net/http"\n'
+                  '\tstore "fresh8.co/f8-jeeves/store"\n'
+                  '\t_ "fresh8.co/f8-jeeves/driver"\n'
+                  ')\n')
+
+        self.assertEqual(
+            sorted(GoSource.parse_imports(source)),
+            ["fmt", "fresh8.co/f8-jeeves/driver", "fresh8.co/f8-jeeves/store",
+             "fresh8.co/lib", "net/http"])
+
+    def test_transitive_dirs_gb(self):
+        self._write("src/mypackage/main.go", 'import "mypackage/store"')
+        self._write("src/mypackage/store/store.go", 'import "lib"')
+        self._write("src/other/other.go", "")
+        self._write("vendor/src/lib/lib.go", 'import "fmt"')
+
+        dirs = GoSource("gb", self.root).transitive_dirs("mypackage")
+
+        self.assertEqual(dirs, sorted([
+            self._path("src/mypackage"),
+            self._path("src/mypackage/store"),
+            self._path("vendor/src/lib"),
+        ]))
+
+    def test_transitive_dirs_glide(self):
+        self._write("glide.yaml", "package: fresh8.co/f8-jeeves\n")
+        self._write("service/main.go", 'import "fresh8.co/f8-jeeves/store"')
+        self._write("store/store.go", 'import "github.com/lib"')
+        self._write("vendor/github.com/lib/lib.go", "")
+
+        dirs = GoSource("glide", self.root).transitive_dirs("./service")
+
+        self.assertEqual(dirs, sorted([
+            self._path("service"),
+            self._path("store"),
+            self._path("vendor/github.com/lib"),
+        ]))
+
+    def test_fingerprint_changes_with_imported_files(self):
+        self._write("src/mypackage/main.go", 'import "lib"')
+        self._write("src/lib/lib.go", "package lib")
+
+        before = GoSource("gb", self.root).fingerprint("mypackage")
+        self._write("src/lib/lib.go", "package lib\n\nvar X = 1")
+        after = GoSource("gb", self.root).fingerprint("mypackage")
+        self._write("src/unrelated/unrelated.go", "package unrelated")
+        unrelated = GoSource("gb", self.root).fingerprint("mypackage")
+
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, unrelated)
+
+    def test_fingerprint_changes_with_testdata_files(self):
+        self._write("src/mypackage/main.go", "package mypackage")
+        self._write("src/mypackage/inner/inner_test.go", "package inner")
+        self._write("src/mypackage/inner/testdata/golden/a.json", "{}")
+
+        def fingerprint(testdata):
+            return GoSource("gb", self.root).fingerprint("mypackage", testdata)
+
+        before, without = fingerprint(True), fingerprint(False)
+        self._write("src/mypackage/inner/testdata/golden/a.json", "[]")
+
+        self.assertNotEqual(fingerprint(True), before)
+        self.assertEqual(fingerprint(False), without)
+
+    def _path(self, name):
+        return os.path.normpath(os.path.join(self.root, name))
+
+    def _write(self, name, content):
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Tests for the ignore package."""
+import unittest
+
+from ddt import ddt, data, unpack
+
+from utils.config import Config
+from utils.ignore import IgnoreList
+
+
+@ddt
+class TestIgnoreList(unittest.TestCase):
+
+    @data(("pkg/store", True),
+          ("/pkg/store", True),
+          ("./pkg/store", True),
+          ("pkg/store/sub", False),
+          ("pkg", False),
+          ("pkg/generated", True),
+          ("pkg/generated/proto/v1", True),
+          ("pkg/generatedx", False),
+          ("svc/a/mocks", True),
+          ("svc/a/b/mocks", False),
+          ("deep/x/y/testutil", True),
+          ("deep/testutil", True),
+          ("other", False))
+    @unpack
+    def test_matches(self, package, ignored):
+        ignore_list = IgnoreList(["./pkg/store", "pkg/generated/**",
+                                  "svc/*/mocks", "deep/**/testutil"])
+
+        self.assertEqual(ignore_list.matches(package), ignored)
+        # Answered from the memo the second time around.
+        self.assertEqual(package in ignore_list, ignored)
+
+    def test_empty_list_matches_nothing(self):
+        self.assertFalse(IgnoreList().matches("pkg"))
+        self.assertFalse(IgnoreList([]).matches(""))
+
+    def test_many_entries(self):
+        ignore_list = IgnoreList("gen/pkg{0}/**".format(i)
+                                 for i in range(1000))
+
+        self.assertTrue(ignore_list.matches("gen/pkg999/a/b"))
+        self.assertFalse(ignore_list.matches("gen/pkg1000"))
+
+    def test_config_compiles_ignored_packages(self):
+        config = Config({"golint": {"ignored_packages": ["a/**"]},
+                         "all": {"packages": ["a"]}})
+
+        self.assertTrue(config.golint.ignored.matches("a/b"))
+        self.assertFalse(hasattr(config.all, "ignored"))
+
+
+if __name__ == '__main__':
+    unittest.main()
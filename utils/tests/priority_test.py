@@ -0,0 +1,86 @@
+"""Tests for the priority package."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.priority import StepHistory, prioritise
+from utils.scheduler import Step, StepResult
+
+
+def result(package, tool, has_error, elapsed=1.0, cancelled=False):
+    return StepResult(Step(package, tool, None), has_error, elapsed=elapsed,
+                      cancelled=cancelled)
+
+
+class TestPriority(unittest.TestCase):
+
+    def test_orders_by_tool_then_failures_then_time(self):
+        history = StepHistory()
+        history.add([result("a", "go_vet", False, 5.0),
+                     result("b", "go_vet", False, 1.0),
+                     result("c", "go_vet", True, 9.0)])
+        steps = [Step(package, tool, None)
+                 for package in ["a", "b", "c"]
+                 for tool in ["code_coverage", "go_lint", "go_vet"]]
+        steps.append(Step("all", "static_checks", None))
+
+        ordered = [(step.package, step.tool)
+                   for step in prioritise(steps, history)]
+
+        self.assertEqual(ordered, [
+            ("all", "static_checks"),
+            ("c", "go_vet"), ("b", "go_vet"), ("a", "go_vet"),
+            ("a", "go_lint"), ("b", "go_lint"), ("c", "go_lint"),
+            ("a", "code_coverage"), ("b", "code_coverage"),
+            ("c", "code_coverage"),
+        ])
+
+    def test_unknown_steps_take_their_tools_average(self):
+        history = StepHistory()
+        history.add([result("a", "go_lint", False, 1.0),
+                     result("b", "go_lint", False, 5.0)])
+        steps = [Step("new", "go_lint", None), Step("b", "go_lint", None),
+                 Step("a", "go_lint", None)]
+
+        self.assertEqual([step.package
+                          for step in prioritise(steps, history)],
+                         ["a", "new", "b"])
+
+    def test_failures_decay(self):
+        history = StepHistory()
+        history.add([result("a", "go_vet", True)])
+        self.assertEqual(history.failure_rate("a", "go_vet"), 1.0)
+
+        for _ in range(5):
+            history.add([result("a", "go_vet", False)])
+
+        self.assertLess(history.failure_rate("a", "go_vet"), 0.2)
+        self.assertEqual(history.failure_rate("b", "go_vet"), 0.0)
+
+    def test_skips_steps_that_did_not_run(self):
+        history = StepHistory()
+        history.add([result("a", "go_vet", False, cancelled=True),
+                     result("b", "go_vet", True, elapsed=None)])
+
+        self.assertEqual(history.steps, {})
+
+    def test_round_trips_through_a_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "history.json")
+            history = StepHistory()
+            history.add([result("a", "go_vet", True, 2.0)])
+            history.write(path)
+
+            read = StepHistory.read(path)
+
+            self.assertEqual(read.steps, history.steps)
+            self.assertEqual(
+                StepHistory.read(os.path.join(directory, "none")).steps, {})
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
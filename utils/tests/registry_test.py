@@ -0,0 +1,43 @@
+"""Tests for the registry package."""
+import sys
+import unittest
+
+from utils.registry import Registry
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_imports_on_first_load(self):
+        sys.modules.pop("utils.shard", None)
+        registry = Registry()
+        registry.register("shard", "utils.shard:parse_shard")
+
+        self.assertNotIn("utils.shard", sys.modules)
+        parse_shard = registry.load("shard")
+
+        self.assertEqual(parse_shard("1/2"), (1, 2))
+        self.assertIn("utils.shard", sys.modules)
+        self.assertIs(registry.load("shard"), parse_shard)
+        self.assertEqual(list(registry.load_times), ["shard"])
+
+    def test_names(self):
+        registry = Registry()
+        registry.register("b", "utils.shard:balance")
+        registry.register("a", "utils.shard:parse_shard")
+
+        self.assertEqual(registry.names(), ["b", "a"])
+        self.assertIn("a", registry)
+        self.assertNotIn("c", registry)
+        self.assertEqual(registry.load_times, {})
+
+    def test_unknown_name(self):
+        with self.assertRaises(KeyError):
+            Registry().load("missing")
+
+    def test_invalid_path(self):
+        with self.assertRaises(ValueError):
+            Registry().register("shard", "utils.shard")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Tests for the report package."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from go_processes.process import Usage
+from utils.report import merge_reports, read_results, read_timings, \
+    write_report, write_trace
+from utils.scheduler import RunResult, Step, StepResult
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        usage = Usage()
+        usage.add_process(None, 120)
+        usage.add_cache_lookup(False)
+        self.result = RunResult()
+        self.result.add(StepResult(Step("a", "go_vet", None), True,
+                                   start=100.5, elapsed=2.0, usage=usage,
+                                   worker="worker-1"))
+        self.result.add(StepResult(Step("b", "go_vet", None), False))
+
+    def test_write_report(self):
+        path = os.path.join(self.directory, "report.json")
+
+        write_report(path, self.result, 100.0, 103.0, 4)
+
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report["elapsed"], 3.0)
+        self.assertEqual(report["jobs"], 4)
+        self.assertTrue(report["has_error"])
+        first, second = report["steps"]
+        self.assertEqual((first["start"], first["elapsed"]), (0.5, 2.0))
+        self.assertEqual(first["processes"], 1)
+        self.assertEqual(first["output_bytes"], 120)
+        self.assertEqual(first["cache_misses"], 1)
+        self.assertIsNone(second["elapsed"])
+        self.assertIsNone(second["processes"])
+        # A report doubles as a baseline.
+        self.assertEqual(read_results(path), {("a", "go_vet"): True,
+                                              ("b", "go_vet"): False})
+
+    def test_read_timings(self):
+        path = os.path.join(self.directory, "report.json")
+        write_report(path, self.result, 100.0, 103.0, 4)
+
+        self.assertEqual(read_timings(path), {("a", "go_vet"): 2.0})
+        self.assertEqual(read_timings(path + ".missing"), {})
+
+    def test_merge_reports(self):
+        merged = merge_reports([
+            {"start": 10.0, "elapsed": 5.0, "jobs": 2, "steps": [
+                {"package": "a", "tool": "vet", "has_error": True},
+                {"package": "b", "tool": "vet", "has_error": False}]},
+            {"start": 9.0, "elapsed": 7.0, "jobs": 2, "steps": [
+                {"package": "a", "tool": "vet", "has_error": False},
+                {"package": "c", "tool": "vet", "has_error": False}]},
+        ])
+
+        self.assertEqual((merged["start"], merged["elapsed"], merged["jobs"],
+                          merged["shards"]), (9.0, 7.0, 4, 2))
+        self.assertTrue(merged["has_error"])
+        self.assertEqual([(s["package"], s["has_error"])
+                          for s in merged["steps"]],
+                         [("a", True), ("b", False), ("c", False)])
+
+    def test_write_trace_skips_steps_that_were_not_run(self):
+        path = os.path.join(self.directory, "trace.json")
+
+        write_trace(path, self.result, 100.0)
+
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEqual(len(events), 2)
+        step, thread = events
+        self.assertEqual((step["name"], step["ph"], step["tid"]),
+                         ("a go_vet", "X", 1))
+        self.assertEqual((step["ts"], step["dur"]), (500000, 2000000))
+        self.assertEqual(thread["args"], {"name": "worker-1"})
+
+
+if __name__ == '__main__':
+    unittest.main()
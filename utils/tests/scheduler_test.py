@@ -0,0 +1,201 @@
+"""Tests for the Scheduler package."""
+import logging
+import threading
+import time
+import unittest
+
+from mock import Mock
+
+from go_processes.diagnostics import Diagnostic, report
+from go_processes.process import StreamingProcess, set_deadline
+from utils.scheduler import Scheduler, Step, RunResult, StepResult
+
+
+class _ListHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        if record.name == "go_processes.fake":
+            self.messages.append(record.getMessage())
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_run_reports_in_step_order(self):
+        # The first step finishes last, it must still be reported first.
+        steps = [
+            Step("a", "slow", lambda p: time.sleep(0.05) or False),
+            Step("b", "fast", lambda p: True),
+            Step("c", "fast", lambda p: False),
+        ]
+        on_step = Mock()
+
+        result = Scheduler(jobs=3).run(steps, on_step=on_step)
+
+        self.assertEqual([r.package for r in result.results], ["a", "b", "c"])
+        self.assertEqual(
+            [c[0][0].package for c in on_step.call_args_list],
+            ["a", "b", "c"])
+        self.assertTrue(result.has_error)
+        self.assertEqual([r.package for r in result.failed], ["b"])
+
+    def test_run_is_bounded_by_jobs(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def step(package):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return False
+
+        Scheduler(jobs=2).run([Step(str(i), "t", step) for i in range(8)])
+
+        self.assertEqual(running[1], 2)
+
+    def test_run_captures_processor_logs_per_step(self):
+        logger = logging.getLogger("go_processes.fake")
+        logger.setLevel(logging.INFO)
+
+        def step(package):
+            logger.info(package)
+            return False
+
+        result = Scheduler(jobs=2).run(
+            [Step("a", "t", step), Step("b", "t", step)])
+
+        self.assertEqual(
+            [[r.getMessage() for r in s.records] for s in result.results],
+            [["a"], ["b"]])
+
+    def test_run_reports_logs_in_step_order(self):
+        handler = _ListHandler()
+        logging.getLogger().addHandler(handler)
+        self.addCleanup(logging.getLogger().removeHandler, handler)
+        logger = logging.getLogger("go_processes.fake")
+        logger.setLevel(logging.INFO)
+
+        def slow(package):
+            time.sleep(0.05)
+            logger.info(package)
+            return False
+
+        def fast(package):
+            logger.info(package)
+            return False
+
+        Scheduler(jobs=2).run([Step("a", "t", slow), Step("b", "t", fast)])
+
+        self.assertEqual(handler.messages, ["a", "b"])
+
+    def test_run_marks_crashed_steps_as_errors(self):
+        def step(package):
+            raise RuntimeError("boom")
+
+        result = Scheduler(jobs=1).run([Step("a", "t", step)])
+
+        self.assertTrue(result.has_error)
+
+    def test_run_times_steps_and_accounts_their_processes(self):
+        def step(package):
+            list(StreamingProcess("echo {0}".format(package)))
+            return False
+
+        result = Scheduler(jobs=2).run(
+            [Step("a", "t", step), Step("bb", "t", step)])
+
+        self.assertEqual([r.usage.processes for r in result.results], [1, 1])
+        self.assertEqual([r.usage.output_bytes for r in result.results],
+                         [2, 3])
+        for step_result in result.results:
+            self.assertGreater(step_result.elapsed, 0)
+            self.assertIsNotNone(step_result.worker)
+
+    def test_run_collects_diagnostics_per_step(self):
+        def step(package):
+            report([Diagnostic("t", package, "bad")])
+            return True
+
+        result = Scheduler(jobs=2).run(
+            [Step("a", "t", step), Step("b", "t", step)])
+
+        self.assertEqual([r.diagnostics for r in result.results],
+                         [[Diagnostic("t", "a", "bad")],
+                          [Diagnostic("t", "b", "bad")]])
+        # Nothing is collected outside a step.
+        report([Diagnostic("t", "c", "bad")])
+
+    def test_fail_fast_cancels_the_other_steps(self):
+        def fail(package):
+            time.sleep(0.2)
+            return True
+
+        def hang(package):
+            process = StreamingProcess("sleep 10")
+            list(process)
+            return process.timed_out
+
+        start = time.time()
+        try:
+            result = Scheduler(jobs=2, fail_fast=True).run(
+                [Step("a", "hang", hang), Step("b", "fail", fail),
+                 Step("c", "pass", lambda package: False)])
+        finally:
+            set_deadline(None)
+
+        self.assertLess(time.time() - start, 5)
+        self.assertTrue(result.has_error)
+        self.assertEqual([r.package for r in result.failed], ["b"])
+        self.assertEqual([r.package for r in result.cancelled], ["a", "c"])
+        self.assertIsNone(result.cancelled[1].elapsed)
+
+    def test_fail_fast_cancels_stopped_steps_which_passed(self):
+        def fail(package):
+            time.sleep(0.2)
+            return True
+
+        def stopped(package):
+            # Like a tool which finds nothing to report once it's stopped.
+            list(StreamingProcess("sleep 10"))
+            return False
+
+        try:
+            result = Scheduler(jobs=2, fail_fast=True).run(
+                [Step("a", "stopped", stopped), Step("b", "fail", fail)])
+        finally:
+            set_deadline(None)
+
+        self.assertEqual([r.package for r in result.failed], ["b"])
+        self.assertEqual([r.package for r in result.cancelled], ["a"])
+        self.assertEqual(result.cancelled[0].records, [])
+
+    def test_without_fail_fast_every_step_runs(self):
+        ran = []
+
+        def step(package):
+            ran.append(package)
+            return True
+
+        result = Scheduler(jobs=1).run([Step("a", "t", step),
+                                        Step("b", "t", step)])
+
+        self.assertEqual(ran, ["a", "b"])
+        self.assertEqual(len(result.failed), 2)
+        self.assertEqual(result.cancelled, [])
+
+    def test_run_result_without_errors(self):
+        result = RunResult()
+        result.add(StepResult(Step("a", "t", None), False))
+
+        self.assertFalse(result.has_error)
+        self.assertEqual(result.failed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
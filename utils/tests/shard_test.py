@@ -0,0 +1,48 @@
+"""Tests for the shard package."""
+import unittest
+
+from utils.scheduler import Step
+from utils.shard import balance, estimate_durations, parse_shard, \
+    shard_steps
+
+
+class TestShard(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ["0/4", "5/4", "2", "a/b"]:
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_shards_cover_every_step_once(self):
+        steps = [Step("pkg{0}".format(i), tool, None)
+                 for i in range(7) for tool in ["code_coverage", "go_vet"]]
+
+        shards = [shard_steps(steps, i, 3) for i in range(1, 4)]
+
+        self.assertEqual(sorted((s.package, s.tool)
+                                for shard in shards for s in shard),
+                         sorted((s.package, s.tool) for s in steps))
+        # Each shard keeps the original order.
+        for shard in shards:
+            self.assertEqual(shard, [s for s in steps if s in shard])
+
+    def test_balance_by_duration(self):
+        shards = balance({("a", "t"): 8.0, ("b", "t"): 5.0, ("c", "t"): 4.0,
+                          ("d", "t"): 3.0}, 2)
+
+        self.assertEqual(shards, [[("a", "t"), ("d", "t")],
+                                  [("b", "t"), ("c", "t")]])
+
+    def test_estimate_durations_uses_tool_average(self):
+        durations = estimate_durations(
+            [("a", "cover"), ("new", "cover"), ("new", "lint")],
+            {("a", "cover"): 4.0, ("b", "cover"): 2.0, ("b", "vet"): 6.0})
+
+        self.assertEqual(durations, {("a", "cover"): 4.0,
+                                     ("new", "cover"): 3.0,
+                                     ("new", "lint"): 4.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Tests for the sinks package."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+from go_processes.diagnostics import Diagnostic
+from utils.scheduler import Step, StepResult
+from utils.sinks import write_diagnostics
+
+
+class TestSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "out")
+        self.results = [
+            StepResult(Step("./svc", "golint", None), True, elapsed=1.5,
+                       diagnostics=[
+                           Diagnostic("golint", "./svc", "exported X",
+                                      "svc/a.go", 5, 6),
+                           Diagnostic("golint", "./svc", "exported Y",
+                                      "svc/a.go", 9, 1)]),
+            StepResult(Step("./svc", "code_coverage", None), True,
+                       diagnostics=[
+                           Diagnostic("code_coverage", "./svc",
+                                      "/svc has no tests.",
+                                      rule="no_tests")]),
+            StepResult(Step("./api", "golint", None), False, elapsed=0.5),
+            StepResult(Step("./api", "code_coverage", None), False,
+                       cancelled=True),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_text(self):
+        write_diagnostics("text", self.path, self.results)
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(),
+                             "golint ./svc: svc/a.go:5:6: exported X\n"
+                             "golint ./svc: svc/a.go:9:1: exported Y\n"
+                             "code_coverage ./svc: /svc has no tests.\n")
+
+    def test_json(self):
+        write_diagnostics("json", self.path, self.results)
+
+        with open(self.path) as f:
+            steps = json.load(f)["steps"]
+        self.assertEqual([(s["package"], s["tool"], s["has_error"])
+                          for s in steps],
+                         [("./svc", "golint", True),
+                          ("./svc", "code_coverage", True),
+                          ("./api", "golint", False),
+                          ("./api", "code_coverage", False)])
+        self.assertTrue(steps[3]["cancelled"])
+        self.assertEqual(steps[0]["diagnostics"][0], {
+            "tool": "golint", "package": "./svc", "message": "exported X",
+            "file": "svc/a.go", "line": 5, "column": 6, "rule": None})
+
+    def test_junit(self):
+        write_diagnostics("junit", self.path, self.results)
+
+        root = ElementTree.parse(self.path).getroot()
+        self.assertEqual((root.get("tests"), root.get("failures")),
+                         ("4", "2"))
+        suites = root.findall("testsuite")
+        self.assertEqual([(s.get("name"), s.get("tests"), s.get("failures"))
+                          for s in suites],
+                         [("golint", "2", "1"), ("code_coverage", "2", "1")])
+        cases = suites[0].findall("testcase")
+        self.assertEqual([c.get("name") for c in cases], ["./svc", "./api"])
+        self.assertEqual(cases[0].get("time"), "1.500")
+        failure = cases[0].find("failure")
+        self.assertEqual(failure.get("message"), "2 problems")
+        self.assertEqual(failure.text, "svc/a.go:5:6: exported X\n"
+                                       "svc/a.go:9:1: exported Y\n")
+        self.assertIsNone(cases[1].find("failure"))
+        self.assertIsNotNone(
+            suites[1].findall("testcase")[1].find("skipped"))
+
+    def test_checkstyle(self):
+        write_diagnostics("checkstyle", self.path, self.results)
+
+        root = ElementTree.parse(self.path).getroot()
+        files = root.findall("file")
+        self.assertEqual([f.get("name") for f in files], ["svc/a.go", "./svc"])
+        self.assertEqual(files[0].findall("error")[0].attrib, {
+            "line": "5", "column": "6", "severity": "error",
+            "message": "exported X", "source": "golint"})
+        self.assertEqual(files[1].find("error").attrib, {
+            "severity": "error", "message": "/svc has no tests.",
+            "source": "code_coverage.no_tests"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Tests for the startup package."""
+import time
+import unittest
+
+from mock import patch
+
+from utils.startup import StartupProfile, process_start_time
+
+
+class TestStartupProfile(unittest.TestCase):
+
+    def test_phases(self):
+        profile = StartupProfile(time.time() - 0.5)
+        profile.mark("config")
+
+        self.assertEqual([phase for phase, _ in profile.phases],
+                         ["interpreter and imports", "config"])
+        self.assertGreaterEqual(profile.total, 0.5)
+
+    def test_without_process_start(self):
+        profile = StartupProfile()
+        profile.mark("arguments")
+
+        self.assertEqual([phase for phase, _ in profile.phases],
+                         ["arguments"])
+
+    @patch("utils.startup.LOGGER")
+    def test_log(self, logger):
+        profile = StartupProfile()
+        profile.phases = [("arguments", 0.002), ("config", 0.0105)]
+
+        profile.log({"go_vet": 0.001})
+
+        logger.info.assert_called_with(
+            "STARTUP: 12.5ms before the first step\n"
+            "      2.0ms  arguments\n"
+            "     10.5ms  config\n"
+            "Imported when first needed:\n"
+            "      1.0ms  go_vet")
+
+    def test_process_start_time(self):
+        started = process_start_time()
+
+        if started is not None:
+            # Clock ticks are coarse, allow a little either way.
+            self.assertLess(started, time.time() + 0.1)
+            self.assertGreater(started, time.time() - 24 * 60 * 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Tests for the trends package."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.trends import CoverageTrend, TrendStore
+
+
+class TestTrendStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "trends.db")
+        self.store = TrendStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def test_baseline_is_the_first_recorded_commit(self):
+        self.store.record("old", {"a": (50.0, 1.0)})
+        self.store.record("new", {"a": (60.0, 1.0), "b": (70.0, None)})
+
+        self.assertEqual(self.store.baseline(["head", "new", "old"]),
+                         ("new", {"a": 60.0, "b": 70.0}))
+        self.assertEqual(self.store.baseline(["head", "old", "new"]),
+                         ("old", {"a": 50.0}))
+
+    def test_no_baseline(self):
+        self.store.record("old", {"a": (50.0, 1.0)})
+
+        self.assertEqual(self.store.baseline(["head"]), (None, {}))
+        self.assertEqual(self.store.baseline([]), (None, {}))
+
+    def test_runs_at_a_commit_are_merged_latest_first(self):
+        self.store.record("c", {"a": (50.0, 1.0), "b": (40.0, 1.0)})
+        self.store.record("c", {"a": (55.0, 1.0)})
+
+        self.assertEqual(self.store.coverage_at("c"), {"a": 55.0, "b": 40.0})
+
+    def test_persists(self):
+        self.store.record("c", {"a": (50.0, 1.0)})
+        self.store.close()
+        self.store = TrendStore(self.path)
+
+        self.assertEqual(self.store.coverage_at("c"), {"a": 50.0})
+
+
+class TestCoverageTrend(unittest.TestCase):
+
+    def test_fails_on_drop_over_max(self):
+        trend = CoverageTrend({"a": 80.0, "b": 80.0}, 1.0, "0123456789abcdef")
+
+        self.assertEqual(trend.add("a", 79.0, 2.0), "")
+        self.assertEqual(
+            trend.add("b", 78.5),
+            "b coverage dropped from 80.0% to 78.5% since 0123456789ab, "
+            "more than 1.0 points")
+        self.assertEqual(trend.add("new", 10.0), "")
+        self.assertEqual(trend.packages, {"a": (79.0, 2.0), "b": (78.5, None),
+                                          "new": (10.0, None)})
+
+    def test_only_records_without_max_drop(self):
+        trend = CoverageTrend({"a": 80.0}, None, "0123456789abcdef")
+
+        self.assertEqual(trend.add("a", 10.0), "")
+        self.assertEqual(trend.packages, {"a": (10.0, None)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Tests for the watch package."""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from utils.watch import Watcher
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self._write("svc/a.go", "package svc\n")
+        self._write("vendor/dep/dep.go", "package dep\n")
+
+    def test_polling_reports_changed_go_files(self):
+        self._assert_reports_changes(polling=True)
+
+    def test_inotify_reports_changed_go_files(self):
+        watcher = Watcher(self._include, self.root)
+        watcher.close()
+        if type(watcher.backend).__name__ != "_Inotify":
+            self.skipTest("inotify unavailable")
+
+        self._assert_reports_changes(polling=False)
+
+    def _assert_reports_changes(self, polling):
+        watcher = Watcher(self._include, self.root, polling=polling)
+        self.addCleanup(watcher.close)
+
+        def edit():
+            self._write("svc/a.go", "package svc\n\n// changed\n")
+            self._write("svc/notes.txt", "ignored\n")
+            self._write("vendor/dep/dep.go", "package dep\n// ignored\n")
+            self._write("svc/store/store.go", "package store\n")
+
+        timer = threading.Timer(0.1, edit)
+        timer.start()
+        changes = next(watcher.changes())
+        timer.join()
+
+        self.assertEqual(changes, [os.path.join(self.root, "svc", "a.go"),
+                                   os.path.join(self.root, "svc", "store",
+                                                "store.go")])
+
+    def _write(self, name, content):
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+
+    @staticmethod
+    def _include(path):
+        return path.endswith(".go")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+"""Trends package.
+
+Keeps the coverage and test time of every package, run after run, in an
+SQLite file, so coverage can be compared against an earlier commit rather
+than only the fixed threshold.
+
+A run's rows are keyed by run and package, and runs are indexed by commit,
+so finding the baseline for a commit is a couple of index lookups however
+many runs are stored. Every run recorded for a commit counts towards its
+baseline, the latest result for each package winning, so shards and
+incremental runs each add what they tested.
+"""
+import logging
+import sqlite3
+import subprocess
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PATH = ".f8ci-trends.db"
+# Commits of the baseline ref's history searched for a recorded run.
+DEFAULT_DEPTH = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    commit_sha TEXT NOT NULL,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_commit ON runs (commit_sha, id);
+CREATE TABLE IF NOT EXISTS coverage (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    package TEXT NOT NULL,
+    coverage REAL NOT NULL,
+    elapsed REAL,
+    PRIMARY KEY (run_id, package)
+) WITHOUT ROWID;
+"""
+
+GIT_HEAD_SCRIPT = ["git", "rev-parse", "HEAD"]
+GIT_HISTORY_SCRIPT = ["git", "rev-list", "--first-parent"]
+GIT_MODIFIED_SCRIPT = ["git", "status", "--porcelain", "--untracked-files=no"]
+
+
+class TrendStore(object):
+
+    def __init__(self, path=DEFAULT_PATH):
+        """Open a store, creating it if need be.
+
+        :param path: string
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(SCHEMA)
+
+    def record(self, commit, packages, recorded=None):
+        """Add a run's results.
+
+        :param commit: string, the commit that was tested
+        :param packages: dict of package to (coverage, elapsed)
+        :param recorded: float, optional, a time.time() value
+        :return: int, the run's id
+        """
+        with self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO runs (commit_sha, recorded) VALUES (?, ?)",
+                (commit, time.time() if recorded is None else recorded))
+            run_id = cursor.lastrowid
+            self._connection.executemany(
+                "INSERT INTO coverage (run_id, package, coverage, elapsed) "
+                "VALUES (?, ?, ?, ?)",
+                [(run_id, package, coverage, elapsed)
+                 for package, (coverage, elapsed)
+                 in sorted(packages.items())])
+        return run_id
+
+    def baseline(self, commits):
+        """Return the coverage recorded for the first commit with any.
+
+        :param commits: [string], most preferred first, e.g. a branch's
+            history newest first
+        :return: (string, dict of package to coverage), (None, {}) if none
+            of the commits were recorded
+        """
+        recorded = set()
+        # Kept well under SQLite's limit on parameters.
+        for i in range(0, len(commits), 500):
+            batch = commits[i:i + 500]
+            recorded.update(row[0] for row in self._connection.execute(
+                "SELECT DISTINCT commit_sha FROM runs WHERE commit_sha IN "
+                "({0})".format(", ".join("?" * len(batch))), batch))
+        for commit in commits:
+            if commit in recorded:
+                return commit, self.coverage_at(commit)
+        return None, {}
+
+    def coverage_at(self, commit):
+        """Return each package's latest coverage recorded for a commit.
+
+        :param commit: string
+        :return: dict of package to coverage
+        """
+        rows = self._connection.execute(
+            "SELECT coverage.package, coverage.coverage "
+            "FROM runs JOIN coverage ON coverage.run_id = runs.id "
+            "WHERE runs.commit_sha = ? ORDER BY runs.id", (commit,))
+        return dict(rows)
+
+    def close(self):
+        self._connection.close()
+
+
+class CoverageTrend(object):
+    """This run's coverage, checked against a baseline as it's reported."""
+
+    def __init__(self, baseline=None, max_drop=None, baseline_commit=None):
+        """
+        :param baseline: dict of package to coverage
+        :param max_drop: float, points a package's coverage may drop by,
+            None to only record
+        :param baseline_commit: string, where the baseline came from
+        """
+        self.baseline = baseline or {}
+        self.max_drop = max_drop
+        self.baseline_commit = baseline_commit
+        # package to (coverage, elapsed)
+        self.packages = {}
+        self._lock = threading.Lock()
+
+    def add(self, package, coverage, elapsed=None):
+        """Record a package's coverage, returning why it fails, if it does.
+
+        :param package: string
+        :param coverage: float, percentage
+        :param elapsed: float, seconds, optional
+        :return: string, empty if coverage didn't drop too far
+        """
+        with self._lock:
+            self.packages[package] = (coverage, elapsed)
+        previous = self.baseline.get(package)
+        if self.max_drop is None or previous is None \
+                or previous - coverage <= self.max_drop:
+            return ""
+        return "{0} coverage dropped from {1}% to {2}% since {3}, more than " \
+               "{4} points".format(package, previous, coverage,
+                                   self.baseline_commit[:12], self.max_drop)
+
+
+def head_commit():
+    """Return the commit checked out.
+
+    :return: string
+    """
+    return _git(GIT_HEAD_SCRIPT)[0]
+
+
+def is_modified():
+    """Return whether any tracked file has changed since the last commit, so
+    what's tested isn't what's committed.
+
+    :return: bool
+    """
+    return bool(_git(GIT_MODIFIED_SCRIPT))
+
+
+def history(ref, depth=DEFAULT_DEPTH):
+    """Return a ref's first parent history, newest first.
+
+    :param ref: string
+    :param depth: int, commits to return at most
+    :return: [string]
+    """
+    return _git(GIT_HISTORY_SCRIPT + ["--max-count={0}".format(depth),
+                                      ref, "--"])
+
+
+def _git(script):
+    p = subprocess.Popen(
+        script,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        raise Exception("{0} failed: {1}".format(" ".join(script), err))
+    return [line for line in out.split("\n") if line]
@@ -0,0 +1,247 @@
+"""Watch package.
+
+Waits for source files to change, for `ci.py --watch`. On Linux the tree is
+watched with inotify, through ctypes so nothing extra needs installing.
+Anywhere else, or if inotify can't be set up, file modification times are
+polled instead.
+
+Editors tend to write a file in several steps, so changes are gathered
+until the tree has been quiet for a moment and reported as one batch.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds without changes before a batch is reported.
+SETTLE = 0.2
+# Seconds between scans when polling.
+POLL_INTERVAL = 0.5
+
+SKIPPED_DIRS = ["vendor"]
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_watched_dir(name):
+    """Whether changes below a directory are of interest.
+
+    :param name: string, the directory's base name
+    :return: bool
+    """
+    return name not in SKIPPED_DIRS and not name.startswith((".", "_"))
+
+
+class Watcher(object):
+
+    def __init__(self, include, root=".", polling=False):
+        """
+        :param include: callable taking a path, whether its changes count
+        :param root: string, the directory to watch
+        :param polling: bool, poll even where inotify is available
+        """
+        self.include = include
+        self.root = root
+        self.backend = None
+        if not polling:
+            try:
+                self.backend = _Inotify(root)
+            except OSError as e:
+                LOGGER.debug("inotify unavailable, polling: {0}".format(e))
+        if self.backend is None:
+            self.backend = _Polling(root, include)
+
+    def changes(self):
+        """Yield each batch of changed files as it settles.
+
+        :return: generator of [string], sorted paths below the root
+        """
+        while True:
+            changed = self.backend.wait(None)
+            while True:
+                # Anything at all happening, even to files which don't
+                # count, means the tree hasn't settled yet.
+                more = self.backend.wait(SETTLE)
+                if not more:
+                    break
+                changed |= more
+            changed = [path for path in changed if self.include(path)]
+            if changed:
+                yield sorted(changed)
+
+    def close(self):
+        self.backend.close()
+
+
+def _walk_dirs(root):
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if is_watched_dir(d))
+        yield directory, files
+
+
+class _Polling(object):
+    """Compares the modification times of the included files."""
+
+    def __init__(self, root, include):
+        self.root = root
+        self.include = include
+        self._snapshot = self._scan()
+
+    def wait(self, timeout):
+        """Return the files changed, waiting up to timeout for any.
+
+        :param timeout: float, None to wait for as long as it takes
+        :return: set of string
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = set(path for path in set(snapshot) | set(self._snapshot)
+                          if snapshot.get(path) != self._snapshot.get(path))
+            self._snapshot = snapshot
+            if changed or deadline is not None and time.time() >= deadline:
+                return changed
+            time.sleep(POLL_INTERVAL if deadline is None
+                       else max(0, min(POLL_INTERVAL,
+                                       deadline - time.time())))
+
+    def close(self):
+        pass
+
+    def _scan(self):
+        snapshot = {}
+        for directory, files in _walk_dirs(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if not self.include(path):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+
+class _Inotify(object):
+    """Watches every directory in the tree with inotify."""
+
+    def __init__(self, root):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is Linux only")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"),
+                                 use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self._dirs = {}
+        for directory, files in _walk_dirs(root):
+            self._add(directory)
+
+    def wait(self, timeout):
+        """Return the paths changed, waiting up to timeout for any.
+
+        Directories are included, as are files the Watcher will ignore.
+
+        :param timeout: float, None to wait for as long as it takes
+        :return: set of string
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return set()
+            raise
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                LOGGER.debug("inotify queue overflowed, rescanning")
+                changed.update(self._all_files())
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(
+                directory, name.decode(sys.getfilesystemencoding()))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) \
+                        and is_watched_dir(os.path.basename(path)):
+                    changed.update(self._add_tree(path))
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+    def _add(self, directory):
+        wd = self._libc.inotify_add_watch(
+            self._fd, directory.encode(sys.getfilesystemencoding()),
+            WATCH_MASK)
+        if wd < 0:
+            LOGGER.warning("Unable to watch {0}: {1}".format(
+                directory, os.strerror(ctypes.get_errno())))
+            return
+        self._dirs[wd] = directory
+
+    def _add_tree(self, directory):
+        """Watch a new directory and those below it, returning their files.
+
+        Files may have been written before the watch was set, so they count
+        as changed. Each watch is added before its directory is listed, so
+        nothing created in between is missed.
+        """
+        self._add(directory)
+        files = []
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return files
+        for name in names:
+            path = os.path.join(directory, name)
+            if not os.path.isdir(path):
+                files.append(path)
+            elif is_watched_dir(name):
+                files.extend(self._add_tree(path))
+        return files
+
+    def _all_files(self):
+        return [os.path.join(directory, name)
+                for directory, files in _walk_dirs(self.root)
+                for name in files]